@@ -4,6 +4,8 @@ Django settings for Bazar "El Sol" project.
 
 from pathlib import Path
 import os
+
+from django.core.exceptions import ImproperlyConfigured
 #from dotenv import load_dotenv
 
 # Cargar variables del .env (aunque ahora usaremos credenciales directas para AWS)
@@ -15,8 +17,8 @@ TEMPLATES_DIR = BASE_DIR / 'templates'
 STATIC_DIR = BASE_DIR / 'static'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-#SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-clave-por-defecto-para-aws')
-SECRET_KEY = 'clave-segura-para-demo-aws'
+# La de respaldo es pública (está en el repositorio): en producción definir SECRET_KEY
+SECRET_KEY = os.getenv('SECRET_KEY', 'clave-segura-para-demo-aws')
 
 # SECURITY WARNING: don't run with debug turned on in production!
 # Forzamos True para la demo si el env falla
@@ -37,6 +39,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Estáticos recolectados (VENTASAPP/estaticos.py); antes de las métricas porque no son vistas
+    'VENTASAPP.estaticos.EstaticosMiddleware',
+    # Primero entre las vistas, para que la latencia medida incluya al resto del middleware
+    'VENTASAPP.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,7 +56,8 @@ ROOT_URLCONF = 'BAZAR.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (VENTASAPP/metricas.py)
+        'BACKEND': 'VENTASAPP.metricas.PlantillasMedidas',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,36 +71,63 @@ TEMPLATES = [
     },
 ]
 
+# Render de producción: loader de plantillas en cache explícito, fragmentos (menú
+# lateral por rol) en el cache 'plantillas' y estáticos con hash en el nombre, que se
+# generan con collectstatic. En desarrollo los fragmentos no se guardan.
+PLANTILLAS_PRODUCCION = os.getenv('PLANTILLAS_PRODUCCION', '0' if DEBUG else '1') == '1'
+if PLANTILLAS_PRODUCCION:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'BAZAR.wsgi.application'
 
 
 # Database
-
-# 1. CONEXION AWS (ACTIVA)
-# ---------------------------------------------------
+# Todo se toma del entorno; por defecto, la conexión AWS.
+# DB_CONN_MAX_AGE: segundos que cada hilo conserva su conexión entre requests (0 = una
+# por request); con DB_CONN_HEALTH_CHECKS se prueba antes de volver a usarla.
+# DB_POOL=1: pool de DB_POOL_TAMANO conexiones por proceso (VENTASAPP/conexiones.py),
+# que cada request toma y devuelve, así que CONN_MAX_AGE queda en 0. Por defecto se
+# dimensiona a los hilos de cada worker (SERVIDOR_HILOS; sumar VENTAS_ASYNC_HILOS si se
+# sirve con ASGI): MySQL recibe a lo sumo workers × DB_POOL_TAMANO conexiones.
+SERVIDOR_HILOS = int(os.getenv('SERVIDOR_HILOS', '1'))
+DB_POOL = os.getenv('DB_POOL', '0') == '1'
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'bazar',
-        'USER': 'admin',
-        'PASSWORD': 'Agus123',
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'ENGINE': 'VENTASAPP.mysql_en_pool' if DB_POOL else 'django.db.backends.mysql',
+        'NAME': os.getenv('DB_NAME', 'bazar'),
+        'USER': os.getenv('DB_USER', 'admin'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 'Agus123'),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '3306'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'OPTIONS': {},
     }
 }
-
-# 2. CONEXION XAMPP LOCAL (COMENTADA PARA RESPALDO)
-# ---------------------------------------------------
-# DATABASES = {
-#    'default': {
-#        'ENGINE': 'django.db.backends.mysql',
-#        'NAME': os.getenv('DB_NAME'),
-#        'USER': os.getenv('DB_USER'),
-#        'PASSWORD': os.getenv('DB_PASSWORD'),
-#        'HOST': os.getenv('DB_HOST'),
-#        'PORT': os.getenv('DB_PORT'),
-#    }
-# }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'tamano': int(os.getenv('DB_POOL_TAMANO', str(SERVIDOR_HILOS))),
+        'espera': float(os.getenv('DB_POOL_ESPERA', '10')),
+    }
+# DB_ENGINE=sqlite: SQLite local en DB_NAME, para desarrollo y pruebas sin servidor MySQL
+# (DB_ENGINE=sqlite python manage.py test). Las pruebas usan una base en memoria, salvo
+# que DB_TEST_NAME indique un archivo: solo así corren las que abren varios hilos.
+if os.getenv('DB_ENGINE', 'mysql') == 'sqlite':
+    if DB_POOL:
+        raise ImproperlyConfigured('El pool de conexiones (DB_POOL) es solo para MySQL.')
+    DATABASES['default'].update({
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        # Una escritura a la vez: la transacción toma el lock al empezar y espera si está ocupado
+        'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        'TEST': {'NAME': os.getenv('DB_TEST_NAME')},
+    })
 
 
 # Password validation
@@ -114,6 +148,27 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'VENTASAPP.Usuario'
 
+# Hash de contraseñas (VENTASAPP/acceso.py): el algoritmo elegido queda primero y los
+# demás solo verifican hashes antiguos. Al cambiar el algoritmo o las iteraciones de
+# PBKDF2, cada hash se recalcula en el siguiente login del usuario.
+CLAVES_ALGORITMO = os.getenv('CLAVES_ALGORITMO', 'pbkdf2_sha256')
+CLAVES_ITERACIONES = int(os.getenv('CLAVES_ITERACIONES', '1000000'))
+_HASHERS = {
+    'pbkdf2_sha256': 'VENTASAPP.acceso.PBKDF2Ajustable',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS[CLAVES_ALGORITMO]] + [h for a, h in _HASHERS.items() if a != CLAVES_ALGORITMO]
+
+# Login: fallos permitidos por usuario e IP antes de bloquear el par por LOGIN_BLOQUEO
+# segundos, y segundos que un terminal puede volver a entrar sin repetir el hash (0 = nunca)
+LOGIN_CACHE = 'login'
+LOGIN_INTENTOS = int(os.getenv('LOGIN_INTENTOS', '5'))
+LOGIN_BLOQUEO = int(os.getenv('LOGIN_BLOQUEO', '300'))
+LOGIN_CREDENCIAL_TTL = int(os.getenv('LOGIN_CREDENCIAL_TTL', '600'))
+
 # Internationalization
 LANGUAGE_CODE = 'es-ES'
 TIME_ZONE = 'America/Santiago'
@@ -123,6 +178,121 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [STATIC_DIR]
+STATIC_ROOT = Path(os.getenv('STATIC_ROOT', str(BASE_DIR / 'staticfiles')))
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Con hash en el nombre (p. ej. pos.3f2a91c0.js) y variantes .gz/.br (VENTASAPP/estaticos.py)
+    'staticfiles': {
+        'BACKEND': 'VENTASAPP.estaticos.EstaticosComprimidos' if PLANTILLAS_PRODUCCION
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Servir STATIC_ROOT desde Django con compresión y cache de un año para los nombres con
+# hash; los que no lo tienen se guardan ESTATICOS_MAX_AGE segundos
+ESTATICOS_SERVIR = os.getenv('ESTATICOS_SERVIR', '1' if PLANTILLAS_PRODUCCION else '0') == '1'
+ESTATICOS_MAX_AGE = int(os.getenv('ESTATICOS_MAX_AGE', '300'))
 
 # Default primary key field type
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# Folios: cantidad reservada por terminal en cada bloque (1 = secuencia estricta)
+FOLIOS_POR_BLOQUE = int(os.getenv('FOLIOS_POR_BLOQUE', '1'))
+
+# Catálogo del POS: segundos que un proceso confía en su copia sin consultar la versión
+CATALOGO_TTL = int(os.getenv('CATALOGO_TTL', '5'))
+
+# Sesiones: en el cache SESSION_CACHE_ALIAS, sin consultas a django_session en cada request.
+# Con la cookie firmada ('django.contrib.sessions.backends.signed_cookies') el rol viaja en
+# el cliente y quien conozca SECRET_KEY puede firmarse cualquier sesión, así que solo se
+# acepta con una clave propia tomada del entorno.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cache')
+if SESSION_ENGINE.endswith('signed_cookies') and not os.getenv('SECRET_KEY'):
+    raise ImproperlyConfigured('Las sesiones en cookie firmada requieren la variable de entorno SECRET_KEY.')
+SESSION_CACHE_ALIAS = 'sesiones'
+# Cache donde se marcan las sesiones revocadas (ver VENTASAPP/sesiones.py); con varios
+# procesos debe ser compartido, por eso por defecto es un directorio local. Va aparte del
+# de sesiones: ese descarta entradas al azar cuando se llena, y una marca descartada
+# volvería a dar por buena la sesión de un usuario eliminado o degradado.
+SESIONES_CACHE = 'revocaciones'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sesiones': {
+        'BACKEND': os.getenv('SESIONES_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('SESIONES_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'sesiones')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+    # Una marca por usuario revocado, que vence sola: nunca llega a MAX_ENTRIES ni se descarta
+    'revocaciones': {
+        'BACKEND': os.getenv('REVOCACIONES_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('REVOCACIONES_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'revocaciones')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 2**62},
+    },
+    # Intentos de login y credenciales verificadas; local a cada proceso
+    'login': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'login',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+    # Fragmentos de plantilla ({% cache %}); sin efecto fuera del modo de producción
+    'plantillas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache' if PLANTILLAS_PRODUCCION
+        else 'django.core.cache.backends.dummy.DummyCache',
+        'LOCATION': 'plantillas',
+        'TIMEOUT': None,
+    },
+    # Avisos entre procesos (p. ej. apertura y cierre del día)
+    'compartido': {
+        'BACKEND': os.getenv('COMPARTIDO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('COMPARTIDO_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'compartido')),
+        'TIMEOUT': None,
+    },
+}
+
+# Estado del día: cache donde se avisa un cambio y segundos máximos que un proceso
+# confía en su copia si el aviso no le llega
+ESTADO_DIA_CACHE = 'compartido'
+ESTADO_DIA_TTL = int(os.getenv('ESTADO_DIA_TTL', '30'))
+
+# API asíncrona del POS: hilos para la transacción de cada venta (acota también las
+# conexiones a la base) y si la pantalla de ventas usa esos endpoints (servir con ASGI)
+VENTAS_ASYNC_HILOS = int(os.getenv('VENTAS_ASYNC_HILOS', '8'))
+POS_ASINCRONO = os.getenv('POS_ASINCRONO', '0') == '1'
+
+# Pronóstico de stock (VENTASAPP/pronostico.py): días de historia, método ('exponencial'
+# o 'media'), plazo de reposición y días de cobertura de cada pedido
+PRONOSTICO = {
+    'dias': int(os.getenv('PRONOSTICO_DIAS', '365')),
+    'metodo': os.getenv('PRONOSTICO_METODO', 'exponencial'),
+    'plazo': int(os.getenv('PRONOSTICO_PLAZO', '7')),
+    'cobertura': int(os.getenv('PRONOSTICO_COBERTURA', '21')),
+}
+
+# Métricas por vista (VENTASAPP/metricas.py): mediciones que guarda cada proceso y
+# archivo rotativo con una línea JSON por request
+METRICAS_ACTIVAS = os.getenv('METRICAS_ACTIVAS', '1') == '1'
+METRICAS_CAPACIDAD = int(os.getenv('METRICAS_CAPACIDAD', '5000'))
+METRICAS_LOG = Path(os.getenv('METRICAS_LOG', str(BASE_DIR / 'logs' / 'metricas.log')))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'metricas': {
+            # Crea la carpeta del log recién al escribir la primera línea
+            'class': 'VENTASAPP.metricas.ArchivoRotativo',
+            'filename': METRICAS_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'VENTASAPP.metricas': {
+            'handlers': ['metricas'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
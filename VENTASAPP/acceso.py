@@ -0,0 +1,114 @@
+"""Login: política de hash de contraseñas, límite de intentos y re-login de kiosco.
+
+* La política es el primer hasher de ``PASSWORD_HASHERS`` (se elige con
+  ``CLAVES_ALGORITMO``) y, para PBKDF2, ``CLAVES_ITERACIONES``. Si un hash
+  guardado no cumple la política vigente se recalcula en el siguiente login
+  correcto del usuario, sin que él lo note.
+* Los fallos se cuentan por usuario e IP en el cache local ``LOGIN_CACHE``;
+  tras ``LOGIN_INTENTOS`` fallos el par queda bloqueado hasta que venzan los
+  ``LOGIN_BLOQUEO`` segundos, sin consultar la base ni calcular hashes.
+* Un login correcto deja por ``LOGIN_CREDENCIAL_TTL`` segundos un HMAC de la
+  contraseña ligado al hash guardado, de modo que volver a entrar en el mismo
+  terminal no repite el hash lento. Cambiar la contraseña (o su hash) invalida
+  la entrada; con TTL 0 no se usa.
+
+El cache es por proceso: cada worker lleva su propia cuenta de intentos.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.core.cache import caches
+
+from .models import Usuario
+
+
+class AccesoDenegado(Exception):
+    pass
+
+
+class DemasiadosIntentos(AccesoDenegado):
+    pass
+
+
+class PBKDF2Ajustable(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 con las iteraciones de ``CLAVES_ITERACIONES``."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'CLAVES_ITERACIONES', PBKDF2PasswordHasher.iterations)
+
+
+def _cache():
+    return caches[settings.LOGIN_CACHE]
+
+
+def _clave(*partes):
+    # Usuario e IP vienen del cliente: se resumen para que la clave sea válida en cualquier backend
+    return hashlib.blake2b('\0'.join(partes).encode(), digest_size=16).hexdigest()
+
+
+def _clave_intentos(username, ip):
+    return f'login-intentos:{_clave(username, ip or "")}'
+
+
+def _clave_credencial(username):
+    return f'login-credencial:{_clave(username)}'
+
+
+def _firma(usuario, password):
+    mensaje = f'{usuario.password}\0{password}'.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), mensaje, hashlib.sha256).hexdigest()
+
+
+def bloqueado(username, ip):
+    return _cache().get(_clave_intentos(username, ip), 0) >= settings.LOGIN_INTENTOS
+
+
+def registrar_fallo(username, ip):
+    cache = _cache()
+    clave = _clave_intentos(username, ip)
+    # La ventana parte con el primer fallo y no se extiende con los siguientes
+    cache.add(clave, 0, timeout=settings.LOGIN_BLOQUEO)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # Venció entre el add y el incr
+        cache.add(clave, 1, timeout=settings.LOGIN_BLOQUEO)
+
+
+def verificar(usuario, password):
+    """True si ``password`` es la del usuario; de paso aplica la política de hash."""
+    ttl = settings.LOGIN_CREDENCIAL_TTL
+    if ttl:
+        guardada = _cache().get(_clave_credencial(usuario.username))
+        if guardada and hmac.compare_digest(guardada, _firma(usuario, password)):
+            return True
+
+    def rehash(password):
+        usuario.set_password(password)
+        Usuario.objects.filter(pk=usuario.pk).update(password=usuario.password)
+
+    if not check_password(password, usuario.password, setter=rehash):
+        return False
+    if ttl:
+        _cache().set(_clave_credencial(usuario.username), _firma(usuario, password), timeout=ttl)
+    return True
+
+
+def autenticar(request, username, password):
+    """Usuario con esas credenciales; si no, AccesoDenegado (o DemasiadosIntentos)."""
+    ip = request.META.get('REMOTE_ADDR')
+    if bloqueado(username, ip):
+        raise DemasiadosIntentos('Demasiados intentos fallidos. Espere unos minutos antes de reintentar.')
+    try:
+        usuario = Usuario.objects.get(username=username)
+    except Usuario.DoesNotExist:
+        registrar_fallo(username, ip)
+        raise AccesoDenegado('Usuario no encontrado')
+    if not verificar(usuario, password):
+        registrar_fallo(username, ip)
+        raise AccesoDenegado('Contraseña incorrecta')
+    _cache().delete(_clave_intentos(username, ip))
+    return usuario
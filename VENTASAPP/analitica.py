@@ -0,0 +1,66 @@
+"""Analítica por producto: más vendidos y velocidad de venta.
+
+Se lee ResumenProductoDiario, que se mantiene en cada venta, así que el costo
+depende de los productos vendidos en el período y no de cuántas líneas de
+DetalleVenta haya. La base agrupa por producto y el top N se elige en Python
+con ``heapq.nlargest`` (selección parcial, sin ordenar todo el catálogo).
+"""
+import heapq
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Producto, ResumenProductoDiario
+
+
+LIMITE_TOP = 100
+
+
+def por_producto(periodo):
+    """Unidades, monto y velocidad (unidades por día) de cada producto vendido.
+
+    La velocidad se calcula sobre los días ya transcurridos del período: a
+    mitad de mes se divide por los días hasta hoy, no por el mes completo.
+    """
+    filas = ResumenProductoDiario.objects.filter(
+        fecha__gte=periodo.desde, fecha__lte=periodo.hasta
+    ).values('id_producto').annotate(
+        total_unidades=Sum('unidades'), total_monto=Sum('monto')
+    ).order_by().values_list('id_producto', 'total_unidades', 'total_monto')
+    dias = Decimal(max(1, (min(periodo.hasta, timezone.localdate()) - periodo.desde).days + 1))
+    return [
+        {'id_producto': id_producto, 'unidades': unidades, 'monto': monto, 'velocidad': unidades / dias}
+        for id_producto, unidades, monto in filas
+    ]
+
+
+def _con_producto(filas):
+    """Agrega código y nombre a las filas del top (una consulta para todas)."""
+    productos = Producto.objects.only('codigo', 'nombre').in_bulk([f['id_producto'] for f in filas])
+    for fila in filas:
+        producto = productos.get(fila['id_producto'])
+        fila['codigo'] = producto.codigo if producto else ''
+        fila['nombre'] = producto.nombre if producto else ''
+    return filas
+
+
+def top(periodo, n=10):
+    """Los ``n`` productos con más unidades y con más monto en el período.
+
+    Dos consultas: la agrupación por producto y los nombres del top.
+    """
+    n = max(1, min(int(n), LIMITE_TOP))
+    filas = por_producto(periodo)
+    por_unidades = heapq.nlargest(n, filas, key=lambda f: (f['unidades'], f['monto']))
+    por_monto = heapq.nlargest(n, filas, key=lambda f: (f['monto'], f['unidades']))
+    # Una fila puede estar en ambos rankings; se completa una sola vez
+    _con_producto(list({id(f): f for f in por_unidades + por_monto}.values()))
+    return {
+        'periodo': periodo,
+        'n': n,
+        'productos_vendidos': len(filas),
+        'unidades_totales': sum(f['unidades'] for f in filas),
+        'por_unidades': por_unidades,
+        'por_monto': por_monto,
+    }
@@ -0,0 +1,165 @@
+"""Búsqueda de productos por código o nombre para el POS.
+
+Mantiene en memoria un índice del catálogo:
+
+* una lista ordenada de claves (código, nombre completo y cada palabra del
+  nombre) para responder prefijos con búsqueda binaria;
+* un texto con una línea por producto para buscar subcadenas con
+  ``str.find``, que recorre el texto a velocidad de C.
+
+El índice se actualiza de forma incremental con los cambios del catálogo
+(misma versión que usa ``catalogo.productos``) y solo se reconstruye
+completo cuando cambia la cantidad de productos de forma inesperada.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+
+from django.conf import settings
+
+from . import catalogo
+
+
+SEPARADOR = '\x00'
+LIMITE_MAXIMO = 50
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con espacios simples."""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().replace(SEPARADOR, ' ').split())
+
+
+def _claves_de(registro):
+    codigo = normalizar(registro['codigo'])
+    nombre = normalizar(registro['nombre'])
+    claves = {codigo, nombre, *nombre.split()}
+    return [f"{clave}{SEPARADOR}{registro['codigo']}" for clave in claves if clave]
+
+
+class IndiceProductos:
+
+    def __init__(self, fuente=catalogo.productos):
+        self.fuente = fuente
+        self._lock = threading.Lock()
+        self._version = None
+        self._vence = 0.0
+        self._pendiente = True
+        self._registros = {}
+        self._claves = []
+        self._texto = None  # (texto, inicios, codigos), se arma al primer uso
+        fuente.suscribir(self.marcar_pendiente)
+
+    def marcar_pendiente(self):
+        self._pendiente = True
+
+    # --- Mantención del índice ---
+
+    def _reconstruir(self):
+        campos = self.fuente.campos
+        registros = {
+            fila['codigo']: fila
+            for fila in self.fuente.modelo.objects.values(*campos).iterator(chunk_size=5000)
+        }
+        self._claves = sorted(clave for fila in registros.values() for clave in _claves_de(fila))
+        self._registros = registros
+        self._texto = None
+
+    def _aplicar_cambios(self, filas):
+        # Se trabaja sobre copias y luego se reemplazan, para no alterar las
+        # estructuras que otros hilos pueden estar leyendo en ese momento
+        registros = dict(self._registros)
+        claves = None
+        for fila in filas:
+            anterior = registros.get(fila['codigo'])
+            if anterior is None or anterior['nombre'] != fila['nombre']:
+                if claves is None:
+                    claves = list(self._claves)
+                if anterior is not None:
+                    for clave in _claves_de(anterior):
+                        i = bisect_left(claves, clave)
+                        if i < len(claves) and claves[i] == clave:
+                            del claves[i]
+                for clave in _claves_de(fila):
+                    insort(claves, clave)
+            registros[fila['codigo']] = fila
+        if claves is not None:
+            self._claves = claves
+            self._texto = None
+        self._registros = registros
+
+    def sincronizar(self):
+        """Trae los cambios del catálogo si está pendiente o venció el TTL."""
+        if not self._pendiente and time.monotonic() < self._vence:
+            return
+        with self._lock:
+            self._pendiente = False
+            version = self.fuente.version()
+            if version != self._version:
+                if self._version is None:
+                    self._reconstruir()
+                else:
+                    self._aplicar_cambios(self.fuente.filas_desde(self._version))
+                    # Si desaparecieron productos (eliminados o códigos editados) se rearma
+                    if len(self._registros) != catalogo.separar_version(version)[1]:
+                        self._reconstruir()
+                self._version = version
+            self._vence = time.monotonic() + getattr(settings, 'CATALOGO_TTL', 5)
+
+    def _texto_indexado(self):
+        texto = self._texto
+        if texto is None:
+            codigos = list(self._registros)
+            lineas = [normalizar(f"{r['codigo']} {r['nombre']}") for r in self._registros.values()]
+            inicios, posicion = [], 0
+            for linea in lineas:
+                inicios.append(posicion)
+                posicion += len(linea) + 1
+            texto = self._texto = ('\n'.join(lineas), inicios, codigos)
+        return texto
+
+    # --- Consultas ---
+
+    def buscar(self, consulta, limite=20, solo_con_stock=True):
+        """Productos cuyo código o nombre empieza con (o contiene) ``consulta``.
+
+        Primero van las coincidencias por prefijo y luego las de subcadena.
+        """
+        self.sincronizar()
+        consulta = normalizar(consulta)
+        limite = max(1, min(int(limite), LIMITE_MAXIMO))
+        if not consulta:
+            return []
+
+        registros = self._registros
+        resultados, vistos = [], set()
+
+        def agregar(codigo):
+            registro = registros.get(codigo)
+            if registro is None or codigo in vistos:
+                return
+            if solo_con_stock and registro['stock'] <= 0:
+                return
+            vistos.add(codigo)
+            resultados.append(registro)
+
+        claves = self._claves
+        i = bisect_left(claves, consulta)
+        while i < len(claves) and len(resultados) < limite and claves[i].startswith(consulta):
+            agregar(claves[i].rpartition(SEPARADOR)[2])
+            i += 1
+
+        texto, inicios, codigos = self._texto_indexado()
+        posicion = texto.find(consulta)
+        while posicion != -1 and len(resultados) < limite:
+            linea = bisect_right(inicios, posicion) - 1
+            agregar(codigos[linea])
+            siguiente = inicios[linea + 1] if linea + 1 < len(inicios) else len(texto)
+            posicion = texto.find(consulta, siguiente)
+
+        return resultados
+
+
+indice = IndiceProductos()
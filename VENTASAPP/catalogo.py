@@ -0,0 +1,161 @@
+"""Catálogos versionados para el punto de venta.
+
+El POS ya no recibe todos los productos y clientes incrustados en el HTML:
+los pide a un endpoint JSON que responde con ETag (304 si no cambió) y que
+admite un modo incremental (``?desde=<version>``) para refrescar stock.
+
+Cada proceso guarda el JSON completo en memoria. Las escrituras de este
+proceso lo invalidan al instante; los cambios hechos por otros procesos se
+detectan al vencer ``CATALOGO_TTL``, comparando la versión en la base.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+
+from .models import Cliente, Producto
+
+
+# Las filas escritas por transacciones que aún no confirmaban pueden tener una
+# marca algo anterior a la versión que ya vio el cliente; se reenvían.
+MARGEN_CAMBIOS_US = 5_000_000
+
+
+class VersionInvalida(ValueError):
+    pass
+
+
+def separar_version(version):
+    """'<µs>.<cantidad>' -> (µs, cantidad)."""
+    try:
+        micros, _, cantidad = str(version).partition('.')
+        return int(micros), int(cantidad or 0)
+    except ValueError:
+        raise VersionInvalida(version)
+
+
+def _a_micros(fecha):
+    return int(fecha.timestamp() * 1_000_000) if fecha else 0
+
+
+def _desde_micros(micros):
+    try:
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        # Fuera del rango de datetime: no es una versión que haya emitido el servidor
+        raise VersionInvalida(micros)
+
+
+class Catalogo:
+    """Catálogo de un modelo con campo ``actualizado``.
+
+    La versión es ``<última modificación en µs>.<cantidad de filas>``; la
+    cantidad hace que una eliminación también cambie la versión.
+    """
+
+    def __init__(self, clave, modelo, campos, filtro_completo=None):
+        self.clave = clave
+        self.modelo = modelo
+        self.campos = campos
+        self.filtro_completo = filtro_completo or {}
+        self._lock = threading.Lock()
+        self._entrada = None  # (version, vence, cuerpo)
+        self._suscriptores = []
+
+    def version(self):
+        datos = self.modelo.objects.aggregate(ultimo=Max('actualizado'), cantidad=Count('pk'))
+        return self._version(datos)
+
+    async def aversion(self):
+        datos = await self.modelo.objects.aaggregate(ultimo=Max('actualizado'), cantidad=Count('pk'))
+        return self._version(datos)
+
+    def _version(self, datos):
+        return f"{_a_micros(datos['ultimo'])}.{datos['cantidad']}"
+
+    def _serializar(self, version, filas, completo):
+        return json.dumps(
+            {'version': version, 'completo': completo, self.clave: list(filas)},
+            cls=DjangoJSONEncoder,
+        ).encode()
+
+    def _filas_completo(self):
+        return self.modelo.objects.filter(**self.filtro_completo).order_by('pk').values(*self.campos)
+
+    def _vigente(self, ahora):
+        entrada = self._entrada
+        if entrada and entrada[1] > ahora:
+            return entrada[0], entrada[2]
+        return None
+
+    def _guardar(self, version, ahora, cuerpo):
+        with self._lock:
+            self._entrada = (version, ahora + getattr(settings, 'CATALOGO_TTL', 5), cuerpo)
+        return version, cuerpo
+
+    def completo(self):
+        """Devuelve (version, cuerpo JSON) del catálogo completo."""
+        ahora = time.monotonic()
+        vigente = self._vigente(ahora)
+        if vigente:
+            return vigente
+
+        entrada = self._entrada
+        version = self.version()
+        if entrada and entrada[0] == version:
+            cuerpo = entrada[2]
+        else:
+            cuerpo = self._serializar(version, self._filas_completo(), completo=True)
+        return self._guardar(version, ahora, cuerpo)
+
+    async def acompleto(self):
+        """Versión asíncrona de ``completo``."""
+        ahora = time.monotonic()
+        vigente = self._vigente(ahora)
+        if vigente:
+            return vigente
+
+        entrada = self._entrada
+        version = await self.aversion()
+        if entrada and entrada[0] == version:
+            cuerpo = entrada[2]
+        else:
+            filas = [fila async for fila in self._filas_completo()]
+            cuerpo = self._serializar(version, filas, completo=True)
+        return self._guardar(version, ahora, cuerpo)
+
+    def filas_desde(self, version_cliente):
+        """Filas (como diccionarios) modificadas después de ``version_cliente``."""
+        micros, _ = separar_version(version_cliente)
+        desde = _desde_micros(micros - MARGEN_CAMBIOS_US)
+        return self.modelo.objects.filter(actualizado__gt=desde).order_by('pk').values(*self.campos)
+
+    def cambios_desde(self, version_cliente):
+        """Filas modificadas después de ``version_cliente`` (incluye stock 0)."""
+        filas = self.filas_desde(version_cliente)
+        version = self.version()
+        return version, self._serializar(version, filas, completo=False)
+
+    async def acambios_desde(self, version_cliente):
+        """Versión asíncrona de ``cambios_desde``."""
+        filas = [fila async for fila in self.filas_desde(version_cliente)]
+        version = await self.aversion()
+        return version, self._serializar(version, filas, completo=False)
+
+    def suscribir(self, funcion):
+        """Registra ``funcion`` para que se llame en cada invalidación."""
+        self._suscriptores.append(funcion)
+
+    def invalidar(self):
+        with self._lock:
+            self._entrada = None
+        for funcion in self._suscriptores:
+            funcion()
+
+
+productos = Catalogo('productos', Producto, ('codigo', 'nombre', 'precio_unitario', 'stock'), filtro_completo={'stock__gt': 0})
+clientes = Catalogo('clientes', Cliente, ('id', 'rut', 'razon_social', 'giro', 'direccion'))
@@ -0,0 +1,183 @@
+"""Pool de conexiones a la base de datos, compartido por los hilos de cada proceso.
+
+Django abre una conexión por hilo y, con CONN_MAX_AGE, la conserva entre
+requests de ese mismo hilo. El pool (``DATABASES[...]['OPTIONS']['pool']``)
+en cambio presta las conexiones ya abiertas a cualquier hilo: cada request
+toma una en su primera consulta y la devuelve al terminar, así que el
+proceso no abre más de ``tamano`` contra MySQL aunque atienda con más hilos
+(los que sobran esperan hasta ``espera`` segundos). Por eso se usa con
+CONN_MAX_AGE = 0.
+
+Con CONN_HEALTH_CHECKS cada conexión se prueba (``is_usable``, un ping en
+MySQL) antes de prestarla, y las que fallan se cierran y se reemplazan.
+
+El motor ``VENTASAPP.mysql_en_pool`` es el backend MySQL de Django con
+``ConexionesEnPool``; sin la opción ``pool`` se comporta igual que aquel.
+"""
+import functools
+import os
+import threading
+from collections import deque
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+
+
+class PoolAgotado(DatabaseError):
+    pass
+
+
+class Pool:
+    """Conexiones abiertas de una base, libres o prestadas."""
+
+    def __init__(self, tamano, espera=10):
+        if tamano < 1:
+            raise ImproperlyConfigured('El tamaño del pool de conexiones debe ser al menos 1.')
+        self.tamano = tamano
+        self.espera = espera
+        self._libres = deque()
+        self._abiertas = 0
+        self._condicion = threading.Condition()
+        self.creadas = 0
+        self.prestadas = 0
+        self.descartadas = 0
+
+    def tomar(self, crear, usable=None):
+        """(conexión, nueva): una libre que pase ``usable`` o una recién creada con ``crear()``."""
+        while True:
+            with self._condicion:
+                conexion = self._esperar_turno()
+            if conexion is None:
+                break
+            if usable is None or usable(conexion):
+                with self._condicion:
+                    self.prestadas += 1
+                return conexion, False
+            self.descartar(conexion)
+        try:
+            conexion = crear()
+        except BaseException:
+            with self._condicion:
+                self._abiertas -= 1
+                self._condicion.notify()
+            raise
+        with self._condicion:
+            self.creadas += 1
+        return conexion, True
+
+    def _esperar_turno(self):
+        # Devuelve una conexión libre, o None si ya se reservó lugar para abrir otra
+        if not self._condicion.wait_for(lambda: self._libres or self._abiertas < self.tamano, self.espera):
+            raise PoolAgotado(f'No se liberó ninguna de las {self.tamano} conexiones en {self.espera} s.')
+        if self._libres:
+            # La última devuelta: es la que menos tiempo lleva ociosa
+            return self._libres.pop()
+        self._abiertas += 1
+        return None
+
+    def devolver(self, conexion):
+        with self._condicion:
+            self._libres.append(conexion)
+            self._condicion.notify()
+
+    def descartar(self, conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+        with self._condicion:
+            self._abiertas -= 1
+            self.descartadas += 1
+            self._condicion.notify()
+
+    def cerrar(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._condicion:
+            libres, self._libres = list(self._libres), deque()
+        for conexion in libres:
+            self.descartar(conexion)
+
+    def estado(self):
+        with self._condicion:
+            return {
+                'tamano': self.tamano,
+                'abiertas': self._abiertas,
+                'libres': len(self._libres),
+                'creadas': self.creadas,
+                'prestadas': self.prestadas,
+                'descartadas': self.descartadas,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_para(alias, settings_dict):
+    """El pool del proceso para esa base, o None si no está configurado."""
+    opciones = settings_dict['OPTIONS'].get('pool')
+    if not opciones:
+        return None
+    # Por proceso: un worker creado con fork no hereda las conexiones del padre
+    clave = (os.getpid(), alias, settings_dict['NAME'])
+    with _pools_lock:
+        if clave not in _pools:
+            _pools[clave] = Pool(**opciones)
+        return _pools[clave]
+
+
+def cerrar_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.cerrar()
+
+
+class ConexionesEnPool:
+    """Mezcla para un DatabaseWrapper que saca las conexiones del pool."""
+
+    _pool = None
+    # Si la última conexión salió del pool sin abrir una nueva (ver metricas.py)
+    desde_pool = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        self._pool = pool = pool_para(self.alias, self.settings_dict)
+        if pool is None:
+            self.desde_pool = False
+            return super().get_new_connection(conn_params)
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured('El pool de conexiones se usa con CONN_MAX_AGE = 0.')
+        usable = self._usable if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        conexion, nueva = pool.tomar(functools.partial(super().get_new_connection, conn_params), usable)
+        self.desde_pool = not nueva
+        return conexion
+
+    def _usable(self, conexion):
+        anterior, self.connection = self.connection, conexion
+        try:
+            return self.is_usable()
+        finally:
+            self.connection = anterior
+
+    def _close(self):
+        pool, conexion = self._pool, self.connection
+        if pool is None or conexion is None:
+            return super()._close()
+        self._pool = None
+        # Cerrada dentro de un atomic Django la sigue referenciando: no se puede prestar
+        if self.in_atomic_block or (self.errors_occurred and not self.is_usable()):
+            pool.descartar(conexion)
+            return
+        try:
+            if not self.get_autocommit():
+                conexion.rollback()
+        except self.Database.Error:
+            pool.descartar(conexion)
+        else:
+            pool.devolver(conexion)
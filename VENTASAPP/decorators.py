@@ -1,12 +1,31 @@
 from django.shortcuts import redirect
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction
+
+from . import sesiones
+
 
 def custom_login_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper_async(request, *args, **kwargs):
+            if not await request.session.aget('usuario_id'):
+                return redirect('login')
+            if not await sesiones.avigente(request):
+                await request.session.aflush()
+                return redirect('login')
+            return await view_func(request, *args, **kwargs)
+        return wrapper_async
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.session.get('usuario_id'):
             return redirect('login')
+        if not sesiones.vigente(request):
+            # El usuario fue editado o eliminado después de iniciar sesión
+            request.session.flush()
+            return redirect('login')
         return view_func(request, *args, **kwargs)
     return wrapper
 
@@ -14,9 +33,18 @@ def custom_login_required(view_func):
 def role_required(allowed_roles=None):
     """Decorator que verifica que el rol del usuario esté en allowed_roles.
 
-    Se evita usar una lista mutable como valor por defecto.
+    Se evita usar una lista mutable como valor por defecto. Sirve también
+    para vistas asíncronas.
     """
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper_async(request, *args, **kwargs):
+                if await request.session.aget('rol') not in (allowed_roles or []):
+                    return redirect('login')
+                return await view_func(request, *args, **kwargs)
+            return wrapper_async
+
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
             roles = allowed_roles or []
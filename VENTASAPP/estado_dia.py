@@ -0,0 +1,125 @@
+"""Estado del día (abierto o cerrado) sin consultar la base en cada request.
+
+Cada proceso guarda el ControlDia de hoy en memoria. Cuando ``alternar``
+cambia el estado se envía la señal ``dia_cambiado``; su receptor borra la
+copia local y deja una marca nueva en el cache compartido ``ESTADO_DIA_CACHE``,
+que los demás procesos comparan en cada lectura. ``ESTADO_DIA_TTL`` acota
+cuánto puede durar una copia si el cache no fuera compartido.
+
+La copia sirve para decidir qué mostrar y para rechazar ventas sin consultar
+la base; nunca para aceptar una venta con el día cerrado: ``registrar_venta``
+vuelve a exigir el día abierto dentro del UPDATE de stock (ver
+``ventas.descontar_stock``).
+"""
+import threading
+import time
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal, receiver
+
+from .models import ControlDia
+
+
+CLAVE_MARCA = 'estado-dia:marca'
+
+# Enviada (con ``fecha``) después de confirmar un cambio del ControlDia
+dia_cambiado = Signal()
+
+_copias = {}  # fecha -> (ControlDia o None, marca, leido_en)
+_candado = threading.Lock()
+
+
+def _cache():
+    return caches[settings.ESTADO_DIA_CACHE]
+
+
+def _copia_vigente(fecha, marca):
+    copia = _copias.get(fecha)
+    if copia is not None:
+        control, marca_copia, leido_en = copia
+        if marca_copia == marca and time.monotonic() - leido_en < settings.ESTADO_DIA_TTL:
+            return copia
+    return None
+
+
+def _guardar(fecha, control, marca):
+    with _candado:
+        # Solo se conserva la copia de hoy
+        _copias.clear()
+        _copias[fecha] = (control, marca, time.monotonic())
+    return control
+
+
+def hoy():
+    """ControlDia de hoy (o None si aún no existe), desde la copia local."""
+    fecha = date.today()
+    marca = _cache().get(CLAVE_MARCA)
+    copia = _copia_vigente(fecha, marca)
+    if copia is not None:
+        return copia[0]
+    return _guardar(fecha, ControlDia.objects.filter(fecha=fecha).first(), marca)
+
+
+async def ahoy():
+    """Versión asíncrona de ``hoy``."""
+    fecha = date.today()
+    marca = await _cache().aget(CLAVE_MARCA)
+    copia = _copia_vigente(fecha, marca)
+    if copia is not None:
+        return copia[0]
+    return _guardar(fecha, await ControlDia.objects.filter(fecha=fecha).afirst(), marca)
+
+
+def dia_abierto(control):
+    return control is not None and control.estado == ControlDia.ESTADO_ABIERTO
+
+
+def obtener_o_crear(usuario_id):
+    """ControlDia de hoy leído de la base, creándolo cerrado si no existe."""
+    control, creado = ControlDia.objects.select_related('id_usuario').get_or_create(
+        fecha=date.today(), defaults={'id_usuario_id': usuario_id}
+    )
+    if creado:
+        notificar(control.fecha)
+    return control
+
+
+def alternar(usuario_id):
+    """Abre o cierra el día y avisa a todos los procesos al confirmar.
+
+    El SELECT ... FOR UPDATE espera a que terminen las ventas en curso, que
+    leen la fila dentro de su UPDATE de stock.
+    """
+    with transaction.atomic():
+        control, _ = ControlDia.objects.select_for_update().get_or_create(
+            fecha=date.today(), defaults={'id_usuario_id': usuario_id}
+        )
+        if control.estado == ControlDia.ESTADO_ABIERTO:
+            control.estado = ControlDia.ESTADO_CERRADO
+        else:
+            control.estado = ControlDia.ESTADO_ABIERTO
+        control.id_usuario_id = usuario_id
+        control.save(update_fields=['estado', 'id_usuario'])
+        transaction.on_commit(partial(notificar, control.fecha))
+    return control
+
+
+def olvidar():
+    """Descarta la copia local (p. ej. si una venta encontró el día cerrado)."""
+    with _candado:
+        _copias.clear()
+
+
+def notificar(fecha):
+    dia_cambiado.send(sender=ControlDia, fecha=fecha)
+
+
+@receiver(dia_cambiado)
+def _invalidar(sender, fecha, **kwargs):
+    with _candado:
+        _copias.pop(fecha, None)
+    _cache().set(CLAVE_MARCA, time.time_ns(), timeout=None)
@@ -0,0 +1,195 @@
+"""Estáticos de producción: nombres con hash, variantes comprimidas y cache sin vencimiento.
+
+``EstaticosComprimidos`` (STORAGES['staticfiles'] en modo de producción) es el
+ManifestStaticFilesStorage de Django que además, en ``collectstatic``, deja
+junto a cada archivo de texto su versión ``.gz`` y, si está instalado el
+paquete ``brotli``, la ``.br``. Solo se guardan si ahorran al menos un 5 %.
+
+``EstaticosMiddleware`` sirve STATIC_URL desde STATIC_ROOT antes de llegar a
+las vistas, al estilo de WhiteNoise: elige la variante según Accept-Encoding
+y marca como inmutables por un año los archivos con hash en el nombre; los
+nombres sin hash se guardan ``ESTATICOS_MAX_AGE`` segundos porque su
+contenido puede cambiar. El índice se arma al iniciar el proceso, así que
+después de ``collectstatic`` hay que reiniciar los workers.
+
+Las imágenes se recomprimen a WebP con ``manage.py optimizar_imagenes``.
+"""
+import gzip
+import json
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+
+COMPRIMIBLES = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico')
+AHORRO_MINIMO = 0.05
+INMUTABLE = 'public, max-age=31536000, immutable'
+# Preferencia cuando el navegador acepta varias
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def variantes(contenido):
+    """[(sufijo, bytes)] comprimidas de ``contenido`` que ahorran lo suficiente."""
+    limite = len(contenido) * (1 - AHORRO_MINIMO)
+    resultado = []
+    comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+    if len(comprimido) < limite:
+        resultado.append(('.gz', comprimido))
+    brotli = _brotli()
+    if brotli is not None:
+        comprimido = brotli.compress(contenido, quality=11)
+        if len(comprimido) < limite:
+            resultado.append(('.br', comprimido))
+    return resultado
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nombre in sorted(set(paths) | set(self.hashed_files.values())):
+            if not nombre.endswith(COMPRIMIBLES) or not self.exists(nombre):
+                continue
+            with self.open(nombre) as archivo:
+                contenido = archivo.read()
+            for sufijo, datos in variantes(contenido):
+                if self.exists(nombre + sufijo):
+                    self.delete(nombre + sufijo)
+                self._save(nombre + sufijo, ContentFile(datos))
+                yield nombre, nombre + sufijo, True
+
+
+class Archivo:
+    """Un estático con sus variantes y las cabeceras que le corresponden."""
+
+    __slots__ = ('tipo', 'variantes', 'etag', 'modificado', 'cache')
+
+    def __init__(self, ruta, inmutable):
+        info = os.stat(ruta)
+        tipo = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+        if tipo.startswith('text/') or tipo in ('application/javascript', 'application/json', 'image/svg+xml'):
+            tipo += '; charset=utf-8'
+        self.tipo = tipo
+        self.variantes = [
+            (codificacion, ruta + sufijo, os.path.getsize(ruta + sufijo))
+            for codificacion, sufijo in CODIFICACIONES if os.path.exists(ruta + sufijo)
+        ] + [(None, ruta, info.st_size)]
+        # Débil: el mismo ETag vale para las variantes comprimidas
+        self.etag = f'W/"{info.st_mtime_ns:x}-{info.st_size:x}"'
+        self.modificado = http_date(info.st_mtime)
+        self.cache = INMUTABLE if inmutable else f'public, max-age={settings.ESTATICOS_MAX_AGE}'
+
+    def _cabeceras(self, respuesta):
+        respuesta['Cache-Control'] = self.cache
+        respuesta['ETag'] = self.etag
+        respuesta['Last-Modified'] = self.modificado
+        respuesta['X-Content-Type-Options'] = 'nosniff'
+        if len(self.variantes) > 1:
+            respuesta['Vary'] = 'Accept-Encoding'
+        return respuesta
+
+    def respuesta(self, request, en_memoria=False):
+        if self.etag in request.headers.get('If-None-Match', ''):
+            return self._cabeceras(HttpResponseNotModified())
+        aceptadas = _aceptadas(request.headers.get('Accept-Encoding', ''))
+        codificacion, ruta, tamano = next(v for v in self.variantes if v[0] is None or v[0] in aceptadas)
+        if request.method == 'HEAD':
+            respuesta = HttpResponse(content_type=self.tipo)
+        elif en_memoria:
+            # Bajo ASGI: un FileResponse sería un iterador síncrono servido desde el loop
+            with open(ruta, 'rb') as archivo:
+                respuesta = HttpResponse(archivo.read(), content_type=self.tipo)
+        else:
+            respuesta = FileResponse(open(ruta, 'rb'), content_type=self.tipo)
+            del respuesta['Content-Disposition']
+        respuesta['Content-Length'] = tamano
+        if codificacion:
+            respuesta['Content-Encoding'] = codificacion
+        return self._cabeceras(respuesta)
+
+
+def _aceptadas(cabecera):
+    """Codificaciones de Accept-Encoding, sin las marcadas con q=0."""
+    aceptadas = set()
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        if parametros.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            aceptadas.add(nombre.strip().lower())
+    return aceptadas
+
+
+def indexar(raiz, manifiesto='staticfiles.json'):
+    """{ruta relativa: Archivo} de todo lo que hay en ``raiz`` (sin las variantes)."""
+    raiz = str(raiz)
+    try:
+        with open(os.path.join(raiz, manifiesto), encoding='utf-8') as archivo:
+            con_hash = set(json.load(archivo).get('paths', {}).values())
+    except (OSError, ValueError):
+        con_hash = set()
+    archivos = {}
+    for carpeta, _, nombres in os.walk(raiz):
+        for nombre in nombres:
+            ruta = os.path.join(carpeta, nombre)
+            base, sufijo = os.path.splitext(ruta)
+            if sufijo in ('.gz', '.br') and os.path.exists(base):
+                continue
+            relativa = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+            if relativa == manifiesto:
+                continue
+            archivos[relativa] = Archivo(ruta, relativa in con_hash)
+    return archivos
+
+
+class EstaticosMiddleware:
+    """Sirve los estáticos recolectados con compresión y cache largo (ver arriba)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        url = settings.STATIC_URL or ''
+        if not getattr(settings, 'ESTATICOS_SERVIR', False) or '://' in url:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefijo = '/' + url.lstrip('/')
+        self.archivos = indexar(settings.STATIC_ROOT)
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def _archivo(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefijo):
+            return self.archivos.get(request.path_info[len(self.prefijo):])
+        return None
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        archivo = self._archivo(request)
+        if archivo is not None:
+            return archivo.respuesta(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        archivo = self._archivo(request)
+        if archivo is not None:
+            # Solo los estáticos pasan por un hilo (lectura del archivo)
+            return await sync_to_async(archivo.respuesta, thread_sensitive=False)(request, en_memoria=True)
+        return await self.get_response(request)
@@ -0,0 +1,95 @@
+"""Exportación del detalle de ventas para contabilidad.
+
+Cada fila es una línea de DetalleVenta con los datos de su venta, vendedor,
+cliente y producto, leídos con JOIN en tramos de ``chunk_size`` filas
+paginados por clave (fecha, venta, línea). Cada tramo es una consulta con
+LIMIT que continúa donde terminó la anterior: la memoria usada no depende del
+largo del rango, aunque el cursor de MySQL traiga el resultado completo.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DetalleVenta
+
+
+COLUMNAS = [
+    ('id_venta__id_venta', 'ID Venta'),
+    ('id_venta__fecha', 'Fecha'),
+    ('id_venta__tipo_documento', 'Tipo Documento'),
+    ('id_venta__folio', 'Folio'),
+    ('id_venta__id_usuario__username', 'Vendedor'),
+    ('id_venta__id_cliente__rut', 'RUT Cliente'),
+    ('id_venta__id_cliente__razon_social', 'Razón Social'),
+    ('id_producto__codigo', 'Código Producto'),
+    ('id_producto__nombre', 'Producto'),
+    ('cantidad', 'Cantidad'),
+    ('precio_unitario', 'Precio Unitario'),
+    ('subtotal', 'Subtotal Línea'),
+    ('id_venta__subtotal', 'Neto Venta'),
+    ('id_venta__iva', 'IVA Venta'),
+    ('id_venta__total', 'Total Venta'),
+]
+CHUNK_SIZE = 2000
+
+
+def rango_del_periodo(desde, hasta):
+    """Fechas locales [desde, hasta] -> datetimes conscientes [inicio, fin)."""
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def filas(desde, hasta, chunk_size=CHUNK_SIZE):
+    """Genera las filas (tuplas) del detalle de ventas entre dos fechas."""
+    inicio, fin = rango_del_periodo(desde, hasta)
+    consulta = DetalleVenta.objects.filter(
+        id_venta__fecha__gte=inicio, id_venta__fecha__lt=fin
+    ).order_by('id_venta__fecha', 'id_venta_id', 'pk').values_list(*(campo for campo, _ in COLUMNAS), 'pk')
+    tramo = consulta[:chunk_size]
+    while True:
+        filas_tramo = list(tramo)
+        for *fila, _ in filas_tramo:
+            # La fecha se entrega en hora local, sin zona, como la ve el usuario
+            yield (fila[0], timezone.localtime(fila[1]).replace(tzinfo=None), *fila[2:])
+        if len(filas_tramo) < chunk_size:
+            return
+        id_venta, fecha, *_, pk = filas_tramo[-1]
+        tramo = consulta.filter(
+            Q(id_venta__fecha__gt=fecha)
+            | Q(id_venta__fecha=fecha, id_venta_id__gt=id_venta)
+            | Q(id_venta__fecha=fecha, id_venta_id=id_venta, pk__gt=pk)
+        )[:chunk_size]
+
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito (para csv.writer)."""
+
+    def write(self, valor):
+        return valor
+
+
+def csv_en_stream(desde, hasta):
+    """Genera el CSV línea a línea, con BOM para que Excel respete los tildes."""
+    escritor = csv.writer(_Eco(), delimiter=';')
+    yield '\ufeff' + escritor.writerow([titulo for _, titulo in COLUMNAS])
+    for fila in filas(desde, hasta):
+        yield escritor.writerow(fila)
+
+
+def escribir_xlsx(desde, hasta, destino):
+    """Escribe el detalle en ``destino`` (ruta o archivo) como XLSX.
+
+    Usa el modo write_only de openpyxl, que va volcando las filas al archivo
+    en lugar de mantener la planilla completa en memoria.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Ventas')
+    hoja.append([titulo for _, titulo in COLUMNAS])
+    for fila in filas(desde, hasta):
+        hoja.append(fila)
+    libro.save(destino)
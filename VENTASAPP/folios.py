@@ -0,0 +1,97 @@
+"""Asignación de folios por tipo de documento.
+
+Reemplaza el cálculo MAX(folio) + 1, que recorre todo el historial y entrega
+folios repetidos cuando dos vendedores registran al mismo tiempo. Cada tipo
+de documento tiene una fila en SecuenciaFolio que se incrementa de forma
+atómica con un UPDATE; el bloqueo de fila lo resuelve la base de datos.
+
+Con ``FOLIOS_POR_BLOQUE`` mayor a 1 cada terminal reserva un bloque de
+folios y los consume desde su propia fila de BloqueFolio, de modo que los
+terminales no compiten por la fila de la secuencia en cada venta.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+from .models import BloqueFolio, SecuenciaFolio, Venta
+
+
+def folios_por_bloque():
+    return max(1, int(getattr(settings, 'FOLIOS_POR_BLOQUE', 1)))
+
+
+def _crear_secuencia(tipo_documento):
+    """Crea la fila de la secuencia partiendo del folio más alto existente."""
+    maximo = Venta.objects.filter(tipo_documento=tipo_documento).aggregate(max_folio=Max('folio'))['max_folio']
+    try:
+        with transaction.atomic():
+            SecuenciaFolio.objects.create(tipo_documento=tipo_documento, ultimo_folio=maximo or 0)
+    except IntegrityError:
+        # Otro proceso la creó primero
+        pass
+
+
+def reservar(tipo_documento, cantidad=1):
+    """Reserva ``cantidad`` folios consecutivos y devuelve (desde, hasta).
+
+    Debe llamarse dentro de la transacción de la venta: si la venta se
+    revierte, la reserva también, y no quedan folios perdidos.
+    """
+    with transaction.atomic():
+        # El UPDATE va primero para tomar el bloqueo de la fila antes de leerla
+        secuencia = SecuenciaFolio.objects.filter(tipo_documento=tipo_documento)
+        if not secuencia.update(ultimo_folio=F('ultimo_folio') + cantidad):
+            _crear_secuencia(tipo_documento)
+            secuencia.update(ultimo_folio=F('ultimo_folio') + cantidad)
+        hasta = secuencia.values_list('ultimo_folio', flat=True).get()
+    return hasta - cantidad + 1, hasta
+
+
+def siguiente_folio(tipo_documento, terminal=None):
+    """Entrega el próximo folio, desde el bloque del terminal si corresponde."""
+    tamano = folios_por_bloque()
+    if terminal is None or tamano == 1:
+        return reservar(tipo_documento)[0]
+
+    with transaction.atomic():
+        bloque = BloqueFolio.objects.filter(tipo_documento=tipo_documento, terminal=terminal)
+        if bloque.filter(siguiente__lte=F('hasta')).update(siguiente=F('siguiente') + 1):
+            return bloque.values_list('siguiente', flat=True).get() - 1
+
+        desde, hasta = reservar(tipo_documento, tamano)
+        BloqueFolio.objects.update_or_create(
+            tipo_documento=tipo_documento,
+            terminal=terminal,
+            defaults={'siguiente': desde + 1, 'hasta': hasta},
+        )
+        return desde
+
+
+def folio_sugerido(tipo_documento, terminal=None):
+    """Folio que probablemente recibirá la próxima venta (no reserva nada)."""
+    if terminal is not None and folios_por_bloque() > 1:
+        bloque = BloqueFolio.objects.filter(
+            tipo_documento=tipo_documento, terminal=terminal, siguiente__lte=F('hasta')
+        ).values_list('siguiente', flat=True).first()
+        if bloque is not None:
+            return bloque
+
+    ultimo = SecuenciaFolio.objects.filter(tipo_documento=tipo_documento).values_list('ultimo_folio', flat=True).first()
+    if ultimo is None:
+        ultimo = Venta.objects.filter(tipo_documento=tipo_documento).aggregate(max_folio=Max('folio'))['max_folio'] or 0
+    return ultimo + 1
+
+
+async def afolio_sugerido(tipo_documento, terminal=None):
+    """Versión asíncrona de ``folio_sugerido``."""
+    if terminal is not None and folios_por_bloque() > 1:
+        bloque = await BloqueFolio.objects.filter(
+            tipo_documento=tipo_documento, terminal=terminal, siguiente__lte=F('hasta')
+        ).values_list('siguiente', flat=True).afirst()
+        if bloque is not None:
+            return bloque
+
+    ultimo = await SecuenciaFolio.objects.filter(tipo_documento=tipo_documento).values_list('ultimo_folio', flat=True).afirst()
+    if ultimo is None:
+        ultimo = (await Venta.objects.filter(tipo_documento=tipo_documento).aaggregate(max_folio=Max('folio')))['max_folio'] or 0
+    return ultimo + 1
@@ -1,6 +1,7 @@
-import re
 from django import forms
+from django.db import transaction
 from .models import Usuario, Producto, Cliente, Venta, DetalleVenta  # Importamos modelos usados en formularios
+from . import catalogo, rut
 
 
 class LoginForm(forms.Form):
@@ -57,6 +58,12 @@ class ProductoForm(forms.ModelForm):
         for field in self.fields:
             self.fields[field].widget.attrs.update({'class': 'form-control'})
 
+    def save(self, commit=True):
+        producto = super().save(commit=commit)
+        if commit:
+            transaction.on_commit(catalogo.productos.invalidar)
+        return producto
+
 
 class ClienteForm(forms.ModelForm):
     class Meta:
@@ -70,52 +77,23 @@ class ClienteForm(forms.ModelForm):
 
     def _validar_rut(self, rut_limpio):
         # Función de validación (Módulo 11)
-        try:
-            dv = rut_limpio[-1].lower()
-            cuerpo = rut_limpio[:-1]
-            if not cuerpo.isdigit():
-                return False
-            suma = 0
-            multiplo = 2
-            for i in reversed(cuerpo):
-                suma += int(i) * multiplo
-                multiplo = multiplo + 1 if multiplo < 7 else 2
-            
-            dv_esperado_num = 11 - (suma % 11)
-            
-            if dv_esperado_num == 11:
-                dv_esperado = '0'
-            elif dv_esperado_num == 10:
-                dv_esperado = 'k'
-            else:
-                dv_esperado = str(dv_esperado_num)
-            
-            return dv == dv_esperado
-        except Exception:
-            return False
+        return rut.es_valido_limpio(rut_limpio)
 
     def clean_rut(self):
-        rut = self.cleaned_data.get('rut')
-        if not rut:
+        valor = self.cleaned_data.get('rut')
+        if not valor:
             raise forms.ValidationError("El RUT es obligatorio.")
-        # 1. Limpiar el RUT de puntos y guiones
-        rut_limpio = re.sub(r'[^0-9kK]+', '', str(rut)).lower()
-        
-        # 2. Validar
+        # Limpiar, validar y formatear (Ej: 12345678-5 -> 12.345.678-5)
+        rut_limpio = rut.limpiar(valor)
         if not self._validar_rut(rut_limpio):
             raise forms.ValidationError("El RUT ingresado no es válido.")
-        # 3. Formatear (Normalizar) para guardar
-        dv = rut_limpio[-1].upper()
-        cuerpo = rut_limpio[:-1]
-        
-        # Formatear cuerpo con puntos (Ej: 12345678 -> 12.345.678)
-        cuerpo_formateado = ""
-        while len(cuerpo) > 3:
-            cuerpo_formateado = "." + cuerpo[-3:] + cuerpo_formateado
-            cuerpo = cuerpo[:-3]
-        cuerpo_formateado = cuerpo + cuerpo_formateado
-        
-        return f"{cuerpo_formateado}-{dv}"
+        return rut.formatear(rut_limpio)
+
+    def save(self, commit=True):
+        cliente = super().save(commit=commit)
+        if commit:
+            transaction.on_commit(catalogo.clientes.invalidar)
+        return cliente
 
 
 class VentaForm(forms.ModelForm):
@@ -132,6 +110,8 @@ class VentaForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Hacemos que el cliente no sea obligatorio por defecto (se valida con JS)
         self.fields['id_cliente'].required = False
+        # Las opciones las carga el POS desde el catálogo de clientes
+        self.fields['id_cliente'].queryset = Cliente.objects.none()
 
 
 class DetalleVentaForm(forms.ModelForm):
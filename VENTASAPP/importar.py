@@ -0,0 +1,133 @@
+"""Carga masiva de productos y clientes desde CSV o JSON Lines.
+
+Las filas se leen de a lotes, se validan con las mismas reglas de
+ProductoForm y ClienteForm (incluida la validación y normalización del RUT)
+y se insertan o actualizan con un único ``bulk_create(update_conflicts=True)``
+por lote. En productos, el cambio de stock de cada fila queda además en el
+libro de movimientos (ver inventario.py).
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import connection, transaction
+
+from . import catalogo, inventario
+from .forms import ClienteForm, ProductoForm
+from .models import MovimientoStock
+
+
+class _SinValidarUnicidad:
+    # La unicidad la resuelve el upsert; validarla costaría una consulta por fila
+    def validate_unique(self):
+        pass
+
+
+class ProductoImportForm(_SinValidarUnicidad, ProductoForm):
+    pass
+
+
+class ClienteImportForm(_SinValidarUnicidad, ClienteForm):
+    pass
+
+
+@dataclass(frozen=True)
+class TipoImportacion:
+    formulario: type
+    campo_unico: str
+    catalogo: catalogo.Catalogo
+    # Si las filas fijan stock, la diferencia se registra en el libro de movimientos
+    con_stock: bool = False
+
+    @property
+    def modelo(self):
+        return self.formulario._meta.model
+
+    @property
+    def campos(self):
+        return self.formulario._meta.fields
+
+
+TIPOS = {
+    'productos': TipoImportacion(ProductoImportForm, 'codigo', catalogo.productos, con_stock=True),
+    'clientes': TipoImportacion(ClienteImportForm, 'rut', catalogo.clientes),
+}
+
+
+@dataclass
+class ResultadoLote:
+    numero: int
+    validas: int = 0
+    errores: list = field(default_factory=list)  # [(linea, {campo: [mensajes]})]
+
+
+def leer_filas(archivo, formato, delimitador=','):
+    """Genera (numero_de_linea, dict) desde un archivo CSV o JSON Lines."""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo, delimiter=delimitador)
+        for fila in lector:
+            yield lector.line_num, fila
+    else:
+        for numero, linea in enumerate(archivo, start=1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, {'__error__': f'JSON inválido: {e.msg}'}
+
+
+def importar_lote(tipo, filas, numero, dry_run=False):
+    """Valida y guarda un lote de filas; devuelve su ResultadoLote."""
+    resultado = ResultadoLote(numero)
+    objetos = {}
+    for linea, datos in filas:
+        if '__error__' in datos:
+            resultado.errores.append((linea, {'__all__': [datos['__error__']]}))
+            continue
+        formulario = tipo.formulario(datos)
+        if not formulario.is_valid():
+            resultado.errores.append((linea, {campo: list(mensajes) for campo, mensajes in formulario.errors.items()}))
+            continue
+        instancia = formulario.save(commit=False)
+        # Si la clave se repite dentro del lote gana la última fila
+        objetos[getattr(instancia, tipo.campo_unico)] = instancia
+    resultado.validas = len(objetos)
+
+    if objetos and not dry_run:
+        opciones = {}
+        if connection.features.supports_update_conflicts_with_target:
+            opciones['unique_fields'] = [tipo.campo_unico]
+        with transaction.atomic():
+            if tipo.con_stock:
+                existentes = tipo.modelo.objects.select_for_update().filter(**{f'{tipo.campo_unico}__in': list(objetos)})
+                anteriores = dict(existentes.values_list('pk', 'stock'))
+            tipo.modelo.objects.bulk_create(
+                list(objetos.values()),
+                update_conflicts=True,
+                update_fields=[c for c in tipo.campos if c != tipo.campo_unico] + ['actualizado'],
+                **opciones,
+            )
+            if tipo.con_stock:
+                ids = tipo.modelo.objects.filter(**{f'{tipo.campo_unico}__in': list(objetos)}).values_list(tipo.campo_unico, 'pk')
+                inventario.registrar_cambios(
+                    {pk: objetos[clave].stock for clave, pk in ids}, anteriores, MovimientoStock.TIPO_IMPORTACION,
+                )
+    return resultado
+
+
+def importar(tipo, filas, tamano_lote=1000, dry_run=False):
+    """Importa ``filas`` de a lotes y genera un ResultadoLote por cada uno."""
+    filas = iter(filas)
+    numero = 0
+    try:
+        while True:
+            lote = list(islice(filas, tamano_lote))
+            if not lote:
+                break
+            numero += 1
+            yield importar_lote(tipo, lote, numero, dry_run=dry_run)
+    finally:
+        if numero and not dry_run:
+            transaction.on_commit(tipo.catalogo.invalidar)
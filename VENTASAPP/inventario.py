@@ -0,0 +1,116 @@
+"""Libro de movimientos de stock, snapshots y stock a una fecha.
+
+Cada cambio de ``Producto.stock`` deja filas en MovimientoStock (solo
+INSERT): una venta agrega sus salidas con un único ``bulk_create`` dentro de
+su transacción, y los ajustes manuales o importaciones registran la
+diferencia aplicada. Así el stock de un producto en un momento T es la suma
+de sus movimientos con fecha hasta T.
+
+Para no sumar toda la historia, ``tomar_snapshots`` (comando
+``snapshot_stock``, p. ej. cada noche) guarda el stock de los productos que
+se movieron desde el snapshot anterior, hasta cierto id de movimiento.
+``stock_en`` parte del último snapshot anterior a T y suma solo los
+movimientos de ese producto con id mayor.
+
+El libro protege al producto (``on_delete=PROTECT``): ``eliminar_producto``
+borra el libro junto con el producto solo si este nunca se vendió.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, Subquery, Sum
+from django.utils import timezone
+
+from .models import MovimientoStock, SnapshotStock
+
+
+# Un snapshot no incluye movimientos más nuevos que esto, para no saltarse los
+# de transacciones que aún no confirman (las ventas duran milisegundos)
+MARGEN_SNAPSHOT = timedelta(minutes=1)
+
+
+def salidas_por_venta(venta, cantidades_por_id):
+    """Registra las salidas de stock de ``venta`` (un INSERT masivo)."""
+    MovimientoStock.objects.bulk_create([
+        MovimientoStock(
+            id_producto_id=id_producto, fecha=venta.fecha, tipo=MovimientoStock.TIPO_VENTA,
+            cantidad=-cantidad, id_venta=venta, id_usuario_id=venta.id_usuario_id,
+        )
+        for id_producto, cantidad in cantidades_por_id.items()
+    ])
+
+
+def registrar_cambios(stock_nuevo, stock_anterior, tipo, id_usuario=None):
+    """Registra la diferencia entre ``stock_anterior`` y ``stock_nuevo`` ({id_producto: stock}).
+
+    Los productos sin stock anterior (recién creados) cuentan desde cero; los
+    que no cambiaron no dejan movimiento.
+    """
+    ahora = timezone.now()
+    MovimientoStock.objects.bulk_create([
+        MovimientoStock(
+            id_producto_id=id_producto, fecha=ahora, tipo=tipo,
+            cantidad=stock - stock_anterior.get(id_producto, 0), id_usuario_id=id_usuario,
+        )
+        for id_producto, stock in stock_nuevo.items()
+        if stock != stock_anterior.get(id_producto, 0)
+    ])
+
+
+def tomar_snapshots(momento=None):
+    """Guarda el stock de cada producto con movimientos desde el último snapshot.
+
+    Devuelve la cantidad de snapshots creados. Son tres consultas de lectura
+    (corte, deltas por producto, snapshot previo de cada uno) y un INSERT.
+    """
+    momento = momento or timezone.now()
+    corte = MovimientoStock.objects.filter(
+        fecha__lte=momento - MARGEN_SNAPSHOT
+    ).order_by('-id').values_list('id', flat=True).first()
+    anterior = SnapshotStock.objects.aggregate(corte=Max('ultimo_movimiento'))['corte'] or 0
+    if corte is None or corte <= anterior:
+        return 0
+
+    with transaction.atomic():
+        deltas = MovimientoStock.objects.filter(id__gt=anterior, id__lte=corte).values('id_producto').annotate(
+            delta=Sum('cantidad'), ultima=Max('fecha')
+        ).order_by().values_list('id_producto', 'delta', 'ultima')
+        ultimos = SnapshotStock.objects.filter(
+            id__in=Subquery(SnapshotStock.objects.values('id_producto').annotate(ultimo=Max('id')).values('ultimo'))
+        )
+        previos = {s.id_producto_id: s for s in ultimos}
+        nuevos = []
+        for id_producto, delta, ultima in deltas:
+            previo = previos.get(id_producto)
+            nuevos.append(SnapshotStock(
+                id_producto_id=id_producto,
+                # La fecha del snapshot es la del último movimiento que incluye
+                fecha=max(ultima, previo.fecha) if previo else ultima,
+                stock=(previo.stock if previo else 0) + delta,
+                ultimo_movimiento=corte,
+            ))
+        SnapshotStock.objects.bulk_create(nuevos, batch_size=5000)
+    return len(nuevos)
+
+
+def stock_en(id_producto, momento):
+    """Stock que tenía el producto en ``momento``: último snapshot más los movimientos siguientes."""
+    base, corte = SnapshotStock.objects.filter(
+        id_producto_id=id_producto, fecha__lte=momento
+    ).order_by('-fecha', '-id').values_list('stock', 'ultimo_movimiento').first() or (0, 0)
+    delta = MovimientoStock.objects.filter(
+        id_producto_id=id_producto, id__gt=corte, fecha__lte=momento
+    ).aggregate(delta=Sum('cantidad', default=0))['delta']
+    return base + delta
+
+
+def eliminar_producto(producto):
+    """Elimina un producto sin ventas junto con sus movimientos y snapshots.
+
+    Si tiene ventas, sus detalles (PROTECT) impiden borrarlo: se lanza
+    ``ProtectedError`` y la transacción deja el libro como estaba.
+    """
+    with transaction.atomic():
+        SnapshotStock.objects.filter(id_producto=producto).delete()
+        MovimientoStock.objects.filter(id_producto=producto).delete()
+        producto.delete()
@@ -0,0 +1,38 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from VENTASAPP import exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta el detalle de ventas de un rango de fechas a CSV o XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Fecha inicial (AAAA-MM-DD).')
+        parser.add_argument('--hasta', required=True, help='Fecha final, inclusive (AAAA-MM-DD).')
+        parser.add_argument('--formato', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--salida', help='Archivo de destino (CSV por defecto a la salida estándar).')
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde'])
+            hasta = date.fromisoformat(options['hasta'])
+        except ValueError:
+            raise CommandError('Las fechas deben tener el formato AAAA-MM-DD.')
+
+        if options['formato'] == 'xlsx':
+            if not options['salida']:
+                raise CommandError('El formato XLSX requiere --salida.')
+            exportar.escribir_xlsx(desde, hasta, options['salida'])
+            self.stderr.write(self.style.SUCCESS(f"Exportado a {options['salida']}."))
+            return
+
+        destino = open(options['salida'], 'w', encoding='utf-8', newline='') if options['salida'] else sys.stdout
+        try:
+            for linea in exportar.csv_en_stream(desde, hasta):
+                destino.write(linea)
+        finally:
+            if destino is not sys.stdout:
+                destino.close()
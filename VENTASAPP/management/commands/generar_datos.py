@@ -0,0 +1,195 @@
+import random
+import time
+from datetime import datetime, timedelta
+from datetime import time as hora
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from VENTASAPP import rut
+from VENTASAPP.models import (
+    Cliente, ControlDia, DetalleVenta, MovimientoStock, Producto, SecuenciaFolio, Usuario, Venta,
+)
+from VENTASAPP.resumenes import reconstruir, reconstruir_productos
+from VENTASAPP.ventas import TASA_IVA
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos (usuarios, productos, clientes, días y ventas con su detalle) '
+        'con inserciones masivas, para benchmarks y pruebas de carga. No usar en producción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='bench', help='Prefijo de usuarios, códigos y razones sociales.')
+        parser.add_argument('--clave', default='bench', help='Contraseña de los usuarios generados.')
+        parser.add_argument('--vendedores', type=int, default=20)
+        parser.add_argument('--jefes', type=int, default=1)
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--clientes', type=int, default=2000)
+        parser.add_argument('--dias', type=int, default=90, help='Días de historia de ventas, hasta ayer.')
+        parser.add_argument('--ventas-por-dia', type=int, default=300)
+        parser.add_argument('--lineas', type=int, default=5, help='Máximo de productos distintos por venta.')
+        parser.add_argument('--facturas', type=float, default=0.2, help='Fracción de ventas con factura.')
+        parser.add_argument('--stock', type=int, default=1000, help='Stock máximo por producto.')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT masivo.')
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        if not prefijo or len(prefijo) > 12:
+            raise CommandError('El prefijo debe tener entre 1 y 12 caracteres.')
+        if options['vendedores'] < 1 or options['productos'] < 1:
+            raise CommandError('Se necesita al menos un vendedor y un producto.')
+        if options['facturas'] > 0 and options['clientes'] < 1:
+            raise CommandError('Las facturas necesitan clientes (--clientes).')
+        if Usuario.objects.filter(username__startswith=f'{prefijo}-').exists():
+            raise CommandError(f'Ya hay datos con el prefijo "{prefijo}"; use otro --prefijo.')
+
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            vendedores = self._usuarios(prefijo, options['clave'], options['vendedores'], options['jefes'])
+            productos = self._productos(prefijo, options['productos'], options['stock'])
+            clientes = self._clientes(prefijo, options['clientes'])
+            controles = self._controles(options['dias'], vendedores[0])
+        ventas, detalles = self._ventas(
+            vendedores, productos, clientes, controles, options['ventas_por_dia'],
+            options['lineas'], options['facturas'],
+        )
+        reconstruir()
+        reconstruir_productos()
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados en {time.perf_counter() - inicio:.1f} s: {len(vendedores)} vendedores, '
+            f'{len(productos)} productos, {len(clientes)} clientes, {len(controles)} días, '
+            f'{ventas} ventas y {detalles} detalles.'
+        ))
+
+    def _usuarios(self, prefijo, clave, vendedores, jefes):
+        # Se calcula un solo hash (el hasher es lento a propósito) y se reutiliza
+        plantilla = Usuario(username=f'{prefijo}-plantilla')
+        plantilla.set_password(clave)
+        Usuario.objects.bulk_create(
+            [Usuario(username=f'{prefijo}-vendedor-{i}', password=plantilla.password, rol=Usuario.ROL_VENDEDOR)
+             for i in range(vendedores)]
+            + [Usuario(username=f'{prefijo}-jefe-{i}', password=plantilla.password, rol=Usuario.ROL_JEFE)
+               for i in range(jefes)],
+            batch_size=self.lote,
+        )
+        return list(Usuario.objects.filter(
+            username__startswith=f'{prefijo}-vendedor-'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def _productos(self, prefijo, cantidad, stock_maximo):
+        Producto.objects.bulk_create((
+            Producto(
+                codigo=f'{prefijo}-{i:06d}',
+                nombre=f'Producto {prefijo} {i}',
+                precio_unitario=Decimal(self.azar.randrange(50, 5000) * 10),
+                stock=self.azar.randint(stock_maximo // 10, stock_maximo),
+            )
+            for i in range(cantidad)
+        ), batch_size=self.lote)
+        productos = list(Producto.objects.filter(
+            codigo__startswith=f'{prefijo}-'
+        ).order_by('pk').values_list('pk', 'precio_unitario', 'stock'))
+        # El libro de stock parte con el stock inicial de cada producto, como en la migración
+        ahora = timezone.now()
+        MovimientoStock.objects.bulk_create((
+            MovimientoStock(id_producto_id=pk, fecha=ahora, tipo=MovimientoStock.TIPO_INICIAL, cantidad=stock)
+            for pk, _, stock in productos if stock > 0
+        ), batch_size=self.lote)
+        return [(pk, precio) for pk, precio, _ in productos]
+
+    def _clientes(self, prefijo, cantidad):
+        # RUTs válidos a partir de un cuerpo al azar; los que ya existan se omiten
+        base = self.azar.randrange(30_000_000, 90_000_000)
+        Cliente.objects.bulk_create((
+            Cliente(
+                rut=rut.formatear(f'{base + i}{rut.digito_verificador(str(base + i))}'),
+                razon_social=f'Cliente {prefijo} {i}',
+                giro='Comercio',
+                direccion=f'Calle {i}',
+            )
+            for i in range(cantidad)
+        ), batch_size=self.lote, ignore_conflicts=True)
+        return list(Cliente.objects.filter(
+            razon_social__startswith=f'Cliente {prefijo} '
+        ).values_list('pk', flat=True))
+
+    def _controles(self, dias, id_usuario):
+        """Un ControlDia cerrado por día de historia y el de hoy abierto."""
+        hoy = timezone.localdate()
+        fechas = [hoy - timedelta(days=d) for d in range(dias, 0, -1)]
+        ControlDia.objects.bulk_create(
+            [ControlDia(fecha=f, estado=ControlDia.ESTADO_CERRADO, id_usuario_id=id_usuario) for f in fechas],
+            ignore_conflicts=True,
+        )
+        ControlDia.objects.update_or_create(
+            fecha=hoy, defaults={'estado': ControlDia.ESTADO_ABIERTO},
+            create_defaults={'estado': ControlDia.ESTADO_ABIERTO, 'id_usuario_id': id_usuario},
+        )
+        controles = dict(ControlDia.objects.filter(fecha__in=fechas).values_list('fecha', 'pk'))
+        return [(f, controles[f]) for f in fechas]
+
+    def _ventas(self, vendedores, productos, clientes, controles, por_dia, lineas, facturas):
+        # Popularidad tipo Zipf: unos pocos productos concentran la mayoría de las ventas
+        pesos = list(accumulate(1 / (rango + 1) for rango in range(len(productos))))
+        self.azar.shuffle(productos)
+        folios = self._ultimos_folios()
+        # Ids explícitos: MySQL no devuelve las claves generadas en un INSERT masivo
+        id_venta = Venta.objects.aggregate(m=Max('id_venta'))['m'] or 0
+        ventas, detalles = [], []
+        total_ventas = total_detalles = 0
+        for fecha, id_control in controles:
+            apertura = timezone.make_aware(datetime.combine(fecha, hora(9)))
+            for segundo in sorted(self.azar.randrange(12 * 3600) for _ in range(por_dia)):
+                id_venta += 1
+                tipo = Venta.TIPO_FACTURA if self.azar.random() < facturas else Venta.TIPO_BOLETA
+                folios[tipo] += 1
+                elegidos = dict(self.azar.choices(productos, cum_weights=pesos, k=self.azar.randint(1, lineas)))
+                subtotal = Decimal('0.00')
+                for id_producto, precio in elegidos.items():
+                    cantidad = self.azar.choice((1, 1, 1, 2, 2, 3, 5))
+                    detalles.append(DetalleVenta(
+                        id_venta_id=id_venta, id_producto_id=id_producto, cantidad=cantidad,
+                        precio_unitario=precio, subtotal=precio * cantidad,
+                    ))
+                    subtotal += precio * cantidad
+                iva = (subtotal * TASA_IVA).quantize(Decimal('0.00'))
+                ventas.append(Venta(
+                    id_venta=id_venta, fecha=apertura + timedelta(seconds=segundo), tipo_documento=tipo,
+                    folio=folios[tipo], subtotal=subtotal, iva=iva, total=subtotal + iva,
+                    id_usuario_id=self.azar.choice(vendedores), id_control_id=id_control,
+                    id_cliente_id=self.azar.choice(clientes) if tipo == Venta.TIPO_FACTURA else None,
+                ))
+            if len(detalles) >= self.lote:
+                total_ventas, total_detalles = total_ventas + len(ventas), total_detalles + len(detalles)
+                self._guardar(ventas, detalles)
+                ventas, detalles = [], []
+        total_ventas, total_detalles = total_ventas + len(ventas), total_detalles + len(detalles)
+        self._guardar(ventas, detalles)
+        for tipo, ultimo in folios.items():
+            SecuenciaFolio.objects.update_or_create(tipo_documento=tipo, defaults={'ultimo_folio': ultimo})
+        return total_ventas, total_detalles
+
+    def _guardar(self, ventas, detalles):
+        with transaction.atomic():
+            Venta.objects.bulk_create(ventas, batch_size=self.lote)
+            DetalleVenta.objects.bulk_create(detalles, batch_size=self.lote)
+
+    def _ultimos_folios(self):
+        """Último folio usado por tipo, considerando los bloques ya reservados por terminales."""
+        secuencias = dict(SecuenciaFolio.objects.values_list('tipo_documento', 'ultimo_folio'))
+        return {
+            tipo: max(
+                secuencias.get(tipo, 0),
+                Venta.objects.filter(tipo_documento=tipo).aggregate(m=Max('folio'))['m'] or 0,
+            )
+            for tipo in (Venta.TIPO_BOLETA, Venta.TIPO_FACTURA)
+        }
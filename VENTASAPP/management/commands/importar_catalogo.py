@@ -0,0 +1,49 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from VENTASAPP.importar import TIPOS, importar, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Importa productos o clientes desde un archivo CSV o JSON Lines (inserta o actualiza).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(TIPOS), help='Qué se importa.')
+        parser.add_argument('archivo', help='Archivo .csv o .jsonl con una fila por registro.')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote (por defecto 1000).')
+        parser.add_argument('--delimitador', default=',', help='Separador de columnas del CSV.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida, no guarda nada.')
+        parser.add_argument('--max-errores', type=int, default=20, help='Errores a mostrar por lote.')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el archivo {ruta}.')
+        formato = 'csv' if ruta.suffix.lower() == '.csv' else 'jsonl'
+        tipo = TIPOS[options['tipo']]
+
+        total_validas = total_errores = 0
+        inicio = time.perf_counter()
+        with ruta.open(encoding='utf-8-sig', newline='') as archivo:
+            filas = leer_filas(archivo, formato, delimitador=options['delimitador'])
+            for resultado in importar(tipo, filas, tamano_lote=options['lote'], dry_run=options['dry_run']):
+                total_validas += resultado.validas
+                total_errores += len(resultado.errores)
+                estilo = self.style.WARNING if resultado.errores else self.style.SUCCESS
+                self.stdout.write(estilo(
+                    f'Lote {resultado.numero}: {resultado.validas} válidas, {len(resultado.errores)} con errores'
+                ))
+                for linea, errores in resultado.errores[:options['max_errores']]:
+                    detalle = '; '.join(f"{campo}: {' '.join(mensajes)}" for campo, mensajes in errores.items())
+                    self.stdout.write(f'  línea {linea}: {detalle}')
+
+        segundos = time.perf_counter() - inicio
+        procesadas = total_validas + total_errores
+        velocidad = procesadas / segundos if segundos else 0
+        accion = 'validadas (dry-run)' if options['dry_run'] else 'importadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_validas} filas {accion}, {total_errores} con errores, '
+            f'{segundos:.2f} s ({velocidad:,.0f} filas/s).'
+        ))
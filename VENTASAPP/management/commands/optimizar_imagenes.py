@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+EXTENSIONES = ('.png', '.jpg', '.jpeg')
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera junto a cada imagen PNG/JPEG de STATICFILES_DIRS su versión WebP, reducida a un '
+        'ancho máximo. Requiere Pillow; las .webp se versionan con el resto de los estáticos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calidad', type=int, default=80, help='Calidad WebP (0-100).')
+        parser.add_argument('--ancho-maximo', type=int, default=512, help='Ancho y alto máximos en píxeles.')
+        parser.add_argument('--forzar', action='store_true', help='Regenera aunque la .webp esté al día.')
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise CommandError('Se necesita Pillow: pip install Pillow')
+
+        lado = options['ancho_maximo']
+        for carpeta in settings.STATICFILES_DIRS:
+            for origen in sorted(Path(carpeta).rglob('*')):
+                if origen.suffix.lower() not in EXTENSIONES:
+                    continue
+                destino = origen.with_suffix('.webp')
+                if not options['forzar'] and destino.exists() and destino.stat().st_mtime >= origen.stat().st_mtime:
+                    continue
+                with Image.open(origen) as imagen:
+                    imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+                    imagen.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+                    imagen.save(destino, 'WEBP', quality=options['calidad'], method=6)
+                self.stdout.write(
+                    f'{origen.name}: {origen.stat().st_size} -> {destino.stat().st_size} bytes ({destino.name})'
+                )
@@ -0,0 +1,32 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from VENTASAPP import pronostico
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el pronóstico de demanda y las cantidades sugeridas de reposición de todos los productos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Último día de historia (AAAA-MM-DD); por defecto hoy.')
+        parser.add_argument('--dias', type=int, help='Días de historia considerados.')
+        parser.add_argument('--metodo', choices=pronostico.METODOS)
+        parser.add_argument('--plazo', type=int, help='Días que demora un pedido en llegar.')
+        parser.add_argument('--cobertura', type=int, help='Días de venta que debe cubrir cada pedido.')
+
+    def handle(self, *args, **options):
+        try:
+            hasta = date.fromisoformat(options['hasta']) if options['hasta'] else None
+        except ValueError:
+            raise CommandError('La fecha debe tener el formato AAAA-MM-DD.')
+
+        inicio = time.perf_counter()
+        por_reponer = pronostico.ejecutar(
+            hasta=hasta, dias=options['dias'], metodo=options['metodo'],
+            plazo=options['plazo'], cobertura=options['cobertura'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronóstico calculado en {time.perf_counter() - inicio:.1f} s: {por_reponer} productos por reponer.'
+        ))
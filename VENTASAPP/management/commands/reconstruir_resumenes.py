@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from VENTASAPP.resumenes import reconstruir, reconstruir_productos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes diarios de ventas y de productos desde el historial (ejecutar con el día cerrado).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Ventas leídas por lote.')
+
+    def handle(self, *args, **options):
+        filas = reconstruir(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Resumen reconstruido: {filas} filas.'))
+        filas = reconstruir_productos(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Resumen por producto reconstruido: {filas} filas.'))
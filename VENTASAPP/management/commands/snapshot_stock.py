@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from VENTASAPP.inventario import tomar_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Guarda el stock de los productos con movimientos desde el último snapshot (ejecutar periódicamente).'
+
+    def handle(self, *args, **options):
+        creados = tomar_snapshots()
+        self.stdout.write(self.style.SUCCESS(f'Snapshots creados: {creados}.'))
@@ -0,0 +1,279 @@
+"""Métricas por vista: consultas SQL, tiempo en base de datos, plantillas y total.
+
+``MetricasMiddleware`` mide cada request; el decorador ``medir`` hace lo
+mismo para una vista suelta (o para código fuera del ciclo de request) y no
+vuelve a medir si el middleware ya lo está haciendo. Las consultas se cuentan
+con un execute wrapper de la conexión y el render con el backend
+``PlantillasMedidas`` (ver TEMPLATES en settings).
+
+Cada medición va a un buffer circular del proceso (``METRICAS_CAPACIDAD``)
+del que ``resumen`` saca percentiles por vista, y al logger
+``VENTASAPP.metricas`` como una línea JSON (archivo rotativo en settings).
+El costo es un contador y dos lecturas de reloj por consulta y un append por
+request, pensado para dejarlo activo en producción.
+
+El middleware funciona igual bajo ASGI sin forzar un hilo por request. Las
+consultas se cuentan en todos los hilos porque ``_contar_consulta`` se
+instala en cada conexión al abrirse y la medición en curso viaja en un
+ContextVar, que ``sync_to_async`` copia al hilo donde corre el código.
+
+``conexiones`` cuenta las conexiones a la base que abrió cada request (señal
+``connection_created``); con CONN_MAX_AGE o el pool (conexiones.py) debería
+quedar en 0 salvo en la primera, y ``resumen`` informa qué fracción de los
+requests con consultas reusó una conexión.
+"""
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+
+logger = logging.getLogger(__name__)
+
+_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    __slots__ = ('vista', 'metodo', 'estado', 'consultas', 'conexiones', 'bd_ns', 'plantilla_ns', 'total_ns', 'momento', '_renders')
+
+    def __init__(self, metodo=''):
+        self.vista = ''
+        self.metodo = metodo
+        self.estado = 0
+        self.consultas = 0
+        self.conexiones = 0
+        self.bd_ns = 0
+        self.plantilla_ns = 0
+        self.total_ns = 0
+        self.momento = time.time()
+        self._renders = 0
+
+    def como_dict(self):
+        return {
+            'vista': self.vista,
+            'metodo': self.metodo,
+            'estado': self.estado,
+            'consultas': self.consultas,
+            'conexiones': self.conexiones,
+            'bd_ms': round(self.bd_ns / 1e6, 3),
+            'plantilla_ms': round(self.plantilla_ns / 1e6, 3),
+            'total_ms': round(self.total_ns / 1e6, 3),
+            'momento': self.momento,
+        }
+
+
+class Buffer:
+    """Últimas ``capacidad`` mediciones del proceso."""
+
+    def __init__(self, capacidad):
+        self._mediciones = deque(maxlen=capacidad)
+        self._lock = threading.Lock()
+
+    @property
+    def capacidad(self):
+        return self._mediciones.maxlen
+
+    def agregar(self, medicion):
+        with self._lock:
+            self._mediciones.append(medicion)
+
+    def copia(self):
+        with self._lock:
+            return list(self._mediciones)
+
+    def vaciar(self):
+        with self._lock:
+            self._mediciones.clear()
+
+
+buffer = Buffer(getattr(settings, 'METRICAS_CAPACIDAD', 5000))
+
+
+def _contar_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.bd_ns += time.perf_counter_ns() - inicio
+        medicion.consultas += 1
+
+
+def _instalar(conexion):
+    if _contar_consulta not in conexion.execute_wrappers:
+        # Al principio de la lista: los execute_wrapper() temporales sacan siempre el último
+        conexion.execute_wrappers.insert(0, _contar_consulta)
+
+
+def _conexion_abierta(sender, connection, **kwargs):
+    _instalar(connection)
+    medicion = _actual.get()
+    # Las que entrega el pool ya estaban abiertas
+    if medicion is not None and not getattr(connection, 'desde_pool', False):
+        medicion.conexiones += 1
+
+
+connection_created.connect(_conexion_abierta, dispatch_uid='metricas_conexiones')
+
+
+def _registrar(medicion, request, respuesta, vista):
+    resolucion = getattr(request, 'resolver_match', None)
+    medicion.vista = vista or (resolucion.view_name if resolucion else request.path)
+    medicion.estado = respuesta.status_code
+    buffer.agregar(medicion)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(medicion.como_dict()))
+    return respuesta
+
+
+def medir_llamada(funcion, request, vista=None):
+    """Ejecuta ``funcion()`` (que atiende ``request``) midiéndola."""
+    _instalar(connection)
+    medicion = Medicion(request.method)
+    token = _actual.set(medicion)
+    inicio = time.perf_counter_ns()
+    try:
+        respuesta = funcion()
+    finally:
+        medicion.total_ns = time.perf_counter_ns() - inicio
+        _actual.reset(token)
+    return _registrar(medicion, request, respuesta, vista)
+
+
+async def amedir_llamada(corrutina, request, vista=None):
+    """Versión asíncrona de ``medir_llamada``: espera ``corrutina`` midiéndola."""
+    medicion = Medicion(request.method)
+    token = _actual.set(medicion)
+    inicio = time.perf_counter_ns()
+    try:
+        respuesta = await corrutina
+    finally:
+        medicion.total_ns = time.perf_counter_ns() - inicio
+        _actual.reset(token)
+    return _registrar(medicion, request, respuesta, vista)
+
+
+def medir(vista):
+    """Decorador: mide la vista aunque no pase por ``MetricasMiddleware``."""
+    @functools.wraps(vista)
+    def _envoltura(request, *args, **kwargs):
+        if _actual.get() is not None:
+            return vista(request, *args, **kwargs)
+        return medir_llamada(lambda: vista(request, *args, **kwargs), request, vista=vista.__name__)
+    return _envoltura
+
+
+class MetricasMiddleware:
+    """Mide cada request completo (incluido el resto del middleware)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_ACTIVAS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        return medir_llamada(lambda: self.get_response(request), request)
+
+    async def __acall__(self, request):
+        return await amedir_llamada(self.get_response(request), request)
+
+
+class ArchivoRotativo(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler que crea la carpeta del log al abrirlo por primera vez."""
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class PlantillaMedida(Template):
+
+    def render(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return super().render(context, request)
+        # Solo el render más externo suma, para no contar dos veces un render anidado
+        medicion._renders += 1
+        inicio = time.perf_counter_ns()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion._renders -= 1
+            if not medicion._renders:
+                medicion.plantilla_ns += time.perf_counter_ns() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend DjangoTemplates que suma el tiempo de render a la medición en curso."""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name).template, self)
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+
+def resumen(recientes=0):
+    """Percentiles y promedios por vista sobre el buffer del proceso."""
+    mediciones = buffer.copia()
+    por_vista = defaultdict(list)
+    for medicion in mediciones:
+        por_vista[medicion.vista].append(medicion)
+
+    vistas = {}
+    for vista, grupo in sorted(por_vista.items()):
+        totales = sorted(m.total_ns / 1e6 for m in grupo)
+        consultas = [m.consultas for m in grupo]
+        con_consultas = [m for m in grupo if m.consultas]
+        cantidad = len(grupo)
+        vistas[vista] = {
+            'requests': cantidad,
+            'errores': sum(1 for m in grupo if m.estado >= 500),
+            'total_ms': {p: round(_percentil(totales, n), 3) for p, n in (('p50', 50), ('p95', 95), ('p99', 99))},
+            'total_max_ms': round(totales[-1], 3),
+            'consultas_promedio': round(sum(consultas) / cantidad, 2),
+            'consultas_max': max(consultas),
+            'conexiones_abiertas': sum(m.conexiones for m in grupo),
+            'conexion_reusada': (
+                round(sum(1 for m in con_consultas if not m.conexiones) / len(con_consultas), 3)
+                if con_consultas else None
+            ),
+            'bd_promedio_ms': round(sum(m.bd_ns for m in grupo) / cantidad / 1e6, 3),
+            'plantilla_promedio_ms': round(sum(m.plantilla_ns for m in grupo) / cantidad / 1e6, 3),
+        }
+    return {
+        'proceso': os.getpid(),
+        'capacidad': buffer.capacidad,
+        'mediciones': len(mediciones),
+        'vistas': vistas,
+        'recientes': [m.como_dict() for m in mediciones[-recientes:]] if recientes else [],
+    }
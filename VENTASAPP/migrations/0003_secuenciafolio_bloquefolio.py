@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:25
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def inicializar_secuencias(apps, schema_editor):
+    # Parte cada secuencia desde el folio más alto ya registrado
+    Venta = apps.get_model('VENTASAPP', 'Venta')
+    SecuenciaFolio = apps.get_model('VENTASAPP', 'SecuenciaFolio')
+    maximos = Venta.objects.values('tipo_documento').annotate(max_folio=Max('folio'))
+    SecuenciaFolio.objects.bulk_create([
+        SecuenciaFolio(tipo_documento=fila['tipo_documento'], ultimo_folio=fila['max_folio'])
+        for fila in maximos
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0002_venta_folio_alter_venta_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaFolio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_documento', models.CharField(choices=[('Boleta', 'Boleta'), ('Factura', 'Factura')], max_length=20, unique=True)),
+                ('ultimo_folio', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BloqueFolio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_documento', models.CharField(choices=[('Boleta', 'Boleta'), ('Factura', 'Factura')], max_length=20)),
+                ('terminal', models.CharField(max_length=50)),
+                ('siguiente', models.IntegerField()),
+                ('hasta', models.IntegerField()),
+            ],
+            options={
+                'unique_together': {('tipo_documento', 'terminal')},
+            },
+        ),
+        migrations.RunPython(inicializar_secuencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:26
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def resumir_ventas(apps, schema_editor):
+    # Sin esto los reportes mostrarían en cero todos los días anteriores a la migración.
+    # Misma agregación que resumenes.reconstruir, copiada para no depender del código actual.
+    Venta = apps.get_model('VENTASAPP', 'Venta')
+    ResumenVentaDiaria = apps.get_model('VENTASAPP', 'ResumenVentaDiaria')
+    db = schema_editor.connection.alias
+    acumulado = defaultdict(lambda: [0, Decimal('0'), Decimal('0'), Decimal('0')])
+    ventas = Venta.objects.using(db).values_list(
+        'fecha', 'tipo_documento', 'id_usuario_id', 'subtotal', 'iva', 'total'
+    ).order_by().iterator(chunk_size=2000)
+    for fecha, tipo_documento, id_usuario, subtotal, iva, total in ventas:
+        dia = timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+        fila = acumulado[(dia, tipo_documento, id_usuario)]
+        fila[0] += 1
+        fila[1] += subtotal
+        fila[2] += iva
+        fila[3] += total
+    ResumenVentaDiaria.objects.using(db).bulk_create([
+        ResumenVentaDiaria(
+            fecha=dia, tipo_documento=tipo_documento, id_usuario_id=id_usuario,
+            cantidad=cantidad, subtotal=subtotal, iva=iva, total=total,
+        )
+        for (dia, tipo_documento, id_usuario), (cantidad, subtotal, iva, total) in acumulado.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0003_secuenciafolio_bloquefolio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo_documento', models.CharField(choices=[('Boleta', 'Boleta'), ('Factura', 'Factura')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('iva', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('fecha', 'tipo_documento', 'id_usuario')},
+            },
+        ),
+        migrations.RunPython(resumir_ventas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0004_resumenventadiaria'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detalleventa',
+            index=models.Index(fields=['id_producto', 'id_venta'], name='detalle_producto_venta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha', 'id_usuario'], name='venta_fecha_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha', 'tipo_documento', 'id_usuario', 'subtotal', 'iva', 'total'], name='venta_fecha_reporte_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0005_indices_reportes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0006_actualizado_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['razon_social', 'id'], name='cliente_razon_social_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['nombre', 'id'], name='producto_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['stock', 'id'], name='producto_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0007_indices_listados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
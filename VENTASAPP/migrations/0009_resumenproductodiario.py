@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:03
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def resumir_productos(apps, schema_editor):
+    # La analítica y el pronóstico leen solo este resumen: se carga con el historial existente.
+    # Misma agregación que resumenes.reconstruir_productos, copiada para no depender del código actual.
+    DetalleVenta = apps.get_model('VENTASAPP', 'DetalleVenta')
+    ResumenProductoDiario = apps.get_model('VENTASAPP', 'ResumenProductoDiario')
+    db = schema_editor.connection.alias
+    acumulado = defaultdict(lambda: [0, Decimal('0')])
+    detalles = DetalleVenta.objects.using(db).values_list(
+        'id_venta__fecha', 'id_producto_id', 'cantidad', 'subtotal'
+    ).order_by().iterator(chunk_size=2000)
+    for fecha, id_producto, cantidad, subtotal in detalles:
+        dia = timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+        fila = acumulado[(dia, id_producto)]
+        fila[0] += cantidad
+        fila[1] += subtotal
+    ResumenProductoDiario.objects.using(db).bulk_create([
+        ResumenProductoDiario(fecha=dia, id_producto_id=id_producto, unidades=unidades, monto=monto)
+        for (dia, id_producto), (unidades, monto) in acumulado.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0008_venta_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenProductoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='VENTASAPP.producto')),
+            ],
+            options={
+                'unique_together': {('fecha', 'id_producto')},
+            },
+        ),
+        migrations.RunPython(resumir_productos, migrations.RunPython.noop),
+    ]
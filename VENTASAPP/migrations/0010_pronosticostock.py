@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0009_resumenproductodiario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoStock',
+            fields=[
+                ('id_producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='VENTASAPP.producto')),
+                ('stock', models.IntegerField()),
+                ('demanda_diaria', models.FloatField()),
+                ('dias_hasta_quiebre', models.FloatField(null=True)),
+                ('sugerido', models.PositiveIntegerField(default=0)),
+                ('calculado', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dias_hasta_quiebre', 'id_producto'], name='pronostico_quiebre_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def saldos_iniciales(apps, schema_editor):
+    # El libro parte con el stock actual de cada producto como movimiento inicial
+    Producto = apps.get_model('VENTASAPP', 'Producto')
+    MovimientoStock = apps.get_model('VENTASAPP', 'MovimientoStock')
+    ahora = django.utils.timezone.now()
+    MovimientoStock.objects.bulk_create((
+        MovimientoStock(id_producto_id=id_producto, fecha=ahora, tipo='Inicial', cantidad=stock)
+        for id_producto, stock in Producto.objects.filter(stock__gt=0).values_list('id', 'stock').iterator()
+    ), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0010_pronosticostock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tipo', models.CharField(choices=[('Inicial', 'Inicial'), ('Venta', 'Venta'), ('Ajuste', 'Ajuste'), ('Importación', 'Importación')], max_length=20)),
+                ('cantidad', models.IntegerField()),
+                ('id_producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='VENTASAPP.producto')),
+                ('id_usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('id_venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='VENTASAPP.venta')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['id_producto', 'id'], name='movimiento_producto_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+                ('ultimo_movimiento', models.BigIntegerField()),
+                ('id_producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='VENTASAPP.producto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['id_producto', 'fecha'], name='snapshot_producto_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(saldos_iniciales, migrations.RunPython.noop),
+    ]
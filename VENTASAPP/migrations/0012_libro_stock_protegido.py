@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('VENTASAPP', '0011_libro_movimientos_stock'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientostock',
+            name='id_producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='VENTASAPP.producto'),
+        ),
+        migrations.AlterField(
+            model_name='snapshotstock',
+            name='id_producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='VENTASAPP.producto'),
+        ),
+    ]
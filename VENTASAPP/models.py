@@ -52,6 +52,13 @@ class Cliente(models.Model):
     razon_social = models.CharField(max_length=100)
     giro = models.CharField(max_length=100)
     direccion = models.CharField(max_length=150)
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Orden del listado paginado por cursor
+            models.Index(fields=['razon_social', 'id'], name='cliente_razon_social_idx'),
+        ]
 
     def __str__(self):
         return self.rut
@@ -62,6 +69,14 @@ class Producto(models.Model):
     nombre = models.CharField(max_length=100)
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Órdenes del listado paginado por cursor
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_idx'),
+            models.Index(fields=['stock', 'id'], name='producto_stock_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -101,9 +116,20 @@ class Venta(models.Model):
     id_usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
     id_cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, null=True, blank=True)
     id_control = models.ForeignKey(ControlDia, on_delete=models.PROTECT)
+    # Generada por el POS; un reenvío con la misma clave devuelve la venta ya registrada
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     class Meta:
         unique_together = ('tipo_documento', 'folio')
+        indexes = [
+            # Rango de fechas por vendedor (reportes, exportaciones)
+            models.Index(fields=['fecha', 'id_usuario'], name='venta_fecha_usuario_idx'),
+            # Cubre las agregaciones del reporte sin leer la fila completa
+            models.Index(
+                fields=['fecha', 'tipo_documento', 'id_usuario', 'subtotal', 'iva', 'total'],
+                name='venta_fecha_reporte_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Venta {self.id_venta}"
@@ -116,6 +142,134 @@ class DetalleVenta(models.Model):
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Ventas de un producto con su venta asociada (análisis por producto)
+            models.Index(fields=['id_producto', 'id_venta'], name='detalle_producto_venta_idx'),
+        ]
+
     def __str__(self):
         return f"Venta {self.id_venta.id_venta} - {self.id_producto.nombre} x {self.cantidad}"
 
+
+class SecuenciaFolio(models.Model):
+    """Último folio entregado por tipo de documento (una fila por tipo)."""
+    tipo_documento = models.CharField(max_length=20, choices=Venta.TIPO_CHOICES, unique=True)
+    ultimo_folio = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.tipo_documento} - {self.ultimo_folio}"
+
+
+class BloqueFolio(models.Model):
+    """Rango de folios reservado por un terminal: [siguiente, hasta]."""
+    tipo_documento = models.CharField(max_length=20, choices=Venta.TIPO_CHOICES)
+    terminal = models.CharField(max_length=50)
+    siguiente = models.IntegerField()
+    hasta = models.IntegerField()
+
+    class Meta:
+        unique_together = ('tipo_documento', 'terminal')
+
+    def __str__(self):
+        return f"{self.tipo_documento} {self.terminal}: {self.siguiente}-{self.hasta}"
+
+
+class ResumenVentaDiaria(models.Model):
+    """Totales de ventas acumulados por día, tipo de documento y vendedor."""
+    fecha = models.DateField()
+    tipo_documento = models.CharField(max_length=20, choices=Venta.TIPO_CHOICES)
+    id_usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
+    cantidad = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    iva = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('fecha', 'tipo_documento', 'id_usuario')
+
+    def __str__(self):
+        return f"{self.fecha} - {self.tipo_documento} - {self.id_usuario_id}"
+
+
+class ResumenProductoDiario(models.Model):
+    """Unidades y monto neto vendidos por día y producto."""
+    fecha = models.DateField()
+    id_producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
+    unidades = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('fecha', 'id_producto')
+
+    def __str__(self):
+        return f"{self.fecha} - {self.id_producto_id}"
+
+
+class PronosticoStock(models.Model):
+    """Último pronóstico de demanda y reposición de un producto (ver pronostico.py)."""
+    id_producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True)
+    stock = models.IntegerField()
+    demanda_diaria = models.FloatField()
+    # Null si el producto no tiene demanda en la historia considerada
+    dias_hasta_quiebre = models.FloatField(null=True)
+    sugerido = models.PositiveIntegerField(default=0)
+    calculado = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Listado de productos por reponer, los más urgentes primero
+            models.Index(fields=['dias_hasta_quiebre', 'id_producto'], name='pronostico_quiebre_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id_producto_id}: {self.sugerido}"
+
+
+class MovimientoStock(models.Model):
+    """Cambio de stock de un producto; la tabla solo recibe INSERT (ver inventario.py)."""
+    TIPO_INICIAL = 'Inicial'
+    TIPO_VENTA = 'Venta'
+    TIPO_AJUSTE = 'Ajuste'
+    TIPO_IMPORTACION = 'Importación'
+    TIPO_CHOICES = [
+        (TIPO_INICIAL, TIPO_INICIAL),
+        (TIPO_VENTA, TIPO_VENTA),
+        (TIPO_AJUSTE, TIPO_AJUSTE),
+        (TIPO_IMPORTACION, TIPO_IMPORTACION),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # PROTECT: el historial no se va en cascada; inventario.eliminar_producto lo borra solo sin ventas
+    id_producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
+    fecha = models.DateTimeField(default=timezone.now)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    # Con signo: negativo en una venta, la diferencia aplicada en un ajuste
+    cantidad = models.IntegerField()
+    id_venta = models.ForeignKey(Venta, on_delete=models.SET_NULL, null=True, blank=True)
+    id_usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Reproducción desde un snapshot: movimientos de un producto posteriores a él
+            models.Index(fields=['id_producto', 'id'], name='movimiento_producto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id_producto_id} {self.tipo} {self.cantidad:+d}"
+
+
+class SnapshotStock(models.Model):
+    """Stock de un producto considerando sus movimientos hasta ``ultimo_movimiento``."""
+    id_producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
+    fecha = models.DateTimeField()
+    stock = models.IntegerField()
+    ultimo_movimiento = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_producto', 'fecha'], name='snapshot_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id_producto_id} @ {self.fecha}: {self.stock}"
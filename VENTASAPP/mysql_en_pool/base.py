@@ -0,0 +1,8 @@
+"""Backend MySQL de Django con el pool de conexiones de VENTASAPP/conexiones.py."""
+from django.db.backends.mysql import base
+
+from ..conexiones import ConexionesEnPool
+
+
+class DatabaseWrapper(ConexionesEnPool, base.DatabaseWrapper):
+    pass
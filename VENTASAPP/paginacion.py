@@ -0,0 +1,101 @@
+"""Paginación por cursor (keyset) para los listados de administración.
+
+En vez de OFFSET, cada página pide las filas que vienen después (o antes)
+de la última fila vista, según el orden elegido y la clave primaria como
+desempate. Con un índice sobre (campo de orden, id) el costo de cualquier
+página es el mismo sin importar el tamaño de la tabla.
+"""
+from django.core import signing
+from django.db.models import Q
+
+
+POR_PAGINA = 50
+SAL_CURSOR = 'VENTASAPP.paginacion'
+
+
+class Pagina:
+
+    def __init__(self, items, request, orden, ordenes, hay_siguiente, hay_anterior):
+        self.items = items
+        self.orden = orden
+        self.ordenes = ordenes
+        self.filtro = request.GET.get('q', '')
+        self.hay_siguiente = hay_siguiente
+        self.hay_anterior = hay_anterior
+        self._request = request
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _url(self, direccion, fila):
+        parametros = self._request.GET.copy()
+        parametros.pop('despues', None)
+        parametros.pop('antes', None)
+        campo = self.orden.lstrip('-')
+        parametros[direccion] = signing.dumps([str(getattr(fila, campo)), fila.pk], salt=SAL_CURSOR)
+        return f'?{parametros.urlencode()}'
+
+    @property
+    def url_siguiente(self):
+        return self._url('despues', self.items[-1]) if self.hay_siguiente and self.items else None
+
+    @property
+    def url_anterior(self):
+        return self._url('antes', self.items[0]) if self.hay_anterior and self.items else None
+
+
+def _leer_cursor(valor):
+    try:
+        return signing.loads(valor, salt=SAL_CURSOR)
+    except signing.BadSignature:
+        return None
+
+
+def paginar(request, queryset, ordenes, por_pagina=POR_PAGINA, busqueda=()):
+    """Devuelve la Pagina pedida en ``request``.
+
+    ``ordenes`` es una lista de (campo, etiqueta) permitidos; el primero es el
+    orden por defecto. Se acepta ``?orden=-campo`` para orden descendente,
+    ``?q=`` para filtrar por los campos de ``busqueda`` y ``?despues=`` /
+    ``?antes=`` con el cursor de la página vecina.
+    """
+    permitidos = {campo for campo, _ in ordenes}
+    orden = request.GET.get('orden', '')
+    if orden.lstrip('-') not in permitidos:
+        orden = ordenes[0][0]
+    campo = orden.lstrip('-')
+    descendente = orden.startswith('-')
+
+    filtro = request.GET.get('q', '').strip()
+    if filtro and busqueda:
+        condicion = Q()
+        for campo_busqueda in busqueda:
+            condicion |= Q(**{f'{campo_busqueda}__icontains': filtro})
+        queryset = queryset.filter(condicion)
+
+    despues = _leer_cursor(request.GET['despues']) if request.GET.get('despues') else None
+    antes = _leer_cursor(request.GET['antes']) if request.GET.get('antes') else None
+    hacia_atras = antes is not None and despues is None
+    cursor = antes if hacia_atras else despues
+
+    # Hacia atrás se recorre en orden inverso y luego se da vuelta la página
+    ascendente = descendente == hacia_atras
+    if cursor is not None:
+        valor, pk = cursor
+        operador = 'gt' if ascendente else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{campo}__{operador}': valor}) | Q(**{campo: valor, f'pk__{operador}': pk})
+        )
+    signo = '' if ascendente else '-'
+    queryset = queryset.order_by(f'{signo}{campo}', f'{signo}pk')
+
+    filas = list(queryset[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+        return Pagina(filas, request, orden, ordenes, hay_siguiente=True, hay_anterior=hay_mas)
+    return Pagina(filas, request, orden, ordenes, hay_siguiente=hay_mas, hay_anterior=cursor is not None)
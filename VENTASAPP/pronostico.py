@@ -0,0 +1,143 @@
+"""Pronóstico de demanda y sugerencias de reposición de stock.
+
+La historia de ventas se arma como una matriz productos x días a partir de
+ResumenProductoDiario (el detalle de ventas ya agregado por día) y la demanda
+de todos los productos se calcula de una vez con NumPy:
+
+* ``media``: promedio de los últimos ``ventana`` días.
+* ``exponencial``: suavizado exponencial simple; el nivel final es una suma
+  ponderada de la historia, así que es un solo producto matriz-vector.
+
+Con la demanda diaria se obtienen los días hasta quebrar stock y, para los
+productos que están bajo su punto de reorden, la cantidad a pedir para cubrir
+el plazo de reposición más ``cobertura`` días, con stock de seguridad.
+El resultado queda en PronosticoStock para que la vista no recalcule.
+"""
+import math
+from dataclasses import dataclass
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Producto, PronosticoStock, ResumenProductoDiario
+
+
+METODOS = ('exponencial', 'media')
+
+
+def parametros(**cambios):
+    """Parámetros por defecto (``PRONOSTICO`` en settings) con ``cambios`` aplicados."""
+    base = {
+        'dias': 365,
+        'metodo': 'exponencial',
+        'alfa': 0.3,
+        'ventana': 28,
+        'plazo': 7,
+        'cobertura': 21,
+        'z': 1.65,
+    }
+    base.update(getattr(settings, 'PRONOSTICO', {}))
+    base.update({clave: valor for clave, valor in cambios.items() if valor is not None})
+    if base['metodo'] not in METODOS:
+        raise ValueError(f"Método de pronóstico desconocido: {base['metodo']}")
+    return base
+
+
+@dataclass
+class Resultado:
+    demanda: np.ndarray
+    dias_hasta_quiebre: np.ndarray
+    sugerido: np.ndarray
+
+
+def matriz_ventas(filas_producto, columnas_dia, unidades, productos, dias):
+    """Matriz densa productos x días a partir de las tripletas del resumen.
+
+    ``filas_producto`` y ``columnas_dia`` son índices ya calculados; las
+    tripletas son únicas por (producto, día), como en el resumen diario.
+    """
+    matriz = np.zeros((productos, dias), dtype=np.float32)
+    matriz[filas_producto, columnas_dia] = unidades
+    return matriz
+
+
+def demanda_media(matriz, ventana):
+    return matriz[:, -ventana:].mean(axis=1)
+
+
+def demanda_exponencial(matriz, alfa):
+    """Nivel final del suavizado exponencial S_t = alfa*x_t + (1-alfa)*S_{t-1}, S_0 = x_0."""
+    dias = matriz.shape[1]
+    pesos = alfa * (1 - alfa) ** np.arange(dias - 1, -1, -1, dtype=np.float64)
+    pesos[0] = (1 - alfa) ** (dias - 1)
+    return matriz @ pesos.astype(matriz.dtype)
+
+
+def calcular(matriz, stock, metodo='exponencial', alfa=0.3, ventana=28, plazo=7, cobertura=21, z=1.65, **_):
+    """Demanda diaria, días hasta quiebre y cantidad sugerida para cada fila."""
+    if metodo == 'media':
+        demanda = demanda_media(matriz, ventana)
+    else:
+        demanda = demanda_exponencial(matriz, alfa)
+    demanda = demanda.astype(np.float64)
+    stock = np.maximum(np.asarray(stock, dtype=np.float64), 0)
+
+    seguridad = z * matriz[:, -ventana:].std(axis=1, dtype=np.float64) * np.sqrt(plazo)
+    punto_reorden = demanda * plazo + seguridad
+    objetivo = demanda * (plazo + cobertura) + seguridad
+    hay_demanda = demanda > 0
+
+    dias_hasta_quiebre = np.full(demanda.shape, np.inf)
+    np.divide(stock, demanda, out=dias_hasta_quiebre, where=hay_demanda)
+    sugerido = np.where(hay_demanda & (stock <= punto_reorden), np.ceil(objetivo - stock), 0)
+    return Resultado(demanda, dias_hasta_quiebre, np.maximum(sugerido, 0).astype(np.int64))
+
+
+def historia(hasta, dias):
+    """Ids y stock de todos los productos y su matriz de ventas diarias hasta ``hasta``."""
+    ids, stock = np.array(
+        Producto.objects.order_by('pk').values_list('pk', 'stock'), dtype=np.int64
+    ).reshape(-1, 2).T
+    desde = hasta - timedelta(days=dias - 1)
+    ventas = ResumenProductoDiario.objects.filter(
+        fecha__gte=desde, fecha__lte=hasta, unidades__gt=0
+    ).order_by().values_list('id_producto_id', 'fecha', 'unidades')
+
+    productos, columnas, unidades = [], [], []
+    for id_producto, fecha, cantidad in ventas.iterator(chunk_size=10_000):
+        productos.append(id_producto)
+        columnas.append((fecha - desde).days)
+        unidades.append(cantidad)
+    # ids está ordenado, así que searchsorted da la fila de cada producto
+    filas = np.searchsorted(ids, np.array(productos, dtype=np.int64))
+    return ids, stock, matriz_ventas(filas, np.array(columnas, dtype=np.int64), unidades, len(ids), dias)
+
+
+def ejecutar(hasta=None, **cambios):
+    """Recalcula el pronóstico de todos los productos y lo guarda.
+
+    Devuelve la cantidad de productos que conviene reponer.
+    """
+    opciones = parametros(**cambios)
+    hasta = hasta or timezone.localdate()
+    ids, stock, matriz = historia(hasta, opciones['dias'])
+    resultado = calcular(matriz, stock, **opciones)
+
+    ahora = timezone.now()
+    filas = [
+        PronosticoStock(
+            id_producto_id=id_producto, stock=existencia, demanda_diaria=demanda,
+            dias_hasta_quiebre=None if math.isinf(dias) else dias, sugerido=sugerido, calculado=ahora,
+        )
+        for id_producto, existencia, demanda, dias, sugerido in zip(
+            ids.tolist(), stock.tolist(), resultado.demanda.tolist(),
+            resultado.dias_hasta_quiebre.tolist(), resultado.sugerido.tolist(),
+        )
+    ]
+    with transaction.atomic():
+        PronosticoStock.objects.all().delete()
+        PronosticoStock.objects.bulk_create(filas, batch_size=5000)
+    return int((resultado.sugerido > 0).sum())
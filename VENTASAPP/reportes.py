@@ -0,0 +1,135 @@
+"""Reportes de ventas por período (día, semana, mes o rango) con comparación.
+
+Todo se lee de ResumenVentaDiaria, nunca de Venta: un año son a lo más 366
+filas para la serie diaria más una fila por vendedor y por tipo de documento,
+sin importar cuántas ventas tenga el período. Cada desglose trae en la misma
+consulta los totales del período anterior, usando agregación condicional.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import ResumenVentaDiaria
+
+
+TIPOS_PERIODO = [
+    ('dia', 'Día'),
+    ('semana', 'Semana'),
+    ('mes', 'Mes'),
+    ('rango', 'Rango'),
+]
+MAXIMO_DIAS = 3 * 366
+CAMPOS = ('cantidad', 'subtotal', 'iva', 'total')
+
+
+class PeriodoInvalido(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Periodo:
+    tipo: str
+    desde: date
+    hasta: date
+
+    @property
+    def dias(self):
+        return (self.hasta - self.desde).days + 1
+
+    def anterior(self):
+        """Período equivalente inmediatamente antes de este."""
+        if self.tipo == 'mes':
+            hasta = self.desde - timedelta(days=1)
+            return Periodo('mes', hasta.replace(day=1), hasta)
+        return Periodo(self.tipo, self.desde - timedelta(days=self.dias), self.desde - timedelta(days=1))
+
+
+def periodo(tipo, fecha=None, desde=None, hasta=None):
+    """Arma el Periodo pedido; ``fecha`` es cualquier día dentro de él."""
+    fecha = fecha or timezone.localdate()
+    if tipo == 'dia':
+        return Periodo('dia', fecha, fecha)
+    if tipo == 'semana':
+        lunes = fecha - timedelta(days=fecha.weekday())
+        return Periodo('semana', lunes, lunes + timedelta(days=6))
+    if tipo == 'mes':
+        inicio = fecha.replace(day=1)
+        siguiente = (inicio + timedelta(days=32)).replace(day=1)
+        return Periodo('mes', inicio, siguiente - timedelta(days=1))
+    if tipo == 'rango':
+        if desde is None or hasta is None or desde > hasta:
+            raise PeriodoInvalido('El rango debe tener fecha de inicio y de término, en ese orden.')
+        if (hasta - desde).days + 1 > MAXIMO_DIAS:
+            raise PeriodoInvalido(f'El rango no puede superar {MAXIMO_DIAS} días.')
+        return Periodo('rango', desde, hasta)
+    raise PeriodoInvalido(f'Tipo de período desconocido: {tipo}')
+
+
+def variacion(actual, anterior):
+    """Variación porcentual, o None si el período anterior no tuvo ventas."""
+    if not anterior:
+        return None
+    return (Decimal(actual) - Decimal(anterior)) * 100 / Decimal(anterior)
+
+
+def _con_anterior(filas, periodo_actual, anterior, agrupar_por):
+    """Agrupa sumando por separado el período actual y el anterior."""
+    en_actual = Q(fecha__gte=periodo_actual.desde)
+    en_anterior = Q(fecha__lte=anterior.hasta)
+    sumas = {}
+    for campo in CAMPOS:
+        # Django no permite que una anotación se llame igual que el campo
+        sumas[f'{campo}_actual'] = Sum(campo, filter=en_actual, default=0)
+        sumas[f'{campo}_anterior'] = Sum(campo, filter=en_anterior, default=0)
+    resultado = []
+    for fila in filas.values(agrupar_por).annotate(**sumas).order_by(agrupar_por):
+        for campo in CAMPOS:
+            fila[campo] = fila.pop(f'{campo}_actual')
+        fila['variacion'] = variacion(fila['total'], fila['total_anterior'])
+        resultado.append(fila)
+    return resultado
+
+
+def generar(periodo_actual):
+    """Datos del reporte: totales, serie diaria y desgloses con comparación.
+
+    Son tres consultas sobre el resumen diario: la serie del período, el
+    desglose por tipo de documento y el desglose por vendedor (estos dos
+    incluyen el período anterior).
+    """
+    anterior = periodo_actual.anterior()
+    ambos = ResumenVentaDiaria.objects.filter(fecha__gte=anterior.desde, fecha__lte=periodo_actual.hasta)
+
+    por_dia = {
+        fila['fecha']: fila
+        for fila in ResumenVentaDiaria.objects.filter(
+            fecha__gte=periodo_actual.desde, fecha__lte=periodo_actual.hasta
+        ).values('fecha').annotate(**{f'{campo}_dia': Sum(campo) for campo in CAMPOS}).order_by('fecha')
+    }
+    vacio = {f'{campo}_dia': 0 for campo in CAMPOS}
+    serie = [
+        {'fecha': dia, **{campo: por_dia.get(dia, vacio)[f'{campo}_dia'] for campo in CAMPOS}}
+        for dia in (periodo_actual.desde + timedelta(days=i) for i in range(periodo_actual.dias))
+    ]
+
+    por_documento = _con_anterior(ambos, periodo_actual, anterior, 'tipo_documento')
+    por_vendedor = _con_anterior(ambos, periodo_actual, anterior, 'id_usuario__username')
+
+    totales = {campo: sum((f[campo] for f in por_documento), 0) for campo in CAMPOS}
+    totales_anterior = {campo: sum((f[f'{campo}_anterior'] for f in por_documento), 0) for campo in CAMPOS}
+    comparacion = {campo: variacion(totales[campo], totales_anterior[campo]) for campo in CAMPOS}
+
+    return {
+        'periodo': periodo_actual,
+        'anterior': anterior,
+        'totales': totales,
+        'totales_anterior': totales_anterior,
+        'comparacion': comparacion,
+        'serie': serie,
+        'maximo_diario': max((d['total'] for d in serie), default=0),
+        'por_documento': por_documento,
+        'por_vendedor': por_vendedor,
+    }
@@ -0,0 +1,120 @@
+"""Resumen diario de ventas, mantenido de forma incremental.
+
+Cada venta suma sus montos a la fila (fecha, tipo_documento, vendedor) dentro
+de la misma transacción en que se registra, así los reportes leen unas pocas
+filas en vez de recorrer todas las ventas del día. Lo mismo por producto en
+ResumenProductoDiario, que alimenta la analítica de productos.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .models import DetalleVenta, ResumenProductoDiario, ResumenVentaDiaria, Venta
+
+
+def _fecha_local(fecha):
+    return timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+
+
+def acumular_venta(venta):
+    """Suma la venta a su fila de resumen (un UPDATE, o un INSERT la primera vez)."""
+    clave = {
+        'fecha': _fecha_local(venta.fecha),
+        'tipo_documento': venta.tipo_documento,
+        'id_usuario_id': venta.id_usuario_id,
+    }
+    incremento = {
+        'cantidad': F('cantidad') + 1,
+        'subtotal': F('subtotal') + venta.subtotal,
+        'iva': F('iva') + venta.iva,
+        'total': F('total') + venta.total,
+    }
+    fila = ResumenVentaDiaria.objects.filter(**clave)
+    if fila.update(**incremento):
+        return
+    try:
+        with transaction.atomic():
+            ResumenVentaDiaria.objects.create(
+                cantidad=1, subtotal=venta.subtotal, iva=venta.iva, total=venta.total, **clave
+            )
+    except IntegrityError:
+        # Otra venta creó la fila en paralelo
+        fila.update(**incremento)
+
+
+def acumular_productos(venta, detalles):
+    """Suma las líneas de la venta a sus filas (fecha, producto).
+
+    Siempre son dos consultas, tenga el carro una línea o cien: un INSERT que
+    ignora las filas ya existentes (las crea en cero la primera vez que el
+    producto se vende en el día) y un UPDATE con CASE que suma a todas.
+    """
+    fecha = _fecha_local(venta.fecha)
+    unidades, montos = [], []
+    for detalle in detalles:
+        unidades.append(When(id_producto_id=detalle.id_producto_id, then=Value(detalle.cantidad)))
+        montos.append(When(id_producto_id=detalle.id_producto_id, then=Value(detalle.subtotal)))
+    ResumenProductoDiario.objects.bulk_create(
+        [ResumenProductoDiario(fecha=fecha, id_producto_id=d.id_producto_id) for d in detalles],
+        ignore_conflicts=True,
+    )
+    ResumenProductoDiario.objects.filter(
+        fecha=fecha, id_producto_id__in=[d.id_producto_id for d in detalles]
+    ).update(
+        unidades=F('unidades') + Case(*unidades, default=Value(0), output_field=PositiveIntegerField()),
+        monto=F('monto') + Case(*montos, default=Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    )
+
+
+def reconstruir_productos(chunk_size=2000):
+    """Recalcula el resumen por producto desde el detalle de ventas.
+
+    Devuelve la cantidad de filas de resumen generadas.
+    """
+    acumulado = defaultdict(lambda: [0, Decimal('0')])
+    detalles = DetalleVenta.objects.values_list(
+        'id_venta__fecha', 'id_producto_id', 'cantidad', 'subtotal'
+    ).order_by().iterator(chunk_size=chunk_size)
+    for fecha, id_producto, cantidad, subtotal in detalles:
+        fila = acumulado[(_fecha_local(fecha), id_producto)]
+        fila[0] += cantidad
+        fila[1] += subtotal
+
+    with transaction.atomic():
+        ResumenProductoDiario.objects.all().delete()
+        ResumenProductoDiario.objects.bulk_create([
+            ResumenProductoDiario(fecha=fecha, id_producto_id=id_producto, unidades=unidades, monto=monto)
+            for (fecha, id_producto), (unidades, monto) in acumulado.items()
+        ], batch_size=chunk_size)
+    return len(acumulado)
+
+
+def reconstruir(chunk_size=2000):
+    """Recalcula el resumen completo desde el historial de ventas.
+
+    Devuelve la cantidad de filas de resumen generadas.
+    """
+    acumulado = defaultdict(lambda: [0, Decimal('0'), Decimal('0'), Decimal('0')])
+    ventas = Venta.objects.values_list(
+        'fecha', 'tipo_documento', 'id_usuario_id', 'subtotal', 'iva', 'total'
+    ).order_by().iterator(chunk_size=chunk_size)
+    for fecha, tipo_documento, id_usuario, subtotal, iva, total in ventas:
+        fila = acumulado[(_fecha_local(fecha), tipo_documento, id_usuario)]
+        fila[0] += 1
+        fila[1] += subtotal
+        fila[2] += iva
+        fila[3] += total
+
+    with transaction.atomic():
+        ResumenVentaDiaria.objects.all().delete()
+        ResumenVentaDiaria.objects.bulk_create([
+            ResumenVentaDiaria(
+                fecha=fecha, tipo_documento=tipo_documento, id_usuario_id=id_usuario,
+                cantidad=cantidad, subtotal=subtotal, iva=iva, total=total,
+            )
+            for (fecha, tipo_documento, id_usuario), (cantidad, subtotal, iva, total) in acumulado.items()
+        ], batch_size=chunk_size)
+    return len(acumulado)
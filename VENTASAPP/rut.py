@@ -0,0 +1,124 @@
+"""Validación y normalización de RUT chileno (módulo 11).
+
+Tiene dos caminos con las mismas reglas que usaba ClienteForm:
+
+* ``es_valido`` / ``normalizar`` para un RUT a la vez (formularios);
+* ``validar_lote`` / ``normalizar_lote`` para listas grandes (importaciones,
+  deduplicación), que calculan el dígito verificador de todos los RUT juntos
+  con aritmética de NumPy sobre una matriz de dígitos.
+
+NumPy se importa solo al usar el camino por lotes.
+"""
+import re
+import string
+from operator import mul
+
+
+_NO_RUT = re.compile(r'[^0-9kK]+')
+# Tabla para str.translate que borra todo carácter ASCII que no sea dígito o k/K
+_BORRAR = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if c not in string.digits + 'kK'
+))
+_BORRAR_LOTE = {k: v for k, v in _BORRAR.items() if k != ord('\n')}
+_PESOS = (2, 3, 4, 5, 6, 7)
+# Pesos ya repetidos para cuerpos de hasta 30 dígitos (zip corta al más corto)
+_PESOS_CICLO = _PESOS * 5
+_SEPARADOR = '\n'
+
+
+def limpiar(rut):
+    """Deja solo dígitos y 'k', en minúsculas: '12.345.678-K' -> '12345678k'."""
+    rut = str(rut)
+    if rut.isascii():
+        return rut.translate(_BORRAR).lower()
+    return _NO_RUT.sub('', rut).lower()
+
+
+def digito_verificador(cuerpo):
+    """Dígito verificador ('0'-'9' o 'k') de un cuerpo numérico."""
+    if len(cuerpo) > len(_PESOS_CICLO):
+        pesos = _PESOS * (len(cuerpo) // 6 + 1)
+    else:
+        pesos = _PESOS_CICLO
+    suma = sum(map(mul, map(int, reversed(cuerpo)), pesos))
+    resto = 11 - (suma % 11)
+    if resto == 11:
+        return '0'
+    if resto == 10:
+        return 'k'
+    return str(resto)
+
+
+def es_valido_limpio(rut_limpio):
+    cuerpo, dv = rut_limpio[:-1], rut_limpio[-1:]
+    return cuerpo.isdigit() and cuerpo.isascii() and digito_verificador(cuerpo) == dv
+
+
+def es_valido(rut):
+    return es_valido_limpio(limpiar(rut))
+
+
+def formatear(rut_limpio):
+    """'12345678k' -> '12.345.678-K' (no valida)."""
+    cuerpo, dv = rut_limpio[:-1], rut_limpio[-1]
+    if cuerpo.isdigit() and cuerpo[0] != '0':
+        return f"{int(cuerpo):,}".replace(',', '.') + f'-{dv.upper()}'
+    # Con ceros a la izquierda se agrupa el texto tal cual, como antes
+    cabeza = len(cuerpo) % 3 or 3
+    grupos = [cuerpo[:cabeza]] + [cuerpo[i:i + 3] for i in range(cabeza, len(cuerpo), 3)]
+    return f"{'.'.join(grupos)}-{dv.upper()}"
+
+
+def normalizar(rut):
+    """RUT formateado con puntos y guion, o None si no es válido."""
+    limpio = limpiar(rut)
+    return formatear(limpio) if es_valido_limpio(limpio) else None
+
+
+def validar_lote(ruts):
+    """Arreglo booleano de NumPy con la validez de cada RUT de ``ruts``."""
+    import numpy as np
+
+    return _validar_limpios(np, limpiar_lote(ruts))
+
+
+def limpiar_lote(ruts):
+    """``limpiar`` sobre una lista completa, con un solo translate si se puede."""
+    ruts = [str(r) for r in ruts]
+    texto = _SEPARADOR.join(ruts)
+    if texto.isascii():
+        limpios = texto.translate(_BORRAR_LOTE).lower().split(_SEPARADOR)
+        # Si algún RUT traía el separador adentro, el split no cuadra
+        if len(limpios) == len(ruts):
+            return limpios
+    return [limpiar(r) for r in ruts]
+
+
+def _validar_limpios(np, limpios):
+    cantidad = len(limpios)
+    if not cantidad:
+        return np.zeros(0, dtype=bool)
+    largos = np.fromiter((len(s) for s in limpios), dtype=np.int64, count=cantidad)
+    ancho = max(2, int(largos.max()))
+
+    # Matriz cantidad x ancho de códigos ASCII, rellena con '0' a la izquierda
+    # (los ceros a la izquierda no cambian la suma ponderada)
+    texto = ''.join(s.rjust(ancho, '0') for s in limpios).encode('ascii')
+    matriz = np.frombuffer(texto, dtype=np.uint8).reshape(cantidad, ancho)
+    digitos = matriz[:, :-1].astype(np.int64) - ord('0')
+    dv = matriz[:, -1]
+
+    solo_digitos = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+    pesos = np.resize(np.array(_PESOS, dtype=np.int64), ancho - 1)[::-1]
+    resto = 11 - (digitos @ pesos) % 11
+    esperado = np.where(resto == 11, ord('0'), np.where(resto == 10, ord('k'), ord('0') + resto))
+    return solo_digitos & (largos >= 2) & (dv == esperado)
+
+
+def normalizar_lote(ruts):
+    """Lista con cada RUT formateado, o None en los que no son válidos."""
+    import numpy as np
+
+    limpios = limpiar_lote(ruts)
+    validos = _validar_limpios(np, limpios)
+    return [formatear(s) if ok else None for s, ok in zip(limpios, validos.tolist())]
@@ -0,0 +1,66 @@
+"""Sesiones sin consultas a la base de datos.
+
+El motor de sesión se elige con ``SESSION_ENGINE`` (por defecto el cache
+``sesiones``) y el rol viaja dentro de la sesión, así que los decoradores de
+``decorators.py`` no leen ``django_session`` ni ``Usuario`` en cada request.
+
+Para que editar o eliminar un usuario corte sus sesiones abiertas, ``revocar``
+deja en el cache ``SESIONES_CACHE`` la hora de revocación del usuario y
+``vigente`` rechaza toda sesión iniciada antes de esa hora. La marca dura lo
+mismo que una sesión (``SESSION_COOKIE_AGE``), que es todo lo que hace falta.
+Con varios procesos el cache debe ser compartido (archivo, Redis, etc.) y no
+puede descartar entradas antes de que venzan, por eso no es el de las sesiones.
+Una sesión con ``inicio`` en el futuro (más allá de ``DESFASE_MAXIMO``, por
+relojes de distintos servidores) se rechaza: solo puede ser fabricada.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Nanosegundos que el inicio de una sesión puede adelantarse al reloj local
+DESFASE_MAXIMO = 60 * 10**9
+
+
+def _cache():
+    return caches[settings.SESIONES_CACHE]
+
+
+def _clave(usuario_id):
+    return f'sesion-revocada:{usuario_id}'
+
+
+def iniciar(request, usuario):
+    """Guarda en la sesión los datos que usan los decoradores y las plantillas."""
+    revocada = _cache().get(_clave(usuario.id_usuario), 0)
+    request.session.cycle_key()
+    request.session['usuario_id'] = usuario.id_usuario
+    request.session['username'] = usuario.username
+    request.session['rol'] = usuario.rol
+    # Estrictamente posterior a la última revocación, aunque el reloj sea grueso
+    request.session['inicio'] = max(time.time_ns(), revocada + 1)
+
+
+def vigente(request):
+    """False si la sesión fue revocada después de iniciarse o dice empezar en el futuro."""
+    usuario_id = request.session.get('usuario_id')
+    return _vigente(request.session.get('inicio', 0), _cache().get(_clave(usuario_id)))
+
+
+async def avigente(request):
+    """Versión asíncrona de ``vigente``."""
+    usuario_id = await request.session.aget('usuario_id')
+    revocada = await _cache().aget(_clave(usuario_id))
+    return _vigente(await request.session.aget('inicio', 0), revocada)
+
+
+def _vigente(inicio, revocada):
+    if inicio > time.time_ns() + DESFASE_MAXIMO:
+        return False
+    return revocada is None or inicio > revocada
+
+
+def revocar(usuario_id):
+    """Invalida todas las sesiones abiertas hasta ahora de ``usuario_id``."""
+    _cache().set(_clave(usuario_id), time.time_ns(), timeout=settings.SESSION_COOKIE_AGE)
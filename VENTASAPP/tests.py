@@ -1,3 +1,1665 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    acceso, analitica, busqueda, catalogo, conexiones, estado_dia, estaticos, exportar, folios, inventario, metricas,
+    paginacion, pronostico, reportes, resumenes, rut,
+)
+from .forms import ClienteForm, ProductoForm
+from .models import (
+    Cliente, ControlDia, DetalleVenta, MovimientoStock, Producto, PronosticoStock, ResumenProductoDiario, ResumenVentaDiaria,
+    SecuenciaFolio, SnapshotStock, Usuario, Venta,
+)
+from .ventas import DiaCerrado, StockInsuficiente, registrar_lote_pos, registrar_venta, registrar_venta_pos
+
+
+def en_hilos(funcion, hilos):
+    """Ejecuta ``funcion(i)`` en paralelo y devuelve los resultados y errores."""
+    resultados, errores = [], []
+    barrera = threading.Barrier(hilos)
+
+    def trabajo(i):
+        try:
+            barrera.wait()
+            resultados.append(funcion(i))
+        except Exception as e:  # pragma: no cover - se reporta en la aserción
+            errores.append(e)
+        finally:
+            connection.close()
+
+    trabajadores = [threading.Thread(target=trabajo, args=(i,)) for i in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    return resultados, errores
+
+
+class ConcurrenciaTestCase(TransactionTestCase):
+    """Pruebas con varios hilos; SQLite en memoria no las soporta."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Requiere una base de datos que admita conexiones concurrentes')
+        super().setUp()
+
+
+class RegistrarVentaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave', rol=Usuario.ROL_VENDEDOR)
+        cls.control = ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=cls.vendedor)
+        Producto.objects.bulk_create([
+            Producto(codigo=f'P{i}', nombre=f'Producto {i}', precio_unitario=Decimal('1000.00'), stock=5)
+            for i in range(20)
+        ])
+
+    def _registrar(self, productos_data, folio=1):
+        return registrar_venta(
+            tipo_documento=Venta.TIPO_BOLETA,
+            folio=folio,
+            productos_data=productos_data,
+            id_usuario=self.vendedor.pk,
+            control=self.control,
+        )
+
+    def test_consultas_constantes_por_tamano_de_carro(self):
+        self._registrar([{'codigo': 'P0', 'cantidad': 1}], folio=99)
+        for folio, lineas in enumerate((1, 20), start=1):
+            carro = [{'codigo': f'P{i}', 'cantidad': 1} for i in range(lineas)]
+            # SAVEPOINT, SELECT FOR UPDATE, INSERT venta, INSERT detalles, UPDATE stock,
+            # INSERT movimientos, UPDATE resumen, INSERT y UPDATE resumen por producto, RELEASE
+            with self.assertNumQueries(10):
+                self._registrar(carro, folio=folio)
+
+    def test_totales_y_stock(self):
+        venta = self._registrar([{'codigo': 'P0', 'cantidad': 2}, {'codigo': 'P0', 'cantidad': 1}])
+        self.assertEqual(venta.subtotal, Decimal('3000.00'))
+        self.assertEqual(venta.iva, Decimal('570.00'))
+        self.assertEqual(venta.total, Decimal('3570.00'))
+        self.assertEqual(DetalleVenta.objects.get(id_venta=venta).cantidad, 3)
+        self.assertEqual(Producto.objects.get(codigo='P0').stock, 2)
+
+    def test_rechaza_sobreventa_sin_dejar_rastros(self):
+        with self.assertRaises(StockInsuficiente):
+            self._registrar([{'codigo': 'P1', 'cantidad': 1}, {'codigo': 'P2', 'cantidad': 6}])
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(Producto.objects.get(codigo='P1').stock, 5)
+
+    def test_resumen_diario_incremental_y_reconstruido(self):
+        self._registrar([{'codigo': 'P3', 'cantidad': 1}], folio=1)
+        self._registrar([{'codigo': 'P3', 'cantidad': 2}], folio=2)
+        resumen = ResumenVentaDiaria.objects.get()
+        self.assertEqual((resumen.fecha, resumen.cantidad, resumen.total), (timezone.localdate(), 2, Decimal('3570.00')))
+
+        ResumenVentaDiaria.objects.update(cantidad=0, total=0)
+        self.assertEqual(resumenes.reconstruir(), 1)
+        resumen = ResumenVentaDiaria.objects.get()
+        self.assertEqual((resumen.cantidad, resumen.subtotal, resumen.total), (2, Decimal('3000.00'), Decimal('3570.00')))
+
+    def test_resumen_por_producto(self):
+        self._registrar([{'codigo': 'P3', 'cantidad': 1}, {'codigo': 'P4', 'cantidad': 2}], folio=1)
+        self._registrar([{'codigo': 'P3', 'cantidad': 2}], folio=2)
+        filas = dict(ResumenProductoDiario.objects.values_list('id_producto__codigo', 'unidades'))
+        self.assertEqual(filas, {'P3': 3, 'P4': 2})
+        self.assertEqual(ResumenProductoDiario.objects.get(id_producto__codigo='P3').monto, Decimal('3000.00'))
+
+        ResumenProductoDiario.objects.update(unidades=0)
+        self.assertEqual(resumenes.reconstruir_productos(), 2)
+        filas = dict(ResumenProductoDiario.objects.values_list('id_producto__codigo', 'unidades'))
+        self.assertEqual(filas, {'P3': 3, 'P4': 2})
+
+    def test_migraciones_cargan_el_historial(self):
+        self._registrar([{'codigo': 'P3', 'cantidad': 1}, {'codigo': 'P4', 'cantidad': 2}], folio=1)
+        ResumenVentaDiaria.objects.all().delete()
+        ResumenProductoDiario.objects.all().delete()
+
+        # Con los modelos históricos de cada migración, como en un migrate real
+        editor, cargador = connection.schema_editor(), MigrationLoader(connection)
+        migraciones = (('0004_resumenventadiaria', 'resumir_ventas'), ('0009_resumenproductodiario', 'resumir_productos'))
+        for nombre, funcion in migraciones:
+            historicos = cargador.project_state(('VENTASAPP', nombre)).apps
+            getattr(import_module(f'VENTASAPP.migrations.{nombre}'), funcion)(historicos, editor)
+        self.assertEqual(ResumenVentaDiaria.objects.get().cantidad, 1)
+        filas = dict(ResumenProductoDiario.objects.values_list('id_producto__codigo', 'unidades'))
+        self.assertEqual(filas, {'P3': 1, 'P4': 2})
+
+
+class FoliosTests(TestCase):
+
+    def test_secuencia_parte_del_historial(self):
+        vendedor = Usuario.objects.create_user(username='v', password='clave')
+        control = ControlDia.objects.create(fecha=date.today(), id_usuario=vendedor)
+        Venta.objects.create(
+            tipo_documento=Venta.TIPO_BOLETA, folio=41, subtotal=0, iva=0, total=0,
+            id_usuario=vendedor, id_control=control,
+        )
+        self.assertEqual(folios.folio_sugerido(Venta.TIPO_BOLETA), 42)
+        self.assertEqual(folios.siguiente_folio(Venta.TIPO_BOLETA), 42)
+        self.assertEqual(folios.siguiente_folio(Venta.TIPO_FACTURA), 1)
+
+    def test_asignacion_en_consultas_constantes(self):
+        folios.siguiente_folio(Venta.TIPO_BOLETA)
+        # SAVEPOINT, UPDATE, SELECT, RELEASE
+        with self.assertNumQueries(4):
+            folios.siguiente_folio(Venta.TIPO_BOLETA)
+
+    @override_settings(FOLIOS_POR_BLOQUE=5)
+    def test_bloques_por_terminal(self):
+        a = [folios.siguiente_folio(Venta.TIPO_BOLETA, terminal='a') for _ in range(3)]
+        b = [folios.siguiente_folio(Venta.TIPO_BOLETA, terminal='b') for _ in range(3)]
+        self.assertEqual(a, [1, 2, 3])
+        self.assertEqual(b, [6, 7, 8])
+        self.assertEqual(folios.folio_sugerido(Venta.TIPO_BOLETA, terminal='a'), 4)
+        self.assertEqual(SecuenciaFolio.objects.get(tipo_documento=Venta.TIPO_BOLETA).ultimo_folio, 10)
+
+
+class FoliosConcurrenciaTests(ConcurrenciaTestCase):
+    HILOS = 8
+    POR_HILO = 40
+
+    def _asignar(self, terminal=None):
+        def trabajo(i):
+            asignados = []
+            for _ in range(self.POR_HILO):
+                with transaction.atomic():
+                    asignados.append(folios.siguiente_folio(
+                        Venta.TIPO_BOLETA, terminal=f't{i}' if terminal else None
+                    ))
+            return asignados
+
+        resultados, errores = en_hilos(trabajo, self.HILOS)
+        self.assertEqual(errores, [])
+        return sorted(f for asignados in resultados for f in asignados)
+
+    def test_sin_duplicados_ni_saltos(self):
+        total = self.HILOS * self.POR_HILO
+        self.assertEqual(self._asignar(), list(range(1, total + 1)))
+
+    @override_settings(FOLIOS_POR_BLOQUE=10)
+    def test_bloques_sin_duplicados_ni_saltos(self):
+        # Cada terminal consume bloques completos, así que no quedan saltos
+        total = self.HILOS * self.POR_HILO
+        self.assertEqual(self._asignar(terminal=True), list(range(1, total + 1)))
+
+
+class PlanesDeConsultaTests(TestCase):
+    """Las consultas frecuentes deben resolverse con índices, nunca con un scan completo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendedores = [Usuario.objects.create_user(username=f'v{i}', password='clave') for i in range(5)]
+        control = ControlDia.objects.create(fecha=date.today(), id_usuario=vendedores[0])
+        productos = Producto.objects.bulk_create([
+            Producto(codigo=f'P{i}', nombre=f'Producto {i}', precio_unitario=Decimal('500.00'), stock=10)
+            for i in range(200)
+        ])
+        ventas = Venta.objects.bulk_create([
+            Venta(
+                tipo_documento=Venta.TIPO_BOLETA, folio=i, subtotal=Decimal('500.00'), iva=Decimal('95.00'),
+                total=Decimal('595.00'), id_usuario=vendedores[i % 5], id_control=control,
+                fecha=timezone.now() - timedelta(hours=i),
+            )
+            for i in range(1, 1001)
+        ])
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(
+                id_venta=venta, id_producto=productos[i % 200], cantidad=1,
+                precio_unitario=Decimal('500.00'), subtotal=Decimal('500.00'),
+            )
+            for i, venta in enumerate(ventas)
+        ])
+        resumenes.reconstruir()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                modelos = [Usuario, ControlDia, Producto, Venta, DetalleVenta, ResumenVentaDiaria, SecuenciaFolio]
+                tablas = ', '.join(connection.ops.quote_name(modelo._meta.db_table) for modelo in modelos)
+                cursor.execute(f'ANALYZE TABLE {tablas}')
+                cursor.fetchall()
+            else:
+                cursor.execute('ANALYZE')
+        cls.vendedor = vendedores[0]
+
+    def assertSinScanCompleto(self, queryset):
+        if connection.vendor == 'mysql':
+            plan = queryset.explain(format='JSON')
+            self.assertNotIn('"access_type": "ALL"', plan, plan)
+        else:
+            plan = queryset.explain()
+            scans = [
+                linea for linea in plan.splitlines()
+                if re.search(r'\bSCAN\b', linea) and 'INDEX' not in linea
+            ]
+            self.assertEqual(scans, [], plan)
+
+    def _rango_hoy(self):
+        inicio = timezone.now() - timedelta(days=1)
+        return inicio, timezone.now()
+
+    def test_ventas_por_rango_de_fecha(self):
+        qs = Venta.objects.filter(fecha__range=self._rango_hoy()).values('tipo_documento').annotate(total=Sum('total'))
+        self.assertSinScanCompleto(qs)
+
+    def test_ventas_por_rango_y_vendedor(self):
+        qs = Venta.objects.filter(fecha__range=self._rango_hoy(), id_usuario=self.vendedor)
+        self.assertSinScanCompleto(qs)
+
+    def test_venta_por_folio(self):
+        self.assertSinScanCompleto(Venta.objects.filter(tipo_documento=Venta.TIPO_BOLETA, folio=10))
+
+    def test_secuencia_de_folio(self):
+        self.assertSinScanCompleto(SecuenciaFolio.objects.filter(tipo_documento=Venta.TIPO_BOLETA))
+
+    def test_resumen_del_dia(self):
+        qs = ResumenVentaDiaria.objects.filter(fecha=timezone.localdate()).values('id_usuario__username').annotate(
+            total=Sum('total')
+        )
+        self.assertSinScanCompleto(qs)
+
+    def test_detalles_de_ventas_del_dia(self):
+        qs = DetalleVenta.objects.filter(id_venta__fecha__range=self._rango_hoy()).select_related('id_producto')
+        self.assertSinScanCompleto(qs)
+
+    def test_detalles_por_producto(self):
+        self.assertSinScanCompleto(DetalleVenta.objects.filter(id_producto__codigo='P1').values('id_venta'))
+
+    def test_productos_del_carro(self):
+        self.assertSinScanCompleto(Producto.objects.filter(codigo__in=['P1', 'P2', 'P3']))
+
+    def test_control_del_dia(self):
+        self.assertSinScanCompleto(ControlDia.objects.filter(fecha=date.today()))
+
+
+class CatalogoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave')
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=10)
+        Producto.objects.create(codigo='A2', nombre='Goma', precio_unitario=Decimal('200.00'), stock=0)
+
+    def setUp(self):
+        catalogo.productos.invalidar()
+        self.client.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+
+    def test_catalogo_completo_y_304(self):
+        respuesta = self.client.get(reverse('catalogo_productos'))
+        datos = respuesta.json()
+        self.assertTrue(datos['completo'])
+        self.assertEqual([p['codigo'] for p in datos['productos']], ['A1'])
+
+        respuesta = self.client.get(reverse('catalogo_productos'), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_cache_local_evita_consultas(self):
+        self.client.get(reverse('catalogo_productos'))
+        # El catálogo sale de la memoria del proceso y la sesión de la cookie
+        with self.assertNumQueries(0):
+            self.client.get(reverse('catalogo_productos'))
+
+    def test_modo_incremental_e_invalidacion(self):
+        version = self.client.get(reverse('catalogo_productos')).json()['version']
+        formulario = ProductoForm(
+            {'codigo': 'A2', 'nombre': 'Goma', 'precio_unitario': '200', 'stock': 5},
+            instance=Producto.objects.get(codigo='A2'),
+        )
+        self.assertTrue(formulario.is_valid())
+        with self.captureOnCommitCallbacks() as callbacks:
+            formulario.save(commit=False)
+        self.assertEqual(callbacks, [])
+        # La invalidación espera al commit, para no volver a guardar la versión anterior
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            formulario.save()
+            self.assertEqual(self.client.get(reverse('catalogo_productos')).json()['version'], version)
+        self.assertEqual(len(callbacks), 1)
+
+        completo = self.client.get(reverse('catalogo_productos')).json()
+        self.assertNotEqual(completo['version'], version)
+        self.assertEqual(len(completo['productos']), 2)
+
+        cambios = self.client.get(reverse('catalogo_productos'), {'desde': version}).json()
+        self.assertFalse(cambios['completo'])
+        self.assertIn('A2', [p['codigo'] for p in cambios['productos']])
+
+    def test_version_fuera_de_rango(self):
+        for desde in ('9' * 30 + '.1', '-' + '9' * 30, 'x.1'):
+            self.assertEqual(self.client.get(reverse('catalogo_productos'), {'desde': desde}).status_code, 400)
+
+
+class BusquedaProductosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Producto.objects.bulk_create([
+            Producto(codigo='LAP-01', nombre='Lápiz grafito HB', precio_unitario=Decimal('300.00'), stock=10),
+            Producto(codigo='LAP-02', nombre='Lápiz pasta azul', precio_unitario=Decimal('350.00'), stock=0),
+            Producto(codigo='CUA-01', nombre='Cuaderno universitario', precio_unitario=Decimal('1990.00'), stock=4),
+        ])
+
+    def setUp(self):
+        self.indice = busqueda.IndiceProductos()
+
+    def _codigos(self, consulta, **kwargs):
+        return [r['codigo'] for r in self.indice.buscar(consulta, **kwargs)]
+
+    def test_prefijo_subcadena_y_tildes(self):
+        self.assertEqual(self._codigos('lapiz'), ['LAP-01'])
+        self.assertEqual(self._codigos('lapiz', solo_con_stock=False), ['LAP-01', 'LAP-02'])
+        self.assertEqual(self._codigos('cua'), ['CUA-01'])
+        self.assertEqual(self._codigos('versit'), ['CUA-01'])
+        self.assertEqual(self._codigos('grafito hb'), ['LAP-01'])
+        self.assertEqual(self._codigos(''), [])
+
+    def test_limite(self):
+        self.assertEqual(len(self._codigos('l', limite=1, solo_con_stock=False)), 1)
+
+    def test_actualizacion_incremental(self):
+        self._codigos('lapiz')
+        producto = Producto.objects.get(codigo='CUA-01')
+        producto.nombre = 'Lápiz mina'
+        producto.save()
+        self.indice.marcar_pendiente()
+        self.assertEqual(self._codigos('lapiz'), ['CUA-01', 'LAP-01'])
+        self.assertEqual(self._codigos('cuaderno'), [])
+
+        Producto.objects.filter(codigo='LAP-01').delete()
+        self.indice.marcar_pendiente()
+        self.assertEqual(self._codigos('lapiz'), ['CUA-01'])
+
+    def test_endpoint(self):
+        Usuario.objects.create_user(username='vendedor', password='clave')
+        self.client.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+        respuesta = self.client.get(reverse('buscar_productos'), {'q': 'cuad'})
+        self.assertEqual([r['codigo'] for r in respuesta.json()['resultados']], ['CUA-01'])
+
+
+class PaginacionTests(TestCase):
+    TOTAL = 200_000
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        Producto.objects.bulk_create((
+            Producto(codigo=f'P{i:06d}', nombre=f'Producto {i % 1000:03d}', precio_unitario=Decimal('100.00'), stock=i % 7)
+            for i in range(cls.TOTAL)
+        ), batch_size=5000)
+
+    def setUp(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+
+    def _pagina(self, url='', **params):
+        respuesta = self.client.get(reverse('listar_productos') + url, params)
+        return respuesta.context['pagina']
+
+    def test_recorrido_adelante_y_atras(self):
+        primera = self._pagina(orden='-nombre')
+        segunda = self._pagina(primera.url_siguiente)
+        self.assertEqual(len(segunda), 50)
+        self.assertGreaterEqual(primera.items[-1].nombre, segunda.items[0].nombre)
+        self.assertNotIn(segunda.items[0].pk, [p.pk for p in primera])
+        volver = self._pagina(segunda.url_anterior)
+        self.assertEqual([p.pk for p in volver], [p.pk for p in primera])
+        self.assertIsNone(volver.url_anterior)
+
+    def test_filtro(self):
+        pagina = self._pagina(q='P19999')
+        self.assertEqual([p.codigo for p in pagina], [f'P19999{i}' for i in range(10)])
+        self.assertIsNone(pagina.url_siguiente)
+
+    def test_pagina_profunda_con_consultas_fijas(self):
+        pagina = self._pagina(orden='stock')
+        for _ in range(3):
+            pagina = self._pagina(pagina.url_siguiente)
+        # Cursor que apunta cerca del final de la tabla
+        ultimo = Producto.objects.order_by('-stock', '-pk')[120]
+        cursor = signing.dumps([str(ultimo.stock), ultimo.pk], salt=paginacion.SAL_CURSOR)
+        # Solo la página de productos
+        with self.assertNumQueries(1):
+            pagina = self._pagina(orden='stock', despues=cursor)
+        self.assertEqual(len(pagina), 50)
+
+
+class ExportarVentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        cls.control = ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=cls.jefe)
+        Producto.objects.bulk_create([
+            Producto(codigo=f'P{i}', nombre=f'Producto {i}', precio_unitario=Decimal('100.00'), stock=1000)
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+
+    def _vender(self, ventas, lineas):
+        for folio in range(ventas):
+            registrar_venta(
+                tipo_documento=Venta.TIPO_BOLETA, folio=folio + 1000 * lineas,
+                productos_data=[{'codigo': f'P{i}', 'cantidad': 1} for i in range(lineas)],
+                id_usuario=self.jefe.pk, control=self.control,
+            )
+
+    def _exportar(self, **params):
+        hoy = timezone.localdate().isoformat()
+        respuesta = self.client.get(reverse('exportar_ventas'), {'desde': hoy, 'hasta': hoy, **params})
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_csv_sin_consultas_por_linea(self):
+        self._vender(2, 1)
+        # Una sola consulta con JOIN para todo el detalle
+        with self.assertNumQueries(1):
+            _, contenido = self._exportar()
+        self._vender(5, 10)
+        with self.assertNumQueries(1):
+            _, contenido = self._exportar()
+        lineas = contenido.decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 1 + 2 + 5 * 10)
+        self.assertTrue(lineas[0].startswith('ID Venta;Fecha;Tipo Documento'))
+        self.assertIn(';jefe;', lineas[1])
+
+    def test_rango_grande_en_tramos_acotados(self):
+        self._vender(7, 3)
+        with CaptureQueriesContext(connection) as consultas:
+            lineas = list(exportar.filas(timezone.localdate(), timezone.localdate(), chunk_size=4))
+        # 21 líneas en tramos de 4: 6 consultas, todas con LIMIT
+        self.assertEqual(len(consultas), 6)
+        self.assertTrue(all('LIMIT 4' in c['sql'] for c in consultas))
+        esperadas = list(DetalleVenta.objects.order_by('id_venta__fecha', 'id_venta_id', 'pk').values_list(
+            'id_venta_id', 'id_producto__codigo'
+        ))
+        self.assertEqual([(fila[0], fila[7]) for fila in lineas], esperadas)
+
+    def test_xlsx(self):
+        self._vender(1, 3)
+        respuesta, contenido = self._exportar(formato='xlsx')
+        self.assertIn('.xlsx', respuesta['Content-Disposition'])
+        self.assertTrue(contenido.startswith(b'PK'))
+
+    def test_rango_invalido(self):
+        respuesta = self.client.get(reverse('exportar_ventas'), {'desde': '2025-02-01', 'hasta': '2025-01-01'})
+        self.assertRedirects(respuesta, reverse('reporte_diario'))
+
+
+class ReportesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave', rol=Usuario.ROL_VENDEDOR)
+        filas = [
+            # (fecha, tipo, usuario, cantidad, total)
+            (date(2025, 3, 3), Venta.TIPO_BOLETA, cls.vendedor, 2, 200),
+            (date(2025, 3, 5), Venta.TIPO_FACTURA, cls.jefe, 1, 500),
+            (date(2025, 2, 25), Venta.TIPO_BOLETA, cls.vendedor, 4, 100),
+            (date(2025, 2, 10), Venta.TIPO_BOLETA, cls.jefe, 9, 900),
+        ]
+        ResumenVentaDiaria.objects.bulk_create([
+            ResumenVentaDiaria(fecha=f, tipo_documento=t, id_usuario=u, cantidad=c,
+                               subtotal=Decimal(total) / Decimal('1.19'), iva=0, total=total)
+            for f, t, u, c, total in filas
+        ])
+
+    def test_periodos(self):
+        semana = reportes.periodo('semana', fecha=date(2025, 3, 5))
+        self.assertEqual((semana.desde, semana.hasta), (date(2025, 3, 3), date(2025, 3, 9)))
+        self.assertEqual(semana.anterior().desde, date(2025, 2, 24))
+        marzo = reportes.periodo('mes', fecha=date(2025, 3, 31))
+        self.assertEqual(marzo.anterior(), reportes.Periodo('mes', date(2025, 2, 1), date(2025, 2, 28)))
+        rango = reportes.periodo('rango', desde=date(2025, 3, 1), hasta=date(2025, 3, 10))
+        self.assertEqual((rango.anterior().desde, rango.anterior().hasta), (date(2025, 2, 19), date(2025, 2, 28)))
+        with self.assertRaises(reportes.PeriodoInvalido):
+            reportes.periodo('rango', desde=date(2025, 3, 2), hasta=date(2025, 3, 1))
+
+    def test_semana_con_comparacion(self):
+        with self.assertNumQueries(3):
+            datos = reportes.generar(reportes.periodo('semana', fecha=date(2025, 3, 5)))
+        self.assertEqual(datos['totales']['total'], 700)
+        self.assertEqual(datos['totales_anterior']['total'], 100)
+        self.assertEqual(datos['comparacion']['total'], 600)
+        self.assertEqual(len(datos['serie']), 7)
+        self.assertEqual([d['total'] for d in datos['serie'][:3]], [200, 0, 500])
+        boleta, factura = datos['por_documento']
+        self.assertEqual((boleta['total'], boleta['total_anterior']), (200, 100))
+        self.assertIsNone(factura['variacion'])
+        self.assertEqual({v['id_usuario__username']: v['cantidad'] for v in datos['por_vendedor']},
+                         {'jefe': 1, 'vendedor': 2})
+
+    def test_vista(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+        respuesta = self.client.get(reverse('reporte_ventas'), {'periodo': 'mes', 'fecha': '2025-03-01'})
+        self.assertEqual(respuesta.context['totales']['cantidad'], 3)
+        self.assertEqual(respuesta.context['totales_anterior']['cantidad'], 13)
+        respuesta = self.client.get(reverse('reporte_ventas'), {'periodo': 'rango', 'desde': 'x', 'hasta': ''})
+        self.assertEqual(respuesta.context['periodo'].tipo, 'semana')
+
+
+class AnaliticaProductosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        productos = Producto.objects.bulk_create([
+            Producto(codigo=f'P{i}', nombre=f'Producto {i}', precio_unitario=Decimal('100.00'), stock=10)
+            for i in range(5)
+        ])
+        # P0 vende muchas unidades baratas; P1 pocas pero caras
+        filas = [
+            (date(2025, 3, 1), productos[0], 30, 300),
+            (date(2025, 3, 2), productos[0], 30, 300),
+            (date(2025, 3, 1), productos[1], 2, 5000),
+            (date(2025, 3, 2), productos[2], 10, 1000),
+            (date(2025, 2, 28), productos[3], 99, 9900),
+        ]
+        ResumenProductoDiario.objects.bulk_create([
+            ResumenProductoDiario(fecha=f, id_producto=p, unidades=u, monto=m) for f, p, u, m in filas
+        ])
+
+    def test_top_y_velocidad(self):
+        periodo = reportes.periodo('rango', desde=date(2025, 3, 1), hasta=date(2025, 3, 10))
+        with self.assertNumQueries(2):
+            datos = analitica.top(periodo, n=2)
+        self.assertEqual([p['codigo'] for p in datos['por_unidades']], ['P0', 'P2'])
+        self.assertEqual([p['codigo'] for p in datos['por_monto']], ['P1', 'P2'])
+        self.assertEqual(datos['por_unidades'][0]['velocidad'], Decimal('6'))
+        self.assertEqual((datos['productos_vendidos'], datos['unidades_totales']), (3, 72))
+
+    def test_velocidad_del_periodo_en_curso(self):
+        hoy = timezone.localdate()
+        producto = Producto.objects.get(codigo='P4')
+        ResumenProductoDiario.objects.create(fecha=hoy, id_producto=producto, unidades=hoy.day * 3, monto=100)
+        # El mes en curso lleva hoy.day días, no los del mes completo
+        filas = analitica.por_producto(reportes.periodo('mes', fecha=hoy))
+        self.assertEqual([f['velocidad'] for f in filas if f['id_producto'] == producto.pk], [Decimal('3')])
+
+    def test_vista(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+        respuesta = self.client.get(reverse('analitica_productos'), {'periodo': 'mes', 'fecha': '2025-02-01', 'n': 500})
+        self.assertEqual(respuesta.context['n'], analitica.LIMITE_TOP)
+        self.assertContains(respuesta, 'Producto 3')
+
+
+class PronosticoTests(TestCase):
+
+    def test_calculo_vectorizado(self):
+        import numpy as np
+
+        # Demanda constante de 2, irregular de promedio 1 y sin ventas
+        matriz = np.zeros((3, 60), dtype=np.float32)
+        matriz[0] = 2
+        matriz[1, ::2] = 2
+        resultado = pronostico.calcular(matriz, [100, 5, 10], metodo='media', ventana=28, plazo=7, cobertura=21)
+        np.testing.assert_allclose(resultado.demanda, [2, 1, 0])
+        np.testing.assert_allclose(resultado.dias_hasta_quiebre, [50, 5, np.inf])
+        # El primero está sobre su punto de reorden; el segundo pide 28 días + seguridad - stock
+        self.assertEqual(resultado.sugerido[0], 0)
+        self.assertEqual(resultado.sugerido[1], int(np.ceil(28 + 1.65 * np.sqrt(7) - 5)))
+        self.assertEqual(resultado.sugerido[2], 0)
+
+        exponencial = pronostico.demanda_exponencial(matriz, 0.3)
+        self.assertAlmostEqual(float(exponencial[0]), 2, places=4)
+        nivel = matriz[1, 0]
+        for x in matriz[1, 1:]:
+            nivel = 0.3 * x + 0.7 * nivel
+        self.assertAlmostEqual(float(exponencial[1]), float(nivel), places=4)
+
+    def test_ejecutar_y_vista(self):
+        jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        productos = Producto.objects.bulk_create([
+            Producto(codigo=f'P{i}', nombre=f'Producto {i}', precio_unitario=Decimal('100.00'), stock=stock)
+            for i, stock in enumerate((3, 1000, 50))
+        ])
+        hoy = date(2025, 3, 31)
+        ResumenProductoDiario.objects.bulk_create([
+            ResumenProductoDiario(fecha=hoy - timedelta(days=d), id_producto=p, unidades=4, monto=400)
+            for d in range(30) for p in productos[:2]
+        ])
+        self.assertEqual(pronostico.ejecutar(hasta=hoy, metodo='media', dias=60), 1)
+        urgente = PronosticoStock.objects.get(sugerido__gt=0)
+        self.assertEqual(urgente.id_producto, productos[0])
+        self.assertAlmostEqual(urgente.demanda_diaria, 4)
+        self.assertIsNone(PronosticoStock.objects.get(id_producto=productos[2]).dias_hasta_quiebre)
+
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+        respuesta = self.client.get(reverse('reposicion_stock'))
+        self.assertEqual([p.id_producto.codigo for p in respuesta.context['productos']], ['P0'])
+
+
+class InventarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        cls.control = ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=cls.jefe)
+
+    def setUp(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+
+    def _vender(self, folio, cantidad):
+        return registrar_venta(
+            tipo_documento=Venta.TIPO_BOLETA, folio=folio, productos_data=[{'codigo': 'P1', 'cantidad': cantidad}],
+            id_usuario=self.jefe.pk, control=self.control,
+        )
+
+    def _en(self, momento):
+        respuesta = self.client.get(reverse('stock_en_fecha', args=['P1']), {'en': momento.isoformat()})
+        return respuesta.json()['stock']
+
+    def test_eliminar_producto_sin_ventas_borra_su_libro(self):
+        self.client.post(reverse('crear_producto'), {'codigo': 'P1', 'nombre': 'Producto 1', 'precio_unitario': '100', 'stock': '10'})
+        inventario.tomar_snapshots(momento=timezone.now() + timedelta(minutes=5))
+        self.client.get(reverse('eliminar_producto', args=['P1']))
+        self.assertFalse(Producto.objects.filter(codigo='P1').exists())
+        self.assertFalse(MovimientoStock.objects.exists())
+        self.assertFalse(SnapshotStock.objects.exists())
+
+    def test_producto_con_ventas_no_se_elimina(self):
+        self.client.post(reverse('crear_producto'), {'codigo': 'P1', 'nombre': 'Producto 1', 'precio_unitario': '100', 'stock': '10'})
+        self._vender(1, 3)
+        inventario.tomar_snapshots(momento=timezone.now() + timedelta(minutes=5))
+        self.client.get(reverse('eliminar_producto', args=['P1']))
+        self.assertTrue(Producto.objects.filter(codigo='P1').exists())
+        self.assertEqual(MovimientoStock.objects.filter(id_producto__codigo='P1').count(), 2)
+        self.assertEqual(SnapshotStock.objects.count(), 1)
+
+    def test_libro_y_stock_a_una_fecha(self):
+        datos = {'codigo': 'P1', 'nombre': 'Producto 1', 'precio_unitario': '100', 'stock': '10'}
+        self.client.post(reverse('crear_producto'), datos)
+        producto = Producto.objects.get(codigo='P1')
+        t0 = timezone.now()
+        self._vender(1, 3)
+        self.client.post(reverse('editar_producto', args=['P1']), {**datos, 'stock': '20'})
+        t1 = timezone.now()
+        self._vender(2, 5)
+
+        movimientos = list(MovimientoStock.objects.order_by('id').values_list('tipo', 'cantidad'))
+        self.assertEqual(movimientos, [('Inicial', 10), ('Venta', -3), ('Ajuste', 13), ('Venta', -5)])
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 15)
+        self.assertEqual((self._en(t0), self._en(t1), self._en(timezone.now())), (10, 20, 15))
+
+        # Con snapshot el resultado es el mismo, sumando solo lo posterior
+        self.assertEqual(inventario.tomar_snapshots(momento=timezone.now() + timedelta(minutes=5)), 1)
+        self.assertEqual(SnapshotStock.objects.get().stock, 15)
+        self._vender(3, 1)
+        with self.assertNumQueries(2):
+            self.assertEqual(inventario.stock_en(producto.pk, timezone.now()), 14)
+        self.assertEqual(inventario.stock_en(producto.pk, t1), 20)
+        self.assertEqual(inventario.tomar_snapshots(momento=timezone.now() + timedelta(minutes=5)), 1)
+        self.assertEqual(SnapshotStock.objects.latest('id').stock, 14)
+
+    def test_fecha_invalida(self):
+        Producto.objects.create(codigo='P1', nombre='Producto 1', precio_unitario=Decimal('100.00'), stock=1)
+        respuesta = self.client.get(reverse('stock_en_fecha', args=['P1']), {'en': 'ayer'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class MetricasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+
+    def setUp(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+        metricas.buffer.vaciar()
+
+    def test_middleware_cuenta_consultas_y_plantilla(self):
+        with CaptureQueriesContext(connection) as consultas, self.assertLogs('VENTASAPP.metricas') as log:
+            self.client.get(reverse('reporte_diario'))
+        medicion, = metricas.buffer.copia()
+        self.assertEqual((medicion.vista, medicion.estado), ('reporte_diario', 200))
+        self.assertEqual(medicion.consultas, len(consultas))
+        self.assertGreater(medicion.plantilla_ns, 0)
+        self.assertGreaterEqual(medicion.total_ns, medicion.bd_ns + medicion.plantilla_ns)
+        self.assertEqual(json.loads(log.records[0].getMessage())['vista'], 'reporte_diario')
+
+    def test_decorador_sin_doble_medicion(self):
+        @metricas.medir
+        def vista(request):
+            Usuario.objects.count()
+            return HttpResponse()
+
+        vista(RequestFactory().get('/suelta/'))
+        medicion, = metricas.buffer.copia()
+        self.assertEqual((medicion.vista, medicion.consultas), ('vista', 1))
+
+        with self.assertLogs('VENTASAPP.metricas'):
+            metricas.medir_llamada(lambda: vista(RequestFactory().get('/')), RequestFactory().get('/'), vista='externa')
+        self.assertEqual([m.vista for m in metricas.buffer.copia()], ['vista', 'externa'])
+
+    async def test_middleware_asincrono(self):
+        async def vista(request):
+            return HttpResponse(status=201)
+
+        middleware = metricas.MetricasMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('VENTASAPP.metricas'):
+            await middleware(RequestFactory().get('/asincrona/'))
+        medicion, = metricas.buffer.copia()
+        self.assertEqual((medicion.vista, medicion.estado), ('/asincrona/', 201))
+
+    def test_endpoint_solo_jefe(self):
+        for _ in range(3):
+            self.client.get(reverse('catalogo_productos'))
+        datos = self.client.get(reverse('metricas'), {'recientes': 2}).json()
+        self.assertEqual(datos['vistas']['catalogo_productos']['requests'], 3)
+        self.assertEqual(set(datos['vistas']['catalogo_productos']['total_ms']), {'p50', 'p95', 'p99'})
+        self.assertEqual(len(datos['recientes']), 2)
+
+        Usuario.objects.create_user(username='vendedor', password='clave', rol=Usuario.ROL_VENDEDOR)
+        self.client.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+        self.assertNotEqual(self.client.get(reverse('metricas')).status_code, 200)
+
+    def test_conexiones_abiertas_por_request(self):
+        del_pool = mock.Mock(desde_pool=True, execute_wrappers=[])
+
+        def vista(abiertas):
+            for abierta in abiertas:
+                connection_created.send(sender=type(abierta), connection=abierta)
+            Usuario.objects.exists()
+            return HttpResponse()
+
+        for abiertas in ([connection], [], [del_pool], []):
+            metricas.medir_llamada(lambda: vista(abiertas), RequestFactory().get('/'), vista='v')
+        self.assertEqual([m.conexiones for m in metricas.buffer.copia()], [1, 0, 0, 0])
+        datos = metricas.resumen()['vistas']['v']
+        self.assertEqual((datos['conexiones_abiertas'], datos['conexion_reusada']), (1, 0.75))
+
+
+class ConexionesTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(conexiones.cerrar_pools)
+
+    def test_pool_presta_y_reemplaza(self):
+        pool = conexiones.Pool(2, espera=0.05)
+        primera, nueva = pool.tomar(lambda: sqlite3.connect(':memory:'))
+        self.assertTrue(nueva)
+        pool.devolver(primera)
+        self.assertEqual(pool.tomar(lambda: self.fail('debía reusarla')), (primera, False))
+        pool.devolver(primera)
+        otra, nueva = pool.tomar(lambda: sqlite3.connect(':memory:'), usable=lambda conexion: False)
+        self.assertTrue(nueva)
+        self.assertIsNot(otra, primera)
+        self.assertEqual(pool.estado(), {
+            'tamano': 2, 'abiertas': 1, 'libres': 0, 'creadas': 2, 'prestadas': 1, 'descartadas': 1,
+        })
+
+    def test_pool_agotado_espera(self):
+        pool = conexiones.Pool(1, espera=0.05)
+        conexion, _ = pool.tomar(lambda: sqlite3.connect(':memory:'))
+        with self.assertRaises(conexiones.PoolAgotado):
+            pool.tomar(lambda: sqlite3.connect(':memory:'))
+
+        pool.espera = 5
+        threading.Timer(0.05, pool.devolver, [conexion]).start()
+        self.assertEqual(pool.tomar(lambda: self.fail('debía esperar la prestada')), (conexion, False))
+
+    def test_wrapper_devuelve_al_pool(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        clase = type('DatabaseWrapper', (conexiones.ConexionesEnPool, DatabaseWrapper), {})
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajustes = {
+            **connection.settings_dict, 'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(carpeta.name, 'pool.sqlite3'), 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pool': {'tamano': 2}},
+        }
+        primero, segundo = clase(ajustes, 'pool'), clase(ajustes, 'pool')
+        primero.cursor().execute('SELECT 1')
+        abierta = primero.connection
+        self.assertFalse(primero.desde_pool)
+        primero.close()
+        segundo.cursor().execute('SELECT 1')
+        self.assertIs(segundo.connection, abierta)
+        self.assertTrue(segundo.desde_pool)
+
+        # Cerrada dentro de un atomic no vuelve al pool
+        segundo.in_atomic_block = True
+        segundo.close()
+        estado = conexiones.pool_para('pool', ajustes).estado()
+        self.assertEqual((estado['abiertas'], estado['prestadas'], estado['descartadas']), (0, 1, 1))
+
+        persistente = clase({**ajustes, 'CONN_MAX_AGE': 60}, 'pool')
+        with self.assertRaises(ImproperlyConfigured):
+            persistente.ensure_connection()
+
+
+class ImportarCatalogoTests(TestCase):
+
+    def _importar(self, tipo, contenido, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        salida = StringIO()
+        try:
+            call_command('importar_catalogo', tipo, archivo.name, *args, stdout=salida)
+        finally:
+            os.unlink(archivo.name)
+        return salida.getvalue()
+
+    def test_upsert_de_productos_por_lotes(self):
+        Producto.objects.create(codigo='A1', nombre='Viejo', precio_unitario=Decimal('1.00'), stock=1)
+        salida = self._importar('productos', (
+            'codigo,nombre,precio_unitario,stock\n'
+            'A1,Lápiz,300,10\n'
+            'A2,Goma,200,5\n'
+            'A3,Malo,abc,1\n'
+            'A4,Regla,500,3\n'
+        ), '--lote', '2')
+        self.assertIn('Lote 2: 1 válidas, 1 con errores', salida)
+        self.assertIn('línea 4: precio_unitario', salida)
+        self.assertIn('filas/s', salida)
+        self.assertEqual(Producto.objects.get(codigo='A1').nombre, 'Lápiz')
+        self.assertEqual(sorted(Producto.objects.values_list('codigo', flat=True)), ['A1', 'A2', 'A4'])
+        movimientos = MovimientoStock.objects.values_list('id_producto__codigo', 'tipo', 'cantidad')
+        self.assertEqual(sorted(movimientos), [('A1', 'Importación', 9), ('A2', 'Importación', 5), ('A4', 'Importación', 3)])
+
+    def test_clientes_normaliza_y_valida_rut(self):
+        self._importar('clientes', (
+            'rut,razon_social,giro,direccion\n'
+            '11111111-1,Uno SpA,Comercio,Calle 1\n'
+            '12.345.678-0,Malo SpA,Comercio,Calle 2\n'
+        ))
+        self.assertEqual(list(Cliente.objects.values_list('rut', flat=True)), ['11.111.111-1'])
+
+    def test_dry_run_no_guarda(self):
+        salida = self._importar('productos', 'codigo,nombre,precio_unitario,stock\nB1,Goma,200,5\n', '--dry-run')
+        self.assertIn('validadas (dry-run)', salida)
+        self.assertFalse(Producto.objects.exists())
+
+
+class RutTests(TestCase):
+    CASOS = {
+        '12345678-5': '12.345.678-5',
+        '7.654.321-k': None,
+        '10.000.013-K': '10.000.013-K',
+        '1-9': '1-9',
+        '01234567-4': '01.234.567-4',
+        '12.345.678-0': None,
+        '1k-1': None,
+        '': None,
+    }
+
+    def test_escalar_y_lote_coinciden(self):
+        for valor, esperado in self.CASOS.items():
+            with self.subTest(valor=valor):
+                self.assertEqual(rut.normalizar(valor), esperado)
+        self.assertEqual(rut.normalizar_lote(list(self.CASOS)), list(self.CASOS.values()))
+        self.assertEqual(rut.validar_lote(list(self.CASOS)).tolist(), [v is not None for v in self.CASOS.values()])
+
+    def test_formulario_usa_el_mismo_formato(self):
+        formulario = ClienteForm({'rut': '10000013k', 'razon_social': 'X', 'giro': 'Y', 'direccion': 'Z'})
+        formulario.is_valid()
+        self.assertEqual(formulario.cleaned_data['rut'], '10.000.013-K')
+        formulario = ClienteForm({'rut': '12.345.678-0', 'razon_social': 'X', 'giro': 'Y', 'direccion': 'Z'})
+        self.assertIn('rut', formulario.errors)
+
+
+CACHES_EN_MEMORIA = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'sesiones': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-sesiones'},
+    'revocaciones': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-revocaciones'},
+    'compartido': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-compartido'},
+    'login': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-login'},
+    'plantillas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-plantillas'},
+}
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class SesionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave')
+
+    def setUp(self):
+        self.client.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+        self.cliente_vendedor = self.client_class()
+        self.cliente_vendedor.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+
+    def _editar(self, usuario, rol):
+        return self.client.post(reverse('editar_usuario', args=[usuario.pk]), {
+            'username': usuario.username, 'rol': rol, 'password': 'nueva-clave', 'password_confirm': 'nueva-clave',
+        })
+
+    def test_sin_consultas_de_sesion_ni_usuario(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('buscar_productos'), {'q': 'x'})
+        self.assertEqual(respuesta.status_code, 200)
+        sql = ' '.join(c['sql'] for c in consultas).lower()
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('ventasapp_usuario', sql)
+
+    def test_editar_usuario_revoca_sus_sesiones(self):
+        self.assertEqual(self.cliente_vendedor.get(reverse('catalogo_productos')).status_code, 200)
+        self._editar(self.vendedor, Usuario.ROL_JEFE)
+        self.assertRedirects(self.cliente_vendedor.get(reverse('catalogo_productos')), reverse('login'))
+
+        self.cliente_vendedor.post(reverse('login'), {'username': 'vendedor', 'password': 'nueva-clave'})
+        self.assertEqual(self.cliente_vendedor.get(reverse('listar_usuarios')).status_code, 200)
+
+    def test_marca_fuera_del_cache_de_sesiones(self):
+        self._editar(self.vendedor, Usuario.ROL_JEFE)
+        # Vaciar (o llenar) el cache de sesiones no devuelve la sesión revocada
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        self.assertIsNotNone(caches[settings.SESIONES_CACHE].get(f'sesion-revocada:{self.vendedor.pk}'))
+        sesion = self.cliente_vendedor.session
+        sesion.update({'usuario_id': self.vendedor.pk, 'username': 'vendedor', 'rol': Usuario.ROL_VENDEDOR, 'inicio': 1})
+        sesion.save()
+        self.cliente_vendedor.cookies[settings.SESSION_COOKIE_NAME] = sesion.session_key
+        self.assertRedirects(self.cliente_vendedor.get(reverse('catalogo_productos')), reverse('login'))
+
+    def test_eliminar_usuario_revoca_sus_sesiones(self):
+        self.client.post(reverse('eliminar_usuario', args=[self.vendedor.pk]))
+        self.assertFalse(Usuario.objects.filter(pk=self.vendedor.pk).exists())
+        self.assertRedirects(self.cliente_vendedor.get(reverse('catalogo_productos')), reverse('login'))
+
+    def test_editarse_a_si_mismo_no_cierra_la_sesion(self):
+        self._editar(self.jefe, Usuario.ROL_JEFE)
+        self.assertEqual(self.client.get(reverse('listar_usuarios')).status_code, 200)
+
+    def test_rechaza_inicio_en_el_futuro(self):
+        sesion = self.client.session
+        sesion['inicio'] = 10**20
+        sesion.save()
+        self.assertRedirects(self.client.get(reverse('listar_usuarios')), reverse('login'))
+
+
+@override_settings(
+    CACHES=CACHES_EN_MEMORIA, PASSWORD_HASHERS=['VENTASAPP.acceso.PBKDF2Ajustable'], CLAVES_ITERACIONES=1000,
+    LOGIN_INTENTOS=3, LOGIN_CREDENCIAL_TTL=60,
+)
+class AccesoTests(TestCase):
+
+    def setUp(self):
+        caches['login'].clear()
+        self.usuario = Usuario.objects.create_user(username='vendedor', password='clave')
+
+    def entrar(self, password='clave', ip='127.0.0.1'):
+        return self.client.post(reverse('login'), {'username': 'vendedor', 'password': password}, REMOTE_ADDR=ip)
+
+    def test_recalcula_el_hash_al_cambiar_la_politica(self):
+        self.assertIn('$1000$', self.usuario.password)
+        with self.settings(CLAVES_ITERACIONES=2000):
+            self.assertRedirects(self.entrar(), reverse('home'), fetch_redirect_response=False)
+        self.usuario.refresh_from_db()
+        self.assertIn('$2000$', self.usuario.password)
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher', 'VENTASAPP.acceso.PBKDF2Ajustable']):
+            caches['login'].clear()
+            self.entrar()
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.password.startswith('md5$'))
+
+    def test_bloquea_por_usuario_e_ip(self):
+        for _ in range(3):
+            self.assertEqual(self.entrar('mala').status_code, 200)
+        with self.assertNumQueries(0):
+            respuesta = self.entrar()
+        self.assertEqual(respuesta.status_code, 429)
+        # Otra IP no queda bloqueada, y un login correcto le limpia la cuenta
+        self.entrar('mala', ip='10.0.0.2')
+        self.assertEqual(self.entrar(ip='10.0.0.2').status_code, 302)
+        self.assertFalse(acceso.bloqueado('vendedor', '10.0.0.2'))
+
+    def test_relogin_de_kiosco_sin_hash(self):
+        self.entrar()
+        self.client.logout()
+        with mock.patch.object(acceso, 'check_password', wraps=acceso.check_password) as verificar:
+            self.assertEqual(self.entrar().status_code, 302)
+            self.assertEqual(self.entrar('mala').status_code, 200)
+        # La contraseña incorrecta no coincide con la firma guardada y pasa por el hasher
+        self.assertEqual(verificar.call_count, 1)
+
+    def test_cambiar_la_clave_invalida_la_credencial(self):
+        self.entrar()
+        self.usuario.set_password('nueva')
+        self.usuario.save()
+        self.assertEqual(self.entrar().status_code, 200)
+        self.assertEqual(self.entrar('nueva').status_code, 302)
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PlantillasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave')
+        ControlDia.objects.create(fecha=timezone.localdate(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=cls.jefe)
+
+    def setUp(self):
+        caches['plantillas'].clear()
+        estado_dia.olvidar()
+
+    def entrar(self, usuario):
+        self.client.post(reverse('login'), {'username': usuario.username, 'password': 'clave'})
+
+    def test_pos_sin_script_en_linea(self):
+        self.entrar(self.vendedor)
+        respuesta = self.client.get(reverse('crear_venta'))
+        html = respuesta.content.decode()
+        self.assertIn('ventas/pos.js', html)
+        self.assertNotIn('addEventListener', html)
+        config = json.loads(re.search(r'<script id="pos-config" type="application/json">(.*?)</script>', html).group(1))
+        self.assertEqual(config['urls']['guardar_venta'], reverse('crear_venta'))
+        self.assertEqual(config['cola'], f'ventas-pendientes-{self.vendedor.pk}')
+        self.assertTrue(config['csrf'])
+        with self.settings(POS_ASINCRONO=True):
+            html = self.client.get(reverse('crear_venta')).content.decode()
+        self.assertIn(reverse('crear_venta_async'), html)
+
+    def test_pos_js_es_estatico(self):
+        from django.contrib.staticfiles import finders
+
+        with open(finders.find('ventas/pos.js'), encoding='utf-8') as archivo:
+            codigo = archivo.read()
+        self.assertNotIn('{%', codigo)
+        self.assertNotIn('{{', codigo)
+
+    def test_menu_lateral_por_rol(self):
+        self.entrar(self.vendedor)
+        self.assertNotContains(self.client.get(reverse('crear_venta')), reverse('reporte_ventas'))
+        self.entrar(self.jefe)
+        self.assertContains(self.client.get(reverse('home')), reverse('reporte_ventas'))
+        # El fragmento ya guardado del vendedor no se mezcla con el del jefe
+        self.entrar(self.vendedor)
+        respuesta = self.client.get(reverse('crear_venta'))
+        self.assertNotContains(respuesta, reverse('reporte_ventas'))
+        self.assertContains(respuesta, 'Usuario: <strong>vendedor</strong>')
+
+
+class EstaticosTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.raiz = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.raiz.cleanup)
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'VENTASAPP.estaticos.EstaticosComprimidos'}}
+        with override_settings(STATIC_ROOT=cls.raiz.name, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(cls.raiz.name, 'staticfiles.json'), encoding='utf-8') as archivo:
+            cls.manifiesto = json.load(archivo)['paths']
+
+    def setUp(self):
+        ajustes = override_settings(STATIC_ROOT=self.raiz.name, ESTATICOS_SERVIR=True, ESTATICOS_MAX_AGE=300)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def leer(self, nombre):
+        with open(os.path.join(self.raiz.name, nombre), 'rb') as archivo:
+            return archivo.read()
+
+    def test_variantes_comprimidas(self):
+        con_hash = self.manifiesto['ventas/pos.js']
+        self.assertRegex(con_hash, r'^ventas/pos\.[0-9a-f]{12}\.js$')
+        original, comprimido = self.leer(con_hash), self.leer(con_hash + '.gz')
+        self.assertLess(len(comprimido), len(original) * 0.4)
+        self.assertEqual(gzip.decompress(comprimido), original)
+
+    def test_logos_en_webp(self):
+        for imagen, webp in (('logobazar.jpg', 'logobazar.webp'), ('iconobazar.png', 'iconobazar.webp')):
+            self.assertEqual(self.leer(self.manifiesto[webp])[8:12], b'WEBP')
+            self.assertLess(len(self.leer(self.manifiesto[webp])) * 5, len(self.leer(imagen)))
+
+    def test_cabeceras_con_hash(self):
+        con_hash = self.manifiesto['ventas/pos.js']
+        respuesta = self.client.get(f'/static/{con_hash}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(respuesta['Vary'], 'Accept-Encoding')
+        self.assertTrue(respuesta['Content-Type'].startswith('text/javascript'))
+        cuerpo = b''.join(respuesta.streaming_content)
+        self.assertEqual(int(respuesta['Content-Length']), len(cuerpo))
+        self.assertEqual(gzip.decompress(cuerpo), self.leer(con_hash))
+
+        sin_gzip = self.client.get(f'/static/{con_hash}', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(sin_gzip.has_header('Content-Encoding'))
+        self.assertEqual(int(sin_gzip['Content-Length']), len(self.leer(con_hash)))
+
+        repetida = self.client.get(f'/static/{con_hash}', HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    async def test_servido_bajo_asgi(self):
+        con_hash = self.manifiesto['ventas/pos.js']
+        respuesta = await self.async_client.get(f'/static/{con_hash}', headers={'accept-encoding': 'gzip'})
+        self.assertEqual((respuesta.status_code, respuesta['Content-Encoding']), (200, 'gzip'))
+        self.assertEqual(gzip.decompress(respuesta.content), self.leer(con_hash))
+
+    @skipUnless(estaticos._brotli(), 'brotli no está instalado')
+    def test_brotli_preferido(self):
+        con_hash = self.manifiesto['ventas/pos.js']
+        respuesta = self.client.get(f'/static/{con_hash}', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(respuesta['Content-Encoding'], 'br')
+        self.assertLess(int(respuesta['Content-Length']), len(self.leer(con_hash + '.gz')))
+
+    def test_sin_hash_cache_corto(self):
+        respuesta = self.client.get('/static/logobazar.webp')
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=300')
+        self.assertEqual(respuesta['Content-Type'], 'image/webp')
+        self.assertFalse(respuesta.has_header('Vary'))
+        self.assertEqual(self.client.get('/static/no-existe.js').status_code, 404)
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class EstadoDiaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        Usuario.objects.create_user(username='vendedor', password='clave')
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=10)
+
+    def setUp(self):
+        estado_dia.olvidar()
+        with self.captureOnCommitCallbacks(execute=True):
+            estado_dia.alternar(self.jefe.pk)
+        self.client.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+
+    def _vender(self):
+        return self.client.post(
+            reverse('crear_venta'),
+            data=json.dumps({'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': 'A1', 'cantidad': 1}]}),
+            content_type='application/json',
+        )
+
+    def test_venta_sin_leer_control_dia(self):
+        self.assertTrue(estado_dia.dia_abierto(estado_dia.hoy()))
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self._vender().status_code, 200)
+        lecturas = [c['sql'] for c in consultas if c['sql'].startswith('SELECT') and 'controldia' in c['sql'].lower()]
+        self.assertEqual(lecturas, [])
+
+    def test_alternar_invalida_la_copia(self):
+        self.assertTrue(estado_dia.dia_abierto(estado_dia.hoy()))
+        with self.captureOnCommitCallbacks(execute=True):
+            estado_dia.alternar(self.jefe.pk)
+        self.assertFalse(estado_dia.dia_abierto(estado_dia.hoy()))
+
+    def test_copia_vencida_no_acepta_ventas(self):
+        self.assertTrue(estado_dia.dia_abierto(estado_dia.hoy()))
+        # Cierre hecho por otro proceso cuyo aviso aún no llega
+        ControlDia.objects.update(estado=ControlDia.ESTADO_CERRADO)
+        respuesta = self._vender()
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('CERRADO', respuesta.json()['message'])
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 10)
+        self.assertFalse(estado_dia.dia_abierto(estado_dia.hoy()))
+
+    def test_lote_con_copia_vencida(self):
+        self.assertTrue(estado_dia.dia_abierto(estado_dia.hoy()))
+        ControlDia.objects.update(estado=ControlDia.ESTADO_CERRADO)
+        lote = {'ventas': [{'clave': 'l-1', 'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': 'A1', 'cantidad': 1}]}]}
+        respuesta = self.client.post(reverse('crear_ventas_lote'), data=json.dumps(lote), content_type='application/json')
+        resultado, = respuesta.json()['resultados']
+        self.assertEqual((resultado['status'], resultado['dia_cerrado']), ('error', True))
+        self.assertFalse(estado_dia.dia_abierto(estado_dia.hoy()))
+        # Con la copia al día el lote se rechaza sin abrir la transacción
+        respuesta = self.client.post(reverse('crear_ventas_lote'), data=json.dumps(lote), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Venta.objects.exists())
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class CierreConcurrenteTests(ConcurrenciaTestCase):
+    VENDEDORES = 4
+    POR_VENDEDOR = 30
+
+    def test_ninguna_venta_iniciada_despues_del_cierre_se_confirma(self):
+        jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=10_000)
+        estado_dia.olvidar()
+        estado_dia.alternar(jefe.pk)
+        # Copia tomada antes del cierre, como la de un proceso que no recibió el aviso
+        control = estado_dia.hoy()
+        cerrado_en = []
+
+        def trabajo(i):
+            if i == self.VENDEDORES:
+                time.sleep(0.05)
+                estado_dia.alternar(jefe.pk)
+                cerrado_en.append(time.monotonic())
+                return []
+            intentos = []
+            for n in range(self.POR_VENDEDOR):
+                inicio = time.monotonic()
+                try:
+                    registrar_venta(
+                        tipo_documento=Venta.TIPO_BOLETA, folio=i * 1000 + n,
+                        productos_data=[{'codigo': 'A1', 'cantidad': 1}], id_usuario=jefe.pk, control=control,
+                    )
+                    intentos.append((inicio, True))
+                except DiaCerrado:
+                    intentos.append((inicio, False))
+            return intentos
+
+        resultados, errores = en_hilos(trabajo, self.VENDEDORES + 1)
+        self.assertEqual(errores, [])
+        intentos = [intento for lista in resultados for intento in lista]
+        confirmadas = sum(ok for _, ok in intentos)
+        tardias = [ok for inicio, ok in intentos if inicio > cerrado_en[0]]
+        self.assertNotIn(True, tardias)
+        self.assertGreater(confirmadas, 0)
+        self.assertGreater(len(intentos) - confirmadas, 0)
+        self.assertEqual(Venta.objects.count(), confirmadas)
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 10_000 - confirmadas)
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class ApiAsincronaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario.objects.create_user(username='vendedor', password='clave')
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=10)
+
+    def setUp(self):
+        catalogo.productos.invalidar()
+
+    async def _entrar(self):
+        await self.async_client.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+
+    async def test_requiere_sesion(self):
+        respuesta = await self.async_client.get(reverse('catalogo_productos_async'))
+        self.assertRedirects(respuesta, reverse('login'), fetch_redirect_response=False)
+
+    async def test_catalogo_igual_al_sincrono(self):
+        await self._entrar()
+        respuesta = await self.async_client.get(reverse('catalogo_productos_async'))
+        self.assertEqual([p['codigo'] for p in respuesta.json()['productos']], ['A1'])
+        respuesta = await self.async_client.get(reverse('catalogo_productos_async'), headers={'if-none-match': respuesta['ETag']})
+        self.assertEqual(respuesta.status_code, 304)
+        version = (await catalogo.productos.acompleto())[0]
+        cambios = await self.async_client.get(reverse('catalogo_productos_async'), {'desde': version})
+        self.assertFalse(cambios.json()['completo'])
+
+    async def test_folio_sugerido(self):
+        await self._entrar()
+        respuesta = await self.async_client.get(reverse('get_next_folio_async'), {'tipo_documento': Venta.TIPO_BOLETA})
+        self.assertEqual(respuesta.json(), {'next_folio': 1})
+
+    async def test_venta_con_dia_cerrado(self):
+        estado_dia.olvidar()
+        await self._entrar()
+        respuesta = await self.async_client.post(
+            reverse('crear_venta_async'),
+            data={'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': 'A1', 'cantidad': 1}]},
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('No se ha abierto el día', respuesta.json()['message'])
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA, VENTAS_ASYNC_HILOS=4)
+class ApiAsincronaConcurrenciaTests(ConcurrenciaTestCase):
+    TERMINALES = 20
+
+    def test_ventas_simultaneas(self):
+        jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=1000)
+        estado_dia.olvidar()
+        estado_dia.alternar(jefe.pk)
+
+        async def terminal(cliente):
+            await cliente.post(reverse('login'), {'username': 'jefe', 'password': 'clave'})
+            return await cliente.post(
+                reverse('crear_venta_async'),
+                data={'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': 'A1', 'cantidad': 2}]},
+                content_type='application/json',
+            )
+
+        async def todas():
+            return await asyncio.gather(*(terminal(self.async_client_class()) for _ in range(self.TERMINALES)))
+
+        respuestas = async_to_sync(todas)()
+        self.assertEqual([r.status_code for r in respuestas], [200] * self.TERMINALES)
+        self.assertEqual(sorted(r.json()['folio'] for r in respuestas), list(range(1, self.TERMINALES + 1)))
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 1000 - 2 * self.TERMINALES)
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA)
+class IdempotenciaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave')
+        cls.control = ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=cls.vendedor)
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=5)
+
+    def setUp(self):
+        estado_dia.olvidar()
+        self.client.post(reverse('login'), {'username': 'vendedor', 'password': 'clave'})
+
+    def _post(self, nombre, cuerpo, **extra):
+        return self.client.post(reverse(nombre), data=json.dumps(cuerpo), content_type='application/json', **extra).json()
+
+    def _venta(self, clave, cantidad=1):
+        return {'clave': clave, 'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': 'A1', 'cantidad': cantidad}]}
+
+    def test_reenvio_devuelve_la_misma_venta(self):
+        primera = self._post('crear_venta', self._venta('k-1'))
+        segunda = self._post('crear_venta', self._venta('k-1'))
+        self.assertEqual((primera['repetida'], segunda['repetida']), (False, True))
+        self.assertEqual(primera['folio'], segunda['folio'])
+        self.assertEqual(Venta.objects.count(), 1)
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 4)
+
+    def test_reenvio_es_una_sola_lectura(self):
+        self._post('crear_venta', self._venta('k-1'))
+        with self.assertNumQueries(1):
+            venta, repetida = registrar_venta_pos(self._venta('k-1'), id_usuario=self.vendedor.pk, terminal=None, control=self.control)
+        self.assertTrue(repetida)
+
+    def test_clave_en_cabecera(self):
+        cuerpo = self._venta(None)
+        primera = self._post('crear_venta', cuerpo, headers={'idempotency-key': 'cab-1'})
+        segunda = self._post('crear_venta', cuerpo, headers={'idempotency-key': 'cab-1'})
+        self.assertEqual((primera['folio'], segunda['repetida']), (segunda['folio'], True))
+
+    def test_lote_con_resultados_por_venta(self):
+        self._post('crear_venta', self._venta('ya'))
+        respuesta = self._post('crear_ventas_lote', {'ventas': [
+            self._venta('ya'),
+            self._venta('nueva-1', cantidad=2),
+            self._venta('sin-stock', cantidad=50),
+            self._venta('nueva-1', cantidad=2),
+            self._venta('nueva-2'),
+        ]})
+        resultados = {(r['clave'], r['status'], r.get('repetida')) for r in respuesta['resultados']}
+        self.assertEqual(resultados, {
+            ('ya', 'success', True), ('nueva-1', 'success', False), ('sin-stock', 'error', None),
+            ('nueva-1', 'success', True), ('nueva-2', 'success', False),
+        })
+        self.assertEqual(len(respuesta['resultados']), 5)
+        self.assertEqual(Venta.objects.count(), 3)
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 5 - 1 - 2 - 1)
+
+    def test_lote_con_cliente_inexistente(self):
+        factura = {**self._venta('f-1'), 'tipo_documento': Venta.TIPO_FACTURA, 'cliente_id': 999}
+        resultados = self._post('crear_ventas_lote', {'ventas': [factura, self._venta('b-1')]})['resultados']
+        self.assertEqual([(r['status'], r.get('message')) for r in resultados], [
+            ('error', 'El cliente seleccionado no existe.'), ('success', None),
+        ])
+
+    def test_error_de_la_base_hace_fallar_el_lote(self):
+        lote = [self._venta('d-1'), self._venta('d-2')]
+        with mock.patch('VENTASAPP.ventas.descontar_stock', side_effect=[None, OperationalError('Deadlock found')]):
+            with self.assertRaises(OperationalError):
+                registrar_lote_pos(lote, id_usuario=self.vendedor.pk, terminal=None, control=self.control)
+        # La primera no queda informada como registrada ni confirmada
+        self.assertFalse(Venta.objects.exists())
+
+    def test_lote_invalido(self):
+        self.assertEqual(self._post('crear_ventas_lote', {'ventas': []})['status'], 'error')
+        self.assertEqual(self._post('crear_ventas_lote', [1, 2])['status'], 'error')
+
+
+class IdempotenciaConcurrenciaTests(ConcurrenciaTestCase):
+    HILOS = 6
+
+    def test_misma_clave_en_paralelo_registra_una_venta(self):
+        vendedor = Usuario.objects.create_user(username='vendedor', password='clave')
+        control = ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=vendedor)
+        Producto.objects.create(codigo='A1', nombre='Lápiz', precio_unitario=Decimal('300.00'), stock=100)
+        datos = {'clave': 'misma', 'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': 'A1', 'cantidad': 1}]}
+
+        def trabajo(i):
+            venta, repetida = registrar_venta_pos(dict(datos), id_usuario=vendedor.pk, terminal=None, control=control)
+            return venta.folio, repetida
+
+        resultados, errores = en_hilos(trabajo, self.HILOS)
+        self.assertEqual(errores, [])
+        self.assertEqual({folio for folio, _ in resultados}, {1})
+        self.assertEqual(sum(not repetida for _, repetida in resultados), 1)
+        self.assertEqual(Venta.objects.count(), 1)
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 99)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class GenerarDatosTests(TestCase):
+
+    def generar(self, **opciones):
+        opciones = {'vendedores': 3, 'productos': 40, 'clientes': 10, 'dias': 4, 'ventas_por_dia': 15, **opciones}
+        call_command('generar_datos', stdout=StringIO(), **opciones)
+
+    def test_genera_historia_consistente(self):
+        self.generar()
+        self.assertEqual(Usuario.objects.filter(username__startswith='bench-vendedor-').count(), 3)
+        self.assertEqual(Venta.objects.count(), 60)
+        self.assertEqual(ControlDia.objects.get(fecha=timezone.localdate()).estado, ControlDia.ESTADO_ABIERTO)
+        self.assertFalse(Venta.objects.filter(fecha__date__gte=timezone.localdate()).exists())
+        # Totales de cabecera, detalle y resúmenes cuadran
+        self.assertEqual(
+            Venta.objects.aggregate(s=Sum('subtotal'))['s'], DetalleVenta.objects.aggregate(s=Sum('subtotal'))['s'],
+        )
+        self.assertEqual(
+            ResumenVentaDiaria.objects.aggregate(s=Sum('total'))['s'], Venta.objects.aggregate(s=Sum('total'))['s'],
+        )
+        for tipo in (Venta.TIPO_BOLETA, Venta.TIPO_FACTURA):
+            self.assertEqual(
+                SecuenciaFolio.objects.get(tipo_documento=tipo).ultimo_folio,
+                Venta.objects.filter(tipo_documento=tipo).count(),
+            )
+        self.assertFalse(Venta.objects.filter(tipo_documento=Venta.TIPO_FACTURA, id_cliente__isnull=True).exists())
+        self.assertTrue(all(rut.es_valido(r) for r in Cliente.objects.values_list('rut', flat=True)))
+
+    def test_nueva_venta_continua_los_folios(self):
+        self.generar()
+        vendedor = Usuario.objects.get(username='bench-vendedor-0')
+        self.client.post(reverse('login'), {'username': vendedor.username, 'password': 'bench'})
+        ultimo = SecuenciaFolio.objects.get(tipo_documento='Boleta').ultimo_folio
+        respuesta = self.client.post(
+            reverse('crear_venta'),
+            json.dumps({'tipo_documento': 'Boleta', 'productos': [{'codigo': 'bench-000001', 'cantidad': 1}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.json()['folio'], ultimo + 1)
+
+    def test_prefijo_repetido(self):
+        self.generar(dias=0)
+        with self.assertRaises(CommandError):
+            self.generar(dias=0)
+
+
+
+# --- Regresión de consultas por vista ---
+
+def _rut_valido(numero):
+    cuerpo = str(numero)
+    return rut.formatear(cuerpo + rut.digito_verificador(cuerpo))
+
+
+VENTA_POS = {'tipo_documento': Venta.TIPO_BOLETA, 'productos': [{'codigo': f'P{i:05d}', 'cantidad': 1} for i in range(5)]}
+FACTURA_POS = {**VENTA_POS, 'tipo_documento': Venta.TIPO_FACTURA}
+
+
+@override_settings(CACHES=CACHES_EN_MEMORIA, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConsultasPorVistaTests(TestCase):
+    """Cota de consultas de cada URL con ambos roles, sobre un volumen de datos realista.
+
+    Los datos se crean una vez; cada caso corre en un savepoint que se
+    revierte y parte con los caches del catálogo y del día vacíos, así que
+    mide el peor caso (cache frío). Un N+1 en cualquier vista hace que sus
+    consultas crezcan con los miles de filas y la prueba falle.
+    """
+    PRODUCTOS = 3000
+    CLIENTES = 2000
+    VENTAS = 2000
+    USUARIOS = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = Usuario.objects.create_user(username='jefe', password='clave', rol=Usuario.ROL_JEFE)
+        cls.vendedor = Usuario.objects.create_user(username='vendedor', password='clave', rol=Usuario.ROL_VENDEDOR)
+        Usuario.objects.bulk_create([
+            Usuario(username=f'usuario{i}', password=cls.jefe.password, rol=Usuario.ROL_VENDEDOR)
+            for i in range(cls.USUARIOS)
+        ])
+        productos = Producto.objects.bulk_create([
+            Producto(codigo=f'P{i:05d}', nombre=f'Producto {i}', precio_unitario=Decimal('990.00'), stock=500)
+            for i in range(cls.PRODUCTOS)
+        ])
+        # El último producto no tiene ventas y se puede eliminar
+        cls.producto_libre = productos[-1]
+        clientes = Cliente.objects.bulk_create([
+            Cliente(rut=_rut_valido(10_000_000 + i), razon_social=f'Cliente {i} SpA', giro='Comercio', direccion=f'Calle {i}')
+            for i in range(cls.CLIENTES)
+        ])
+        cls.cliente_libre = clientes[-1]
+        hoy = timezone.localdate()
+        cls.control = ControlDia.objects.create(fecha=hoy, estado=ControlDia.ESTADO_ABIERTO, id_usuario=cls.jefe)
+
+        ahora = timezone.now()
+        ventas = Venta.objects.bulk_create([
+            Venta(
+                fecha=ahora - timedelta(days=i % 30, minutes=i), tipo_documento=Venta.TIPO_BOLETA, folio=i + 1,
+                subtotal=Decimal('2970.00'), iva=Decimal('564.30'), total=Decimal('3534.30'),
+                id_usuario=cls.vendedor if i % 2 else cls.jefe, id_cliente=clientes[i % 100] if i % 3 == 0 else None,
+                id_control=cls.control,
+            )
+            for i in range(cls.VENTAS)
+        ])
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(id_venta=venta, id_producto=productos[(i * 3 + j) % (cls.PRODUCTOS - 1)], cantidad=1,
+                         precio_unitario=Decimal('990.00'), subtotal=Decimal('990.00'))
+            for i, venta in enumerate(ventas) for j in range(3)
+        ])
+        SecuenciaFolio.objects.create(tipo_documento=Venta.TIPO_BOLETA, ultimo_folio=cls.VENTAS)
+        SecuenciaFolio.objects.create(tipo_documento=Venta.TIPO_FACTURA, ultimo_folio=0)
+        resumenes.reconstruir()
+        resumenes.reconstruir_productos()
+        inventario.registrar_cambios({p.pk: p.stock for p in productos}, {}, MovimientoStock.TIPO_INICIAL)
+        inventario.tomar_snapshots(momento=ahora + timedelta(minutes=5))
+        pronostico.ejecutar()
+
+    def setUp(self):
+        catalogo.productos.invalidar()
+        catalogo.clientes.invalidar()
+        estado_dia.olvidar()
+        # El índice de búsqueda arranca en frío, sin la versión de otros tests
+        busqueda.indice._version = None
+
+    def _casos(self):
+        """(nombre, args, método, datos, máximo como Jefe, máximo como Vendedor)."""
+        hoy = timezone.localdate().isoformat()
+        producto = {'codigo': 'P00001', 'nombre': 'Editado', 'precio_unitario': '100', 'stock': '7'}
+        cliente = {'rut': '11.111.111-1', 'razon_social': 'Nuevo SpA', 'giro': 'Comercio', 'direccion': 'Calle'}
+        usuario = {'username': 'nuevo', 'rol': Usuario.ROL_VENDEDOR, 'password': 'x', 'password_confirm': 'x'}
+        return [
+            ('login', [], 'get', None, 0, 0),
+            ('login', [], 'post', {'username': 'usuario1', 'password': 'clave'}, 1, 1),
+            ('logout', [], 'get', None, 0, 0),
+            ('home', [], 'get', None, 2, 1),
+            ('listar_productos', [], 'get', {'q': 'Producto 1', 'orden': '-stock'}, 1, 0),
+            ('buscar_productos', [], 'get', {'q': 'producto 12'}, 2, 2),
+            ('crear_producto', [], 'get', None, 0, 0),
+            ('crear_producto', [], 'post', {**producto, 'codigo': 'NUEVO'}, 5, 0),
+            ('editar_producto', ['P00001'], 'get', None, 1, 0),
+            ('editar_producto', ['P00001'], 'post', producto, 7, 0),
+            ('eliminar_producto', [self.producto_libre.codigo], 'get', None, 11, 0),
+            ('listar_clientes', [], 'get', {'orden': 'razon_social'}, 1, 0),
+            ('crear_cliente', [], 'get', None, 0, 0),
+            ('crear_cliente', [], 'post', cliente, 2, 0),
+            ('editar_cliente', [self.cliente_libre.rut], 'get', None, 1, 0),
+            ('editar_cliente', [self.cliente_libre.rut], 'post', {**cliente, 'rut': self.cliente_libre.rut}, 3, 0),
+            ('eliminar_cliente', [self.cliente_libre.rut], 'get', None, 3, 0),
+            ('listar_usuarios', [], 'get', None, 1, 0),
+            ('crear_usuario', [], 'get', None, 0, 0),
+            ('crear_usuario', [], 'post', usuario, 2, 0),
+            ('editar_usuario', [self.vendedor.pk], 'get', None, 1, 0),
+            ('editar_usuario', [self.vendedor.pk], 'post', {**usuario, 'username': 'vendedor'}, 3, 0),
+            ('eliminar_usuario', [self.vendedor.pk + 1], 'get', None, 9, 0),
+            ('control_dia', [], 'get', None, 1, 0),
+            ('control_dia', [], 'post', {}, 4, 0),
+            ('crear_venta', [], 'get', None, 3, 3),
+            ('crear_venta', [], 'json', VENTA_POS, 19, 22),
+            ('crear_venta', [], 'json', {**FACTURA_POS, 'cliente_id': self.cliente_libre.pk}, 23, 23),
+            ('crear_ventas_lote', [], 'json', {'ventas': [{**VENTA_POS, 'clave': f'lote-{i}'} for i in range(10)]}, 164, 167),
+            ('get_next_folio', [], 'get', {'tipo_documento': Venta.TIPO_BOLETA}, 1, 1),
+            ('catalogo_productos', [], 'get', None, 2, 2),
+            ('catalogo_clientes', [], 'get', None, 2, 2),
+            # La venta asíncrona usa su propio pool de conexiones; aquí solo se mide el rechazo
+            ('crear_venta_async', [], 'get', None, 0, 0),
+            ('get_next_folio_async', [], 'get', {'tipo_documento': Venta.TIPO_BOLETA}, 1, 1),
+            ('catalogo_productos_async', [], 'get', None, 2, 2),
+            ('catalogo_clientes_async', [], 'get', None, 2, 2),
+            ('reporte_diario', [], 'get', {'fecha': hoy}, 3, 0),
+            ('reporte_ventas', [], 'get', {'periodo': 'mes'}, 3, 0),
+            ('analitica_productos', [], 'get', {'periodo': 'mes', 'n': 20}, 2, 0),
+            ('reposicion_stock', [], 'get', None, 2, 0),
+            ('stock_en_fecha', ['P00001'], 'get', None, 3, 0),
+            ('metricas', [], 'get', None, 0, 0),
+            ('exportar_ventas', [], 'get', {'desde': hoy, 'hasta': hoy}, 1, 0),
+        ]
+
+    def _pedir(self, nombre, args, metodo, datos):
+        url = reverse(nombre, args=args)
+        if metodo == 'json':
+            respuesta = self.client.post(url, json.dumps(datos), content_type='application/json')
+        else:
+            respuesta = getattr(self.client, metodo)(url, datos or {})
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        return respuesta
+
+    def test_todas_las_urls_tienen_cota(self):
+        from VENTASAPP.urls import urlpatterns
+
+        nombres = {patron.name for patron in urlpatterns if patron.name}
+        self.assertEqual(nombres - {caso[0] for caso in self._casos()}, set())
+
+    def test_consultas_por_vista(self):
+        for usuario, indice in (('jefe', 4), ('vendedor', 5)):
+            for caso in self._casos():
+                nombre, args, metodo, datos = caso[:4]
+                with self.subTest(usuario=usuario, vista=nombre, metodo=metodo):
+                    with transaction.atomic():
+                        self.client.post(reverse('login'), {'username': usuario, 'password': 'clave'})
+                        self.setUp()
+                        with CaptureQueriesContext(connection) as consultas:
+                            respuesta = self._pedir(nombre, args, metodo, datos)
+                        transaction.set_rollback(True)
+                    # Las ventas deben completarse: un rechazo haría pasar la cota sin medir nada
+                    if metodo == 'json':
+                        self.assertEqual(respuesta.status_code, 200)
+                    else:
+                        self.assertLess(respuesta.status_code, 500)
+                    self.assertLessEqual(
+                        len(consultas), caso[indice],
+                        '\n'.join(q['sql'] for q in consultas.captured_queries),
+                    )
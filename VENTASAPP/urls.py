@@ -10,6 +10,7 @@ urlpatterns = [
 
 	# URLs para Administración (CRUDs)
 	path('productos/', views.listar_productos, name='listar_productos'),
+	path('productos/buscar/', views.buscar_productos, name='buscar_productos'),
 	path('productos/crear/', views.crear_producto, name='crear_producto'),
 	path('productos/editar/<str:codigo>/', views.editar_producto, name='editar_producto'),
 	path('productos/eliminar/<str:codigo>/', views.eliminar_producto, name='eliminar_producto'),
@@ -31,8 +32,23 @@ urlpatterns = [
 
 	# URLs para Ventas (Vendedor)
 	path('nueva_venta/', views.crear_venta, name='crear_venta'),
+	path('nueva_venta/lote/', views.crear_ventas_lote, name='crear_ventas_lote'),
 	path('get_next_folio/', views.get_next_folio, name='get_next_folio'),
+	path('catalogo/productos/', views.catalogo_productos, name='catalogo_productos'),
+	path('catalogo/clientes/', views.catalogo_clientes, name='catalogo_clientes'),
+
+	# Versión asíncrona de los endpoints del POS (para servir con ASGI)
+	path('api/ventas/', views.crear_venta_async, name='crear_venta_async'),
+	path('api/folio/', views.get_next_folio_async, name='get_next_folio_async'),
+	path('api/catalogo/productos/', views.catalogo_productos_async, name='catalogo_productos_async'),
+	path('api/catalogo/clientes/', views.catalogo_clientes_async, name='catalogo_clientes_async'),
 
 	# URLs para Reportes (Jefe de Ventas)
 	path('reporte_diario/', views.reporte_diario, name='reporte_diario'),
+	path('reportes/ventas/', views.reporte_ventas, name='reporte_ventas'),
+	path('reportes/productos/', views.analitica_productos, name='analitica_productos'),
+	path('reportes/reposicion/', views.reposicion_stock, name='reposicion_stock'),
+	path('api/stock/<str:codigo>/', views.stock_en_fecha, name='stock_en_fecha'),
+	path('api/metricas/', views.metricas_json, name='metricas'),
+	path('exportar_ventas/', views.exportar_ventas, name='exportar_ventas'),
 ]
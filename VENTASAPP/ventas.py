@@ -0,0 +1,286 @@
+"""Motor de registro de ventas.
+
+Agrupa en un solo lugar la escritura de una venta: bloqueo de los productos
+del carro, creación de la Venta, inserción de sus detalles, descuento de
+stock y su registro en el libro de movimientos. La cantidad de consultas es
+constante sin importar cuántas líneas tenga el carro.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, Q, Value, When
+from django.utils import timezone
+
+from . import catalogo, inventario
+from .folios import siguiente_folio
+from .forms import ClienteForm
+from .models import Cliente, ControlDia, Producto, Venta, DetalleVenta
+from .resumenes import acumular_productos, acumular_venta
+
+
+TASA_IVA = Decimal('0.19')
+LOTE_MAXIMO = 100
+
+
+class VentaError(Exception):
+    """Error de negocio al registrar una venta (se informa al vendedor)."""
+
+
+class StockInsuficiente(VentaError):
+    pass
+
+
+class DiaCerrado(VentaError):
+    pass
+
+
+def agrupar_items(productos_data):
+    """Suma las cantidades por código, respetando el orden del carro."""
+    cantidades = {}
+    for item in productos_data:
+        try:
+            codigo = str(item['codigo'])
+            cantidad = int(item['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise VentaError('Producto o cantidad inválidos.')
+        if cantidad <= 0:
+            raise VentaError('La cantidad debe ser mayor a cero.')
+        cantidades[codigo] = cantidades.get(codigo, 0) + cantidad
+    return cantidades
+
+
+def descontar_stock(cantidades_por_id, control=None):
+    """Descuenta stock con un único UPDATE condicional.
+
+    Cada fila solo se actualiza si tiene stock suficiente; si alguna no
+    calza se lanza StockInsuficiente y la transacción que envuelve la
+    llamada se revierte completa.
+
+    Con ``control`` el mismo UPDATE exige además que ese ControlDia siga
+    abierto. La base evalúa esa condición con la fila vigente (no con una
+    foto de la transacción), así que una venta no se confirma si el cierre
+    se confirmó antes, y un cierre que llega después espera a la venta.
+    """
+    condicion = Q()
+    casos = []
+    for id_producto, cantidad in cantidades_por_id.items():
+        condicion |= Q(pk=id_producto, stock__gte=cantidad)
+        casos.append(When(pk=id_producto, then=Value(cantidad)))
+
+    filas = Producto.objects.filter(condicion)
+    if control is not None:
+        dia_abierto = ControlDia.objects.filter(pk=control.pk, estado=ControlDia.ESTADO_ABIERTO)
+        filas = filas.filter(Exists(dia_abierto))
+    actualizados = filas.update(
+        stock=F('stock') - Case(*casos, default=Value(0)),
+        actualizado=timezone.now(),
+    )
+    if actualizados != len(cantidades_por_id):
+        # Consulta extra solo en el camino de error, para dar el motivo correcto
+        if control is not None and not dia_abierto.exists():
+            raise DiaCerrado('El día está CERRADO. No se pueden registrar nuevas ventas.')
+        raise StockInsuficiente('Stock insuficiente para uno o más productos.')
+
+
+def registrar_venta(*, tipo_documento, folio, productos_data, id_usuario, control, cliente=None, clave=None):
+    """Registra una venta completa y devuelve la instancia de Venta.
+
+    Consultas por venta: SELECT ... FOR UPDATE de los productos, INSERT de la
+    venta, INSERT masivo de los detalles, UPDATE de stock (que también
+    comprueba que ``control`` siga abierto), INSERT masivo de los movimientos
+    de stock, UPDATE del resumen diario y el INSERT y UPDATE del resumen por
+    producto.
+    """
+    if not productos_data:
+        raise VentaError('No hay productos en la venta.')
+    cantidades = agrupar_items(productos_data)
+
+    with transaction.atomic():
+        productos = {
+            p.codigo: p
+            for p in Producto.objects.select_for_update().filter(codigo__in=list(cantidades))
+        }
+
+        subtotal_venta = Decimal('0.00')
+        detalles = []
+        for codigo, cantidad in cantidades.items():
+            producto = productos.get(codigo)
+            if producto is None:
+                raise VentaError(f'El producto {codigo} no existe.')
+            if producto.stock < cantidad:
+                raise StockInsuficiente(f'Stock insuficiente para {producto.nombre}.')
+            precio_unitario = Decimal(producto.precio_unitario)
+            subtotal_item = precio_unitario * cantidad
+            detalles.append(DetalleVenta(
+                id_producto=producto,
+                cantidad=cantidad,
+                precio_unitario=precio_unitario,
+                subtotal=subtotal_item,
+            ))
+            subtotal_venta += subtotal_item
+
+        iva = (subtotal_venta * TASA_IVA).quantize(Decimal('0.00'))
+        total = subtotal_venta + iva
+
+        venta = Venta.objects.create(
+            tipo_documento=tipo_documento,
+            folio=folio,
+            subtotal=subtotal_venta.quantize(Decimal('0.00')),
+            iva=iva,
+            total=total.quantize(Decimal('0.00')),
+            id_usuario_id=id_usuario,
+            id_cliente=cliente,
+            id_control=control,
+            clave_idempotencia=clave,
+        )
+        for detalle in detalles:
+            detalle.id_venta = venta
+        DetalleVenta.objects.bulk_create(detalles)
+
+        cantidades_por_id = {productos[codigo].pk: cantidad for codigo, cantidad in cantidades.items()}
+        descontar_stock(cantidades_por_id, control=control)
+        inventario.salidas_por_venta(venta, cantidades_por_id)
+        acumular_venta(venta)
+        acumular_productos(venta, detalles)
+        transaction.on_commit(catalogo.productos.invalidar)
+
+    return venta
+
+
+def venta_por_clave(clave):
+    """Venta ya registrada con ``clave`` (una lectura por índice único), o None."""
+    if not clave:
+        return None
+    return Venta.objects.filter(clave_idempotencia=clave).only('id_venta', 'tipo_documento', 'folio').first()
+
+
+def _clave(datos):
+    clave = datos.get('clave') or None
+    if clave is not None and (not isinstance(clave, str) or len(clave) > 64):
+        raise VentaError('Clave de idempotencia inválida.')
+    return clave
+
+
+def _registrar_venta_pos(datos, clave, *, id_usuario, terminal, control):
+    tipo_documento = datos.get('tipo_documento')
+    if tipo_documento not in dict(Venta.TIPO_CHOICES):
+        raise VentaError('Tipo de documento inválido.')
+    if control is None or control.estado != ControlDia.ESTADO_ABIERTO:
+        raise DiaCerrado('El día está CERRADO. No se pueden registrar nuevas ventas.')
+
+    with transaction.atomic():
+        cliente = None
+        if tipo_documento == Venta.TIPO_FACTURA:
+            cliente_id = datos.get('cliente_id')
+            cliente_nuevo = datos.get('cliente_nuevo')
+            if cliente_id:
+                cliente = Cliente.objects.get(id=cliente_id)
+            elif cliente_nuevo:
+                cliente_form = ClienteForm(cliente_nuevo)
+                if not cliente_form.is_valid():
+                    raise VentaError('Datos del cliente inválidos.')
+                cliente = cliente_form.save()
+            else:
+                raise VentaError('Para Factura, debe seleccionar un cliente.')
+
+        # El folio se asigna al confirmar (el que vio el vendedor es solo referencial)
+        return registrar_venta(
+            tipo_documento=tipo_documento,
+            folio=siguiente_folio(tipo_documento, terminal=terminal),
+            productos_data=datos.get('productos'),
+            id_usuario=id_usuario,
+            control=control,
+            cliente=cliente,
+            clave=clave,
+        )
+
+
+def registrar_venta_pos(datos, *, id_usuario, terminal, control):
+    """Registra una venta tal como la envía el POS; devuelve (venta, repetida).
+
+    Resuelve el cliente (existente o nuevo si es Factura), asigna el folio y
+    llama a ``registrar_venta``, todo en una transacción. Si ``datos['clave']``
+    ya corresponde a una venta registrada se devuelve esa venta sin escribir
+    nada. La usan la vista normal y la asíncrona de ``crear_venta``.
+    """
+    clave = _clave(datos)
+    existente = venta_por_clave(clave)
+    if existente is not None:
+        return existente, True
+    try:
+        return _registrar_venta_pos(datos, clave, id_usuario=id_usuario, terminal=terminal, control=control), False
+    except IntegrityError:
+        # Un reenvío simultáneo con la misma clave se confirmó primero
+        existente = venta_por_clave(clave)
+        if existente is None:
+            raise
+        return existente, True
+
+
+def _resultado(clave, venta=None, repetida=False, error=None):
+    if isinstance(error, DiaCerrado):
+        # El terminal deja de reintentar y la vista descarta su copia del estado del día
+        return {'clave': clave, 'status': 'error', 'message': str(error), 'dia_cerrado': True}
+    if error is not None:
+        return {'clave': clave, 'status': 'error', 'message': str(error)}
+    return {
+        'clave': clave,
+        'status': 'success',
+        'repetida': repetida,
+        'tipo_documento': venta.tipo_documento,
+        'folio': venta.folio,
+    }
+
+
+def registrar_lote_pos(lote, *, id_usuario, terminal, control):
+    """Registra varias ventas encoladas por un terminal; devuelve un resultado por venta.
+
+    Todo el lote se confirma en una transacción y cada venta va en su propio
+    savepoint, de modo que una con error de negocio (stock, cliente, día
+    cerrado) se informa sin arrastrar a las demás. Un error de la base (p. ej.
+    un deadlock, que en MySQL revierte la transacción completa) no se atrapa:
+    el lote entero falla y el terminal lo reintenta. Las claves ya registradas
+    se buscan con una sola consulta y no vuelven a escribirse.
+    """
+    if not isinstance(lote, list) or not lote:
+        raise VentaError('El lote no contiene ventas.')
+    if len(lote) > LOTE_MAXIMO:
+        raise VentaError(f'El lote admite hasta {LOTE_MAXIMO} ventas.')
+
+    claves = [d.get('clave') for d in lote if isinstance(d, dict) and isinstance(d.get('clave'), str)]
+    registradas = {
+        v.clave_idempotencia: v
+        for v in Venta.objects.filter(clave_idempotencia__in=claves).only(
+            'id_venta', 'tipo_documento', 'folio', 'clave_idempotencia'
+        )
+    }
+
+    resultados = []
+    with transaction.atomic():
+        for datos in lote:
+            clave = datos.get('clave') if isinstance(datos, dict) else None
+            if not isinstance(clave, str):
+                clave = None
+            if clave in registradas:
+                resultados.append(_resultado(clave, registradas[clave], repetida=True))
+                continue
+            try:
+                if not isinstance(datos, dict):
+                    raise VentaError('Venta inválida.')
+                venta = _registrar_venta_pos(datos, _clave(datos), id_usuario=id_usuario, terminal=terminal, control=control)
+            except IntegrityError:
+                # Solo se informa como repetida la clave que otro envío confirmó primero
+                existente = venta_por_clave(clave)
+                if existente is None:
+                    raise
+                registradas[clave] = existente
+                resultados.append(_resultado(clave, existente, repetida=True))
+            except Cliente.DoesNotExist:
+                resultados.append(_resultado(clave, error=VentaError('El cliente seleccionado no existe.')))
+            except VentaError as e:
+                resultados.append(_resultado(clave, error=e))
+            else:
+                if clave:
+                    registradas[clave] = venta
+                resultados.append(_resultado(clave, venta))
+    return resultados
@@ -1,18 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth.hashers import check_password
 from datetime import date, datetime
 from django.utils import timezone
-from django.db import transaction
-from django.http import JsonResponse
-from django.db.models import Sum, Count, F, DecimalField, Max
+from django.urls import reverse
+from django.middleware.csrf import get_token
+from django.db import close_old_connections, transaction
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Sum
 from decimal import Decimal
 import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-from .forms import LoginForm, ProductoForm, ClienteForm, UsuarioForm, VentaForm, DetalleVentaForm
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .forms import LoginForm, ProductoForm, ClienteForm, UsuarioForm, VentaForm
 from django import forms
-from .models import Usuario, Producto, Cliente, ControlDia, Venta, DetalleVenta
+from .models import Usuario, Producto, Cliente, MovimientoStock, PronosticoStock, ResumenVentaDiaria
 from .decorators import custom_login_required, role_required
+from .paginacion import paginar
+from .ventas import DiaCerrado, VentaError, registrar_lote_pos, registrar_venta_pos
+from .folios import afolio_sugerido, folio_sugerido
+from . import acceso, analitica, busqueda, catalogo, estado_dia, exportar, inventario, metricas, pronostico, reportes, sesiones
 
 
 def login_view(request):
@@ -20,20 +31,18 @@ def login_view(request):
 	if request.method == 'POST' and form.is_valid():
 		username = form.cleaned_data.get('username')
 		password = form.cleaned_data.get('password')
+		# Límite de intentos, política de hash y re-login de kiosco en acceso.py
 		try:
-			usuario = Usuario.objects.get(username=username)
-		except Usuario.DoesNotExist:
-			messages.error(request, 'Usuario no encontrado')
-			return render(request, 'login.html', {'form': form})
-
-		if check_password(password, usuario.password):
+			usuario = acceso.autenticar(request, username, password)
+		except acceso.DemasiadosIntentos as e:
+			messages.error(request, str(e))
+			return render(request, 'login.html', {'form': form}, status=429)
+		except acceso.AccesoDenegado as e:
+			messages.error(request, str(e))
+		else:
 			# Guardar datos en sesión manualmente
-			request.session['usuario_id'] = usuario.id_usuario
-			request.session['username'] = usuario.username
-			request.session['rol'] = usuario.rol
+			sesiones.iniciar(request, usuario)
 			return redirect('home')
-		else:
-			messages.error(request, 'Contraseña incorrecta')
 
 	return render(request, 'login.html', {'form': form})
 
@@ -48,11 +57,8 @@ def home(request):
 	rol = request.session.get('rol')
 	context = {}
 
-	# 1. Intentar obtener el control del día
-	try:
-		control_hoy = ControlDia.objects.get(fecha=date.today())
-	except ControlDia.DoesNotExist:
-		control_hoy = None
+	# 1. Control del día, desde la copia en memoria del proceso
+	control_hoy = estado_dia.hoy()
 
 	# 2. Lógica para VENDEDOR
 	if rol == 'Vendedor':
@@ -65,14 +71,8 @@ def home(request):
 	# 3. Lógica para JEFE DE VENTAS
 	if rol == 'Jefe de Ventas':
 		context['control_hoy'] = control_hoy
-		# Calcular total recaudado hoy
-		hoy = timezone.now().date()
-		start_of_day = datetime.combine(hoy, datetime.min.time())
-		end_of_day = datetime.combine(hoy, datetime.max.time())
-		aware_start_of_day = timezone.make_aware(start_of_day)
-		aware_end_of_day = timezone.make_aware(end_of_day)
-		ventas_hoy = Venta.objects.filter(fecha__range=(aware_start_of_day, aware_end_of_day))
-		total_hoy = ventas_hoy.aggregate(total_recaudado=Sum('total'))
+		# Total recaudado hoy, leído del resumen diario (pocas filas por día)
+		total_hoy = ResumenVentaDiaria.objects.filter(fecha=timezone.localdate()).aggregate(total_recaudado=Sum('total'))
 		context['total_recaudado_hoy'] = total_hoy.get('total_recaudado') or Decimal('0.00')
 
 	# 4. Renderizar el dashboard
@@ -83,8 +83,13 @@ def home(request):
 @custom_login_required
 @role_required(allowed_roles=['Jefe de Ventas'])
 def listar_productos(request):
-	productos = Producto.objects.all()
-	return render(request, 'administracion/listar_productos.html', {'productos': productos})
+	productos = paginar(
+		request,
+		Producto.objects.all(),
+		ordenes=[('codigo', 'Código'), ('nombre', 'Nombre'), ('stock', 'Stock')],
+		busqueda=('codigo', 'nombre'),
+	)
+	return render(request, 'administracion/listar_productos.html', {'productos': productos, 'pagina': productos})
 
 
 @custom_login_required
@@ -93,7 +98,12 @@ def crear_producto(request):
 	if request.method == 'POST':
 		form = ProductoForm(request.POST)
 		if form.is_valid():
-			form.save()
+			with transaction.atomic():
+				producto = form.save()
+				inventario.registrar_cambios(
+					{producto.pk: producto.stock}, {}, MovimientoStock.TIPO_INICIAL,
+					id_usuario=request.session.get('usuario_id'),
+				)
 			messages.success(request, 'Producto creado exitosamente.')
 			return redirect('listar_productos')
 	else:
@@ -109,7 +119,14 @@ def editar_producto(request, codigo):
 	if request.method == 'POST':
 		form = ProductoForm(request.POST, instance=producto)
 		if form.is_valid():
-			form.save()
+			with transaction.atomic():
+				# El stock vigente se lee bloqueado: una venta en curso no se pierde del libro
+				anterior = Producto.objects.select_for_update().values_list('stock', flat=True).get(pk=producto.pk)
+				form.save()
+				inventario.registrar_cambios(
+					{producto.pk: producto.stock}, {producto.pk: anterior}, MovimientoStock.TIPO_AJUSTE,
+					id_usuario=request.session.get('usuario_id'),
+				)
 			messages.success(request, 'Producto actualizado exitosamente.')
 			return redirect('listar_productos')
 	else:
@@ -123,10 +140,12 @@ def editar_producto(request, codigo):
 def eliminar_producto(request, codigo):
 	producto = get_object_or_404(Producto, codigo=codigo)
 	try:
-		producto.delete()
+		# Sin ventas se borra también su libro de stock; con ventas se conserva todo
+		inventario.eliminar_producto(producto)
+		transaction.on_commit(catalogo.productos.invalidar)
 		messages.success(request, 'Producto eliminado exitosamente.')
 	except Exception:
-		messages.error(request, 'No se puede eliminar el producto, está siendo usado en una venta.')
+		messages.error(request, 'No se puede eliminar el producto: tiene ventas registradas.')
 
 	return redirect('listar_productos')
 
@@ -135,8 +154,13 @@ def eliminar_producto(request, codigo):
 @custom_login_required
 @role_required(allowed_roles=['Jefe de Ventas'])
 def listar_clientes(request):
-	clientes = Cliente.objects.all()
-	return render(request, 'administracion/listar_clientes.html', {'clientes': clientes})
+	clientes = paginar(
+		request,
+		Cliente.objects.all(),
+		ordenes=[('rut', 'RUT'), ('razon_social', 'Razón Social')],
+		busqueda=('rut', 'razon_social'),
+	)
+	return render(request, 'administracion/listar_clientes.html', {'clientes': clientes, 'pagina': clientes})
 
 
 @custom_login_required
@@ -176,6 +200,7 @@ def eliminar_cliente(request, rut):
 	cliente = get_object_or_404(Cliente, rut=rut)
 	try:
 		cliente.delete()
+		transaction.on_commit(catalogo.clientes.invalidar)
 		messages.success(request, 'Cliente eliminado exitosamente.')
 	except Exception:
 		messages.error(request, 'No se puede eliminar el cliente, está siendo usado en una venta.')
@@ -187,8 +212,13 @@ def eliminar_cliente(request, rut):
 @custom_login_required
 @role_required(allowed_roles=['Jefe de Ventas'])
 def listar_usuarios(request):
-	usuarios = Usuario.objects.all()
-	return render(request, 'administracion/listar_usuarios.html', {'usuarios': usuarios})
+	usuarios = paginar(
+		request,
+		Usuario.objects.all(),
+		ordenes=[('id_usuario', 'ID'), ('username', 'Nombre de Usuario')],
+		busqueda=('username', 'rol'),
+	)
+	return render(request, 'administracion/listar_usuarios.html', {'usuarios': usuarios, 'pagina': usuarios})
 
 
 @custom_login_required
@@ -213,7 +243,11 @@ def editar_usuario(request, id_usuario):
 	if request.method == 'POST':
 		form = UsuarioForm(request.POST, instance=usuario)
 		if form.is_valid():
-			form.save()
+			usuario = form.save()
+			# Cambió el rol o la contraseña: cerrar sus sesiones abiertas
+			sesiones.revocar(usuario.id_usuario)
+			if usuario.id_usuario == request.session.get('usuario_id'):
+				sesiones.iniciar(request, usuario)
 			messages.success(request, 'Usuario actualizado exitosamente.')
 			return redirect('listar_usuarios')
 	else:
@@ -235,7 +269,9 @@ def eliminar_usuario(request, id_usuario):
 		return redirect('listar_usuarios')
 
 	try:
+		usuario_id = usuario.id_usuario
 		usuario.delete()
+		sesiones.revocar(usuario_id)
 		messages.success(request, 'Usuario eliminado exitosamente.')
 	except Exception:
 		messages.error(request, 'No se puede eliminar el usuario, está asociado a ventas.')
@@ -247,142 +283,134 @@ def eliminar_usuario(request, id_usuario):
 @custom_login_required
 @role_required(allowed_roles=['Jefe de Ventas'])
 def control_dia(request):
-	# Obtenemos o creamos el control para la fecha de HOY
-	control_hoy, created = ControlDia.objects.get_or_create(
-		fecha=date.today(),
-		defaults={'id_usuario_id': request.session.get('usuario_id')}
-	)
 	if request.method == 'POST':
-		# Invertimos el estado
-		if control_hoy.estado == 'Cerrado':
-			control_hoy.estado = 'Abierto'
+		# Invertimos el estado y avisamos a todos los procesos
+		control_hoy = estado_dia.alternar(request.session.get('usuario_id'))
+		if control_hoy.estado == 'Abierto':
 			messages.success(request, 'El día ha sido ABIERTO. Ya se pueden registrar ventas.')
 		else:
-			control_hoy.estado = 'Cerrado'
 			messages.warning(request, 'El día ha sido CERRADO. No se registrarán nuevas ventas.')
-        
-		control_hoy.id_usuario_id = request.session.get('usuario_id') # Actualizamos quien hizo el cambio
-		control_hoy.save()
 		return redirect('control_dia')
+	# Obtenemos o creamos el control para la fecha de HOY
+	control_hoy = estado_dia.obtener_o_crear(request.session.get('usuario_id'))
 	return render(request, 'control/control_dia.html', {'control_hoy': control_hoy})
 
 
 # --- VISTA DE REGISTRO DE VENTAS (Vendedor) ---
+def _terminal(request, usuario_id=None):
+	# Cada vendedor opera su propio terminal; se usa para los bloques de folios
+	usuario_id = usuario_id or request.session.get('usuario_id')
+	return f'usuario-{usuario_id}' if usuario_id else None
+
+
+@lru_cache(maxsize=2)
+def _urls_pos(asincrono):
+	# Con POS_ASINCRONO la pantalla usa los endpoints asíncronos (servidor ASGI)
+	sufijo = '_async' if asincrono else ''
+	return {
+		'catalogo_productos': reverse(f'catalogo_productos{sufijo}'),
+		'catalogo_clientes': reverse(f'catalogo_clientes{sufijo}'),
+		'siguiente_folio': reverse(f'get_next_folio{sufijo}'),
+		'guardar_venta': reverse(f'crear_venta{sufijo}'),
+		'buscar_productos': reverse('buscar_productos'),
+		'ventas_lote': reverse('crear_ventas_lote'),
+		'home': reverse('home'),
+	}
+
+
+def _config_pos(request):
+	# Lo único variable del POS; el script (static/ventas/pos.js) lo lee de #pos-config
+	return {
+		'urls': _urls_pos(settings.POS_ASINCRONO),
+		'csrf': get_token(request),
+		'cola': f"ventas-pendientes-{request.session.get('usuario_id')}",
+	}
+
+
+def _datos_venta(request):
+	# La clave de idempotencia puede venir en el cuerpo o en la cabecera
+	data = json.loads(request.body)
+	if isinstance(data, dict) and not data.get('clave'):
+		data['clave'] = request.headers.get('Idempotency-Key')
+	return data
+
+
+def _respuesta_venta(request, venta, repetida):
+	if repetida:
+		# Reenvío de una venta ya registrada: no se escribe nada
+		return JsonResponse({'status': 'success', 'message': 'Venta ya registrada.', 'folio': venta.folio, 'repetida': True})
+	messages.success(request, f'Venta registrada exitosamente ({venta.tipo_documento} N° {venta.folio}).')
+	return JsonResponse({'status': 'success', 'message': 'Venta registrada.', 'folio': venta.folio, 'repetida': False})
+
+
 @custom_login_required
 @role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
-@transaction.atomic  # Asegura que toda la venta se guarde correctamente
 def crear_venta(request):
-	# 1. Verificar si el día está abierto
-	try:
-		control_hoy = ControlDia.objects.get(fecha=date.today())
-		if control_hoy.estado == 'Cerrado':
-			messages.error(request, 'El día está CERRADO. No se pueden registrar nuevas ventas.')
-			return redirect('home')
-	except ControlDia.DoesNotExist:
+	# 1. Verificar si el día está abierto (copia en memoria; registrar_venta lo vuelve a exigir)
+	control_hoy = estado_dia.hoy()
+	if control_hoy is None:
 		messages.error(request, 'No se ha abierto el día. Contacte al Jefe de Ventas.')
 		return redirect('home')
+	if control_hoy.estado == 'Cerrado':
+		messages.error(request, 'El día está CERRADO. No se pueden registrar nuevas ventas.')
+		return redirect('home')
 	if request.method == 'POST':
 		# 2. Procesar el POST (enviado por JavaScript/Fetch)
 		try:
-			data = json.loads(request.body)
-			tipo_documento = data.get('tipo_documento')
-			folio_num = data.get('folio')
-			# Intentar normalizar folio a entero; si no viene, calcular siguiente folio
-			if folio_num is not None:
-				try:
-					folio_num = int(folio_num)
-				except (ValueError, TypeError):
-					return JsonResponse({'status': 'error', 'message': 'Folio inválido.'}, status=400)
-			else:
-				# Calcular siguiente folio de forma segura
-				max_folio_q = Venta.objects.filter(tipo_documento=tipo_documento).aggregate(max_folio=Max('folio'))
-				folio_num = (max_folio_q['max_folio'] or 0) + 1
-			cliente_id = data.get('cliente_id')
-			cliente_nuevo = data.get('cliente_nuevo')
-			productos_data = data.get('productos')
-			# 3. Validar Cliente (si es Factura)
-			cliente_obj = None
-			if tipo_documento == 'Factura':
-				if cliente_id:
-					cliente_obj = Cliente.objects.get(id=cliente_id)
-				elif cliente_nuevo:
-					cliente_form = ClienteForm(cliente_nuevo)
-					if cliente_form.is_valid():
-						cliente_obj = cliente_form.save()
-					else:
-						return JsonResponse({'status': 'error', 'message': 'Datos del cliente inválidos.'}, status=400)
-				else:
-					return JsonResponse({'status': 'error', 'message': 'Para Factura, debe seleccionar un cliente.'}, status=400)
-			# 4. Calcular totales
-			subtotal_venta = Decimal('0.00')
-			detalles_venta = []
-			if not productos_data:
-				return JsonResponse({'status': 'error', 'message': 'No hay productos en la venta.'}, status=400)
-			for item in productos_data:
-				producto = Producto.objects.get(codigo=item['codigo'])
-				cantidad = int(item['cantidad'])
-				precio_unitario = Decimal(producto.precio_unitario)
-				subtotal_item = precio_unitario * cantidad
-
-				if producto.stock < cantidad:
-					return JsonResponse({'status': 'error', 'message': f'Stock insuficiente para {producto.nombre}.'}, status=400)
-
-				detalles_venta.append({
-					'producto': producto,
-					'cantidad': cantidad,
-					'precio_unitario': precio_unitario,
-					'subtotal': subtotal_item
-				})
-				subtotal_venta += subtotal_item
-			iva = (subtotal_venta * Decimal('0.19')).quantize(Decimal('0.00'))
-			total = subtotal_venta + iva
-			# 5. Guardar la Venta
-			venta = Venta.objects.create(
-				tipo_documento=tipo_documento,
-				folio=folio_num,
-				subtotal=subtotal_venta.quantize(Decimal('0.00')),
-				iva=iva,
-				total=total.quantize(Decimal('0.00')),
-				id_usuario_id=request.session.get('usuario_id'),
-				id_cliente=cliente_obj,
-				id_control=control_hoy
+			data = _datos_venta(request)
+			# 3. Cliente, folio, venta, detalles y stock en una transacción de registrar_venta_pos (consultas constantes)
+			venta, repetida = registrar_venta_pos(
+				data,
+				id_usuario=request.session.get('usuario_id'),
+				terminal=_terminal(request),
+				control=control_hoy,
 			)
-			# 6. Guardar Detalles de Venta y actualizar Stock
-			for detalle in detalles_venta:
-				DetalleVenta.objects.create(
-					id_venta=venta,
-					id_producto=detalle['producto'],
-					cantidad=detalle['cantidad'],
-					precio_unitario=detalle['precio_unitario'],
-					subtotal=detalle['subtotal']
-				)
-				producto_obj = detalle['producto']
-				producto_obj.stock -= detalle['cantidad']
-				producto_obj.save()
-			messages.success(request, 'Venta registrada exitosamente.')
-			return JsonResponse({'status': 'success', 'message': 'Venta registrada.'})
+			return _respuesta_venta(request, venta, repetida)
+		except DiaCerrado as e:
+			# La copia local estaba vencida: el día se cerró en otro proceso
+			estado_dia.olvidar()
+			return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 		except Exception as e:
 			return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 	else:
 		venta_form = VentaForm()
 		cliente_form = ClienteForm()
-		detalle_form = DetalleVentaForm()
-		productos_qs = Producto.objects.filter(stock__gt=0).values('codigo', 'nombre', 'precio_unitario', 'stock')
-		productos_list = []
-		for p in productos_qs:
-			p['precio_unitario'] = str(p['precio_unitario'])
-			productos_list.append(p)
-		clientes = list(Cliente.objects.values('id', 'rut', 'razon_social', 'giro', 'direccion'))
+		# Productos y clientes se cargan después desde los catálogos JSON
 		context = {
 			'venta_form': venta_form,
 			'cliente_form': cliente_form,
-			'detalle_form': detalle_form,
-			'productos_json': productos_list,
-			'clientes_json': clientes,
+			'config_pos': _config_pos(request),
 		}
 		return render(request, 'ventas/crear_venta.html', context)
 
 
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+def crear_ventas_lote(request):
+	# Ventas encoladas por el POS sin conexión: una transacción, un resultado por venta
+	if request.method != 'POST':
+		return JsonResponse({'status': 'error', 'message': 'Método no permitido.'}, status=405)
+	control_hoy = estado_dia.hoy()
+	if not estado_dia.dia_abierto(control_hoy):
+		return JsonResponse({'status': 'error', 'message': 'El día no está abierto. No se pueden registrar ventas.'}, status=400)
+	try:
+		lote = json.loads(request.body).get('ventas')
+		resultados = registrar_lote_pos(
+			lote,
+			id_usuario=request.session.get('usuario_id'),
+			terminal=_terminal(request),
+			control=control_hoy,
+		)
+	except (ValueError, AttributeError):
+		return JsonResponse({'status': 'error', 'message': 'Lote inválido.'}, status=400)
+	except VentaError as e:
+		return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+	if any(r.get('dia_cerrado') for r in resultados):
+		# La copia local estaba vencida, como en crear_venta
+		estado_dia.olvidar()
+	return JsonResponse({'status': 'success', 'resultados': resultados})
+
+
 # --- VISTA DE REPORTE DIARIO (Jefe de Ventas) ---
 @custom_login_required
 @role_required(allowed_roles=['Jefe de Ventas'])
@@ -392,33 +420,29 @@ def reporte_diario(request):
 		try:
 			fecha_reporte = date.fromisoformat(fecha_str)
 		except ValueError:
-			fecha_reporte = timezone.now().date()
+			fecha_reporte = timezone.localdate()
 			messages.error(request, 'Formato de fecha inválido. Mostrando reporte de hoy.')
 	else:
-		fecha_reporte = timezone.now().date()
+		fecha_reporte = timezone.localdate()
 
-	start_of_day = datetime.combine(fecha_reporte, datetime.min.time())
-	end_of_day = datetime.combine(fecha_reporte, datetime.max.time())
-	aware_start_of_day = timezone.make_aware(start_of_day)
-	aware_end_of_day = timezone.make_aware(end_of_day)
+	# Se lee el resumen diario: a lo más (tipos de documento x vendedores) filas
+	resumen_dia = ResumenVentaDiaria.objects.filter(fecha=fecha_reporte)
 
-	ventas_dia = Venta.objects.filter(fecha__range=(aware_start_of_day, aware_end_of_day))
-
-	total_por_documento = ventas_dia.values('tipo_documento').annotate(
-		cantidad=Count('id_venta'),
+	total_por_documento = resumen_dia.values('tipo_documento').annotate(
+		cantidad=Sum('cantidad'),
 		total=Sum('total')
 	).order_by('tipo_documento')
 
-	total_por_vendedor = ventas_dia.values('id_usuario__username').annotate(
-		cantidad=Count('id_venta'),
+	total_por_vendedor = resumen_dia.values('id_usuario__username').annotate(
+		cantidad=Sum('cantidad'),
 		total=Sum('total')
 	).order_by('id_usuario__username')
 
-	totales_generales = ventas_dia.aggregate(
+	totales_generales = resumen_dia.aggregate(
 		total_neto=Sum('subtotal'),
 		total_iva=Sum('iva'),
 		total_recaudado=Sum('total'),
-		cantidad_ventas=Count('id_venta')
+		cantidad_ventas=Sum('cantidad')
 	)
 
 	context = {
@@ -431,13 +455,259 @@ def reporte_diario(request):
 	return render(request, 'reportes/reporte_diario.html', context)
 
 
+# --- VISTA DE REPORTE POR PERÍODO (Jefe de Ventas) ---
+def _fecha_param(request, nombre):
+	valor = request.GET.get(nombre)
+	return date.fromisoformat(valor) if valor else None
+
+
+def _periodo_param(request, por_defecto='semana'):
+	try:
+		return reportes.periodo(
+			request.GET.get('periodo', por_defecto),
+			fecha=_fecha_param(request, 'fecha'),
+			desde=_fecha_param(request, 'desde'),
+			hasta=_fecha_param(request, 'hasta'),
+		)
+	except ValueError as e:
+		# Cubre fechas mal escritas y PeriodoInvalido
+		messages.error(request, f'Período inválido: {e}. Mostrando el período actual.')
+		return reportes.periodo(por_defecto)
+
+
+@custom_login_required
+@role_required(allowed_roles=['Jefe de Ventas'])
+def reporte_ventas(request):
+	context = reportes.generar(_periodo_param(request))
+	context['tipos_periodo'] = reportes.TIPOS_PERIODO
+	return render(request, 'reportes/reporte_ventas.html', context)
+
+
+# --- ANALÍTICA DE PRODUCTOS (Jefe de Ventas) ---
+@custom_login_required
+@role_required(allowed_roles=['Jefe de Ventas'])
+def analitica_productos(request):
+	try:
+		n = int(request.GET.get('n', 10))
+	except ValueError:
+		n = 10
+	context = analitica.top(_periodo_param(request, por_defecto='mes'), n=n)
+	context['tipos_periodo'] = reportes.TIPOS_PERIODO
+	return render(request, 'reportes/analitica_productos.html', context)
+
+
+# --- REPOSICIÓN DE STOCK (Jefe de Ventas) ---
+@custom_login_required
+@role_required(allowed_roles=['Jefe de Ventas'])
+def reposicion_stock(request):
+	if request.method == 'POST':
+		por_reponer = pronostico.ejecutar()
+		messages.success(request, f'Pronóstico recalculado: {por_reponer} productos por reponer.')
+		return redirect('reposicion_stock')
+
+	productos = paginar(
+		request,
+		PronosticoStock.objects.select_related('id_producto').filter(sugerido__gt=0),
+		ordenes=[('dias_hasta_quiebre', 'Días hasta quiebre'), ('sugerido', 'Cantidad sugerida')],
+		busqueda=('id_producto__codigo', 'id_producto__nombre'),
+	)
+	calculado = PronosticoStock.objects.values_list('calculado', flat=True).first()
+	return render(request, 'reportes/reposicion_stock.html', {
+		'productos': productos, 'pagina': productos, 'calculado': calculado,
+	})
+
+
+# --- STOCK A UNA FECHA (Jefe de Ventas) ---
+@custom_login_required
+@role_required(allowed_roles=['Jefe de Ventas'])
+def stock_en_fecha(request, codigo):
+	producto = get_object_or_404(Producto.objects.only('id', 'codigo'), codigo=codigo)
+	try:
+		momento = datetime.fromisoformat(request.GET['en']) if request.GET.get('en') else timezone.now()
+	except ValueError:
+		return JsonResponse({'status': 'error', 'message': 'Fecha inválida; use el formato ISO 8601.'}, status=400)
+	if timezone.is_naive(momento):
+		momento = timezone.make_aware(momento)
+	return JsonResponse({
+		'codigo': producto.codigo,
+		'en': momento.isoformat(),
+		'stock': inventario.stock_en(producto.pk, momento),
+	})
+
+
+# --- MÉTRICAS DEL PROCESO (Jefe de Ventas) ---
+@custom_login_required
+@role_required(allowed_roles=['Jefe de Ventas'])
+def metricas_json(request):
+	try:
+		recientes = max(0, min(int(request.GET.get('recientes', 0)), metricas.buffer.capacidad))
+	except ValueError:
+		recientes = 0
+	return JsonResponse(metricas.resumen(recientes=recientes))
+
+
+# --- EXPORTACIÓN DE VENTAS (Jefe de Ventas) ---
+@custom_login_required
+@role_required(allowed_roles=['Jefe de Ventas'])
+def exportar_ventas(request):
+	try:
+		desde = date.fromisoformat(request.GET.get('desde', ''))
+		hasta = date.fromisoformat(request.GET.get('hasta', ''))
+	except ValueError:
+		messages.error(request, 'Debe indicar un rango de fechas válido para exportar.')
+		return redirect('reporte_diario')
+	if hasta < desde:
+		messages.error(request, 'La fecha final no puede ser anterior a la inicial.')
+		return redirect('reporte_diario')
+
+	nombre = f'ventas_{desde.isoformat()}_{hasta.isoformat()}'
+	if request.GET.get('formato') == 'xlsx':
+		# La planilla se arma en disco (modo write_only) y se envía por partes
+		archivo = tempfile.TemporaryFile()
+		exportar.escribir_xlsx(desde, hasta, archivo)
+		archivo.seek(0)
+		return FileResponse(archivo, as_attachment=True, filename=f'{nombre}.xlsx')
+
+	respuesta = StreamingHttpResponse(exportar.csv_en_stream(desde, hasta), content_type='text/csv; charset=utf-8')
+	respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+	return respuesta
+
+
 def get_next_folio(request):
 	tipo_documento = request.GET.get('tipo_documento')
 	if not tipo_documento:
 		return JsonResponse({'error': 'Falta tipo de documento'}, status=400)
 
-	# Busca el folio máximo para ese tipo de documento
-	max_folio = Venta.objects.filter(tipo_documento=tipo_documento).aggregate(max_folio=Max('folio'))
-	next_folio = (max_folio['max_folio'] or 0) + 1
+	# Lectura O(1) de la secuencia; el folio definitivo se asigna al registrar la venta
+	next_folio = folio_sugerido(tipo_documento, terminal=_terminal(request))
 
 	return JsonResponse({'next_folio': next_folio})
+
+
+# --- CATÁLOGOS JSON PARA EL POS ---
+def _respuesta_catalogo(request, catalogo_pos):
+	desde = request.GET.get('desde')
+	try:
+		if desde:
+			version, cuerpo = catalogo_pos.cambios_desde(desde)
+		else:
+			version, cuerpo = catalogo_pos.completo()
+	except catalogo.VersionInvalida:
+		return JsonResponse({'error': 'Versión inválida'}, status=400)
+	return _json_con_etag(request, version, cuerpo, desde)
+
+
+def _json_con_etag(request, version, cuerpo, desde):
+	etag = f'"{version}-{desde}"' if desde else f'"{version}"'
+	if etag in request.headers.get('If-None-Match', ''):
+		respuesta = HttpResponse(status=304)
+	else:
+		respuesta = HttpResponse(cuerpo, content_type='application/json')
+	respuesta['ETag'] = etag
+	# El navegador guarda la copia pero siempre revalida con If-None-Match
+	respuesta['Cache-Control'] = 'private, no-cache'
+	return respuesta
+
+
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+def catalogo_productos(request):
+	return _respuesta_catalogo(request, catalogo.productos)
+
+
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+def catalogo_clientes(request):
+	return _respuesta_catalogo(request, catalogo.clientes)
+
+
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+def buscar_productos(request):
+	try:
+		limite = int(request.GET.get('limite', 20))
+	except ValueError:
+		return JsonResponse({'error': 'Límite inválido'}, status=400)
+	resultados = busqueda.indice.buscar(request.GET.get('q', ''), limite=limite)
+	return JsonResponse({'resultados': resultados})
+
+
+# --- API ASÍNCRONA DEL POS (ASGI) ---
+# Mismos endpoints JSON que arriba, pero sin ocupar un hilo mientras esperan:
+# las lecturas usan el ORM asíncrono y la transacción de la venta corre en un
+# pool de hilos acotado (VENTAS_ASYNC_HILOS), que también acota las conexiones.
+@lru_cache(maxsize=None)
+def _pool_ventas():
+	return ThreadPoolExecutor(max_workers=settings.VENTAS_ASYNC_HILOS, thread_name_prefix='ventas')
+
+
+def _en_pool(funcion, *args, **kwargs):
+	# Cada hilo del pool tiene su propia conexión; se recicla como en un request
+	close_old_connections()
+	try:
+		return funcion(*args, **kwargs)
+	finally:
+		close_old_connections()
+
+
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+async def crear_venta_async(request):
+	if request.method != 'POST':
+		return JsonResponse({'status': 'error', 'message': 'Método no permitido.'}, status=405)
+	control_hoy = await estado_dia.ahoy()
+	if control_hoy is None:
+		return JsonResponse({'status': 'error', 'message': 'No se ha abierto el día. Contacte al Jefe de Ventas.'}, status=400)
+	if control_hoy.estado == 'Cerrado':
+		return JsonResponse({'status': 'error', 'message': 'El día está CERRADO. No se pueden registrar nuevas ventas.'}, status=400)
+
+	usuario_id = await request.session.aget('usuario_id')
+	try:
+		data = _datos_venta(request)
+		venta, repetida = await sync_to_async(_en_pool, thread_sensitive=False, executor=_pool_ventas())(
+			registrar_venta_pos,
+			data,
+			id_usuario=usuario_id,
+			terminal=_terminal(request, usuario_id),
+			control=control_hoy,
+		)
+	except DiaCerrado as e:
+		estado_dia.olvidar()
+		return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+	except Exception as e:
+		return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+	return _respuesta_venta(request, venta, repetida)
+
+
+@custom_login_required
+async def get_next_folio_async(request):
+	tipo_documento = request.GET.get('tipo_documento')
+	if not tipo_documento:
+		return JsonResponse({'error': 'Falta tipo de documento'}, status=400)
+	usuario_id = await request.session.aget('usuario_id')
+	next_folio = await afolio_sugerido(tipo_documento, terminal=_terminal(request, usuario_id))
+	return JsonResponse({'next_folio': next_folio})
+
+
+async def _respuesta_catalogo_async(request, catalogo_pos):
+	desde = request.GET.get('desde')
+	try:
+		if desde:
+			version, cuerpo = await catalogo_pos.acambios_desde(desde)
+		else:
+			version, cuerpo = await catalogo_pos.acompleto()
+	except catalogo.VersionInvalida:
+		return JsonResponse({'error': 'Versión inválida'}, status=400)
+	return _json_con_etag(request, version, cuerpo, desde)
+
+
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+async def catalogo_productos_async(request):
+	return await _respuesta_catalogo_async(request, catalogo.productos)
+
+
+@custom_login_required
+@role_required(allowed_roles=['Vendedor', 'Jefe de Ventas'])
+async def catalogo_clientes_async(request):
+	return await _respuesta_catalogo_async(request, catalogo.clientes)
@@ -0,0 +1,10 @@
+"""Benchmarks del proyecto Bazar.
+
+Cada script se ejecuta desde la raíz del proyecto, por ejemplo:
+
+    python -m benchmarks.bench_venta
+
+Los scripts crean una base de datos de prueba temporal (igual que
+``manage.py test``) y la destruyen al terminar, por lo que nunca tocan los
+datos reales.
+"""
@@ -0,0 +1,59 @@
+"""Búsqueda de productos: índice en memoria contra ``icontains`` del ORM.
+
+    python -m benchmarks.bench_busqueda [cantidad_productos]
+"""
+import random
+import sys
+from decimal import Decimal
+
+from benchmarks.comun import base_de_datos_temporal, medir, preparar_django, resumen
+
+
+PALABRAS = [
+    'lápiz', 'cuaderno', 'goma', 'regla', 'tijera', 'pegamento', 'carpeta', 'archivador',
+    'plumón', 'destacador', 'corrector', 'block', 'cartulina', 'sobre', 'clip', 'corchete',
+]
+COLORES = ['azul', 'rojo', 'negro', 'verde', 'amarillo', 'blanco']
+CONSULTAS = ['la', 'lapiz', 'cuad', 'azul', 'P0123', 'grande', 'ulina', 'tijera ver', 'zzz']
+REPETICIONES = 200
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    preparar_django()
+    from VENTASAPP.busqueda import IndiceProductos
+    from VENTASAPP.models import Producto
+
+    azar = random.Random(42)
+    with base_de_datos_temporal():
+        Producto.objects.bulk_create([
+            Producto(
+                codigo=f'P{i:06d}',
+                nombre=f'{azar.choice(PALABRAS).capitalize()} {azar.choice(COLORES)} {azar.choice(["chico", "mediano", "grande"])}',
+                precio_unitario=Decimal('990.00'),
+                stock=azar.randint(0, 50),
+            )
+            for i in range(cantidad)
+        ], batch_size=5000)
+
+        indice = IndiceProductos()
+        construccion = medir(indice.sincronizar, 1)[0]
+        print(f'{cantidad} productos, índice construido en {construccion:.0f} ms\n')
+        print(f"{'consulta':<12} {'índice p50':>11} {'índice p99':>11} {'ORM p50':>9} {'ORM p99':>9}")
+
+        for consulta in CONSULTAS:
+            en_indice = resumen(medir(lambda: indice.buscar(consulta, limite=20), REPETICIONES))
+
+            def orm():
+                list(Producto.objects.filter(stock__gt=0, nombre__icontains=consulta)
+                     .values('codigo', 'nombre', 'precio_unitario', 'stock')[:20])
+                list(Producto.objects.filter(stock__gt=0, codigo__icontains=consulta)
+                     .values('codigo', 'nombre', 'precio_unitario', 'stock')[:20])
+
+            en_orm = resumen(medir(orm, max(10, REPETICIONES // 10)))
+            print(f"{consulta:<12} {en_indice['p50']:>9.3f}ms {en_indice['p99']:>9.3f}ms "
+                  f"{en_orm['p50']:>7.2f}ms {en_orm['p99']:>7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
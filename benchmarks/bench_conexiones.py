@@ -0,0 +1,115 @@
+"""Costo de abrir la conexión a la base en cada request, según cómo se reusan.
+
+Mismas requests livianas (stock de un producto, pocas consultas) por el stack
+completo con el cliente de pruebas. Después de cada una se llama
+``close_old_connections`` como lo hace el servidor al terminar el request (el
+cliente de pruebas no lo hace):
+
+* ``por_request``: CONN_MAX_AGE = 0, una conexión nueva por request.
+* ``persistente``: CONN_MAX_AGE = 60 sin health checks.
+* ``persistente_hc``: lo mismo con CONN_HEALTH_CHECKS (un ping antes de reusarla).
+* ``pool``: el pool de VENTASAPP/conexiones.py (CONN_MAX_AGE = 0, health checks).
+
+Por escenario se informa el tiempo dentro de ``connect()`` por request y las
+conexiones abiertas según las métricas por vista. Hay que correrlo contra la
+base real (MySQL, donde abrir la conexión cuesta de verdad) o al menos una
+SQLite en archivo: en una SQLite en memoria Django nunca cierra la conexión.
+
+    python -m benchmarks.bench_conexiones [repeticiones]
+"""
+import sys
+import time
+
+from benchmarks.comun import base_de_datos_temporal, crear_datos_base, guardar_resultados, preparar_django, resumen
+
+
+ESCENARIOS = {
+    'por_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistente': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    'persistente_hc': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def conexion_del_escenario(original, nombre, ajustes):
+    """Un DatabaseWrapper nuevo para 'default' con los ajustes del escenario."""
+    from VENTASAPP.conexiones import ConexionesEnPool
+
+    settings_dict = {**original.settings_dict, **ajustes, 'OPTIONS': dict(original.settings_dict['OPTIONS'])}
+    clase = type(original)
+    if nombre == 'pool':
+        settings_dict['OPTIONS']['pool'] = {'tamano': 1}
+        if not issubclass(clase, ConexionesEnPool):
+            clase = type('DatabaseWrapper', (ConexionesEnPool, clase), {})
+    else:
+        settings_dict['OPTIONS'].pop('pool', None)
+    wrapper = clase(settings_dict, original.alias)
+    # connect() cronometrado: lo que cuesta abrir (o sacar del pool) y preparar la conexión
+    wrapper.tiempos_conexion = []
+    conectar = wrapper.connect
+
+    def connect():
+        inicio = time.perf_counter()
+        conectar()
+        wrapper.tiempos_conexion.append((time.perf_counter() - inicio) * 1000)
+
+    wrapper.connect = connect
+    return wrapper
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    preparar_django()
+    from django.db import close_old_connections, connection, connections
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from VENTASAPP import conexiones, metricas
+    from VENTASAPP.models import Usuario
+
+    setup_test_environment()
+    resultados = {}
+    with base_de_datos_temporal():
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            sys.exit('La base en memoria no cierra sus conexiones: usar MySQL o SQLite en archivo.')
+        crear_datos_base(200)
+        Usuario.objects.create_user(username='jefe', password='bench', rol=Usuario.ROL_JEFE)
+        connection.close()
+        original = connections['default']
+        url = reverse('stock_en_fecha', args=['P000001'])
+        print(f"{'escenario':<15} {'p50':>8} {'p99':>8} {'connect/req':>12} {'abiertas':>9} {'reusada':>8}")
+        try:
+            for nombre, ajustes in ESCENARIOS.items():
+                wrapper = connections['default'] = conexion_del_escenario(original, nombre, ajustes)
+                cliente = Client()
+                cliente.post(reverse('login'), {'username': 'jefe', 'password': 'bench'})
+                cliente.get(url)
+                close_old_connections()
+                wrapper.tiempos_conexion.clear()
+                metricas.buffer.vaciar()
+                for _ in range(repeticiones):
+                    cliente.get(url)
+                    close_old_connections()
+                mediciones = metricas.buffer.copia()
+                vista = metricas.resumen()['vistas']['stock_en_fecha']
+                r = resultados[nombre] = {
+                    **resumen([m.total_ns / 1e6 for m in mediciones]),
+                    'connect_ms_por_request': sum(wrapper.tiempos_conexion) / len(mediciones),
+                    'conexiones_abiertas': vista['conexiones_abiertas'],
+                    'conexion_reusada': vista['conexion_reusada'],
+                }
+                print(f"{nombre:<15} {r['p50']:>6.3f}ms {r['p99']:>6.3f}ms {r['connect_ms_por_request']:>10.3f}ms "
+                      f"{r['conexiones_abiertas']:>9} {r['conexion_reusada']:>8.1%}")
+                wrapper.close()
+                conexiones.cerrar_pools()
+        finally:
+            connections['default'] = original
+    ruta = guardar_resultados('conexiones', {
+        'repeticiones': repeticiones, 'motor': connection.vendor, 'escenarios': resultados,
+    })
+    print(f'\nResultados en {ruta}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Logins por segundo en un núcleo según la política de hash y el cache de kiosco.
+
+Un solo proceso atiende logins por el stack completo (cliente de pruebas)
+durante ``segundos`` por escenario:
+
+* PBKDF2 con distintas iteraciones (``CLAVES_ITERACIONES``), sin cache de
+  credenciales: cada login calcula el hash completo.
+* ``kiosco``: re-login en el mismo terminal con la credencial verificada en
+  cache (``LOGIN_CREDENCIAL_TTL``).
+* ``bloqueado``: intentos rechazados por el límite de intentos.
+
+    python -m benchmarks.bench_login [segundos]
+"""
+import logging
+import sys
+import time
+
+from benchmarks.comun import base_de_datos_temporal, guardar_resultados, preparar_django, resumen
+
+
+ITERACIONES = (1_000_000, 600_000, 260_000, 100_000)
+
+
+def medir_por(segundos, funcion):
+    """Llama ``funcion`` durante ``segundos``; devuelve los tiempos en ms."""
+    tiempos = []
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    preparar_django()
+    from django.core.cache import caches
+    from django.test import Client, override_settings
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from VENTASAPP.models import Usuario
+
+    setup_test_environment()
+    # Cada intento bloqueado (429) dejaría un warning de django.request
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    url = reverse('login')
+    escenarios = [
+        (f'pbkdf2 {n:,}'.replace(',', '.'), {'CLAVES_ITERACIONES': n, 'LOGIN_CREDENCIAL_TTL': 0}, 'bench')
+        for n in ITERACIONES
+    ]
+    escenarios += [
+        ('kiosco', {'CLAVES_ITERACIONES': ITERACIONES[0], 'LOGIN_CREDENCIAL_TTL': 600}, 'bench'),
+        ('bloqueado', {'CLAVES_ITERACIONES': ITERACIONES[0], 'LOGIN_INTENTOS': 1}, 'mala'),
+    ]
+    resultados = {}
+    with base_de_datos_temporal():
+        Usuario.objects.create_user(username='bench', password='bench')
+        print(f"{'escenario':<18} {'logins/s':>9} {'p50':>9} {'p99':>9}")
+        for nombre, ajustes, password in escenarios:
+            with override_settings(**ajustes):
+                caches['login'].clear()
+                cliente = Client()
+
+                def entrar():
+                    cliente.post(url, {'username': 'bench', 'password': password})
+
+                entrar()  # recalcula el hash con la política del escenario, o deja el bloqueo
+                tiempos = medir_por(segundos, entrar)
+            r = resultados[nombre] = {'logins_por_segundo': len(tiempos) / (sum(tiempos) / 1000), **resumen(tiempos)}
+            print(f"{nombre:<18} {r['logins_por_segundo']:>9.1f} {r['p50']:>7.2f}ms {r['p99']:>7.2f}ms")
+    ruta = guardar_resultados('login', {'segundos': segundos, 'escenarios': resultados})
+    print(f'\nResultados en {ruta}')
+
+
+if __name__ == '__main__':
+    main()
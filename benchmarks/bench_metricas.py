@@ -0,0 +1,43 @@
+"""Costo de las métricas por vista: mismas requests con y sin MetricasMiddleware.
+
+Usa el stack completo de Django con el cliente de pruebas (incluye el log
+rotativo en METRICAS_LOG).
+
+    python -m benchmarks.bench_metricas [repeticiones]
+"""
+import sys
+
+from benchmarks.comun import base_de_datos_temporal, crear_datos_base, medir, preparar_django, resumen
+
+
+URLS = ['/home/', '/reporte_diario/', '/productos/', '/api/catalogo/productos/']
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    preparar_django()
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from django.test.utils import setup_test_environment
+    from VENTASAPP.models import Usuario
+
+    setup_test_environment()
+    sin_metricas = [m for m in settings.MIDDLEWARE if m != 'VENTASAPP.metricas.MetricasMiddleware']
+    with base_de_datos_temporal():
+        crear_datos_base(200)
+        Usuario.objects.create_user(username='jefe', password='bench', rol=Usuario.ROL_JEFE)
+        print(f"{'url':<26} {'sin p50':>9} {'con p50':>9} {'sin p99':>9} {'con p99':>9}")
+        for url in URLS:
+            tiempos = {}
+            for nombre, middleware in (('sin', sin_metricas), ('con', settings.MIDDLEWARE)):
+                with override_settings(MIDDLEWARE=middleware):
+                    cliente = Client()
+                    cliente.post('/login/', {'username': 'jefe', 'password': 'bench'})
+                    cliente.get(url)
+                    tiempos[nombre] = resumen(medir(lambda: cliente.get(url), repeticiones))
+            print(f"{url:<26} {tiempos['sin']['p50']:>7.3f}ms {tiempos['con']['p50']:>7.3f}ms "
+                  f"{tiempos['sin']['p99']:>7.3f}ms {tiempos['con']['p99']:>7.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
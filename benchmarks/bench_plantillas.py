@@ -0,0 +1,80 @@
+"""Tiempo de render y tamaño del HTML de las páginas pesadas según el modo de plantillas.
+
+* ``desarrollo``: loaders sin cache y fragmentos sin guardar (cada request
+  lee, compila y renderiza todo).
+* ``produccion``: lo de ``PLANTILLAS_PRODUCCION``, loader en cache y menú
+  lateral guardado por rol en el cache ``plantillas``.
+
+El tiempo de render sale de las métricas por vista (``PlantillasMedidas``),
+así que no incluye consultas ni middleware.
+
+    python -m benchmarks.bench_plantillas [repeticiones]
+"""
+import copy
+import sys
+from datetime import date
+
+from benchmarks.comun import base_de_datos_temporal, guardar_resultados, preparar_django, resumen
+
+
+PAGINAS = [('pos', 'vendedor', 'crear_venta'), ('home', 'jefe', 'home'), ('productos', 'jefe', 'listar_productos')]
+LOADERS = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+
+
+def configuraciones(templates, caches):
+    base = copy.deepcopy(templates)
+    base[0]['APP_DIRS'] = False
+    desarrollo, produccion = copy.deepcopy(base), copy.deepcopy(base)
+    desarrollo[0]['OPTIONS']['loaders'] = LOADERS
+    produccion[0]['OPTIONS']['loaders'] = [('django.template.loaders.cached.Loader', LOADERS)]
+    fragmentos = {
+        'desarrollo': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        'produccion': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-plantillas'},
+    }
+    return {
+        modo: {'TEMPLATES': plantillas, 'CACHES': {**caches, 'plantillas': fragmentos[modo]}}
+        for modo, plantillas in (('desarrollo', desarrollo), ('produccion', produccion))
+    }
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    preparar_django()
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from VENTASAPP import metricas
+    from VENTASAPP.models import ControlDia, Usuario
+
+    setup_test_environment()
+    resultados = {}
+    with base_de_datos_temporal(), override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+        jefe = Usuario.objects.create_user(username='jefe', password='bench', rol=Usuario.ROL_JEFE)
+        Usuario.objects.create_user(username='vendedor', password='bench')
+        ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=jefe)
+
+        print(f"{'modo':<11} {'página':<10} {'render p50':>11} {'render p99':>11} {'total p50':>10} {'HTML':>9}")
+        for modo, ajustes in configuraciones(settings.TEMPLATES, settings.CACHES).items():
+            with override_settings(**ajustes):
+                for nombre, usuario, vista in PAGINAS:
+                    cliente = Client()
+                    cliente.post(reverse('login'), {'username': usuario, 'password': 'bench'})
+                    url = reverse(vista)
+                    tamano = len(cliente.get(url).content)
+                    metricas.buffer.vaciar()
+                    for _ in range(repeticiones):
+                        cliente.get(url)
+                    mediciones = metricas.buffer.copia()
+                    render = resumen([m.plantilla_ns / 1e6 for m in mediciones])
+                    total = resumen([m.total_ns / 1e6 for m in mediciones])
+                    resultados.setdefault(modo, {})[nombre] = {'html_bytes': tamano, 'render_ms': render, 'total_ms': total}
+                    print(f"{modo:<11} {nombre:<10} {render['p50']:>9.2f}ms {render['p99']:>9.2f}ms "
+                          f"{total['p50']:>8.2f}ms {tamano:>8}B")
+    ruta = guardar_resultados('plantillas', {'repeticiones': repeticiones, 'modos': resultados})
+    print(f'\nResultados en {ruta}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Pronóstico de stock: cálculo vectorizado con NumPy contra un ciclo por producto.
+
+Arma una historia sintética de ``productos`` x ``dias`` (ventas Poisson, con
+días sin venta) como tripletas (producto, día, unidades), igual que las lee
+``pronostico.historia``, y mide armar la matriz y calcular demanda, días hasta
+quiebre y sugerencias. El ciclo en Python se mide sobre una muestra y se
+extrapola.
+
+    python -m benchmarks.bench_pronostico [productos] [dias]
+"""
+import sys
+
+import numpy as np
+
+from benchmarks.comun import medir, preparar_django, resumen
+
+
+MUESTRA_CICLO = 2000
+
+
+def historia_sintetica(productos, dias, azar):
+    tasas = azar.gamma(0.6, 3.0, size=(productos, 1))
+    ventas = azar.poisson(tasas, size=(productos, dias))
+    filas, columnas = np.nonzero(ventas)
+    return filas, columnas, ventas[filas, columnas], azar.integers(0, 200, size=productos)
+
+
+def ciclo_por_producto(matriz, stock, alfa=0.3, ventana=28, plazo=7, cobertura=21, z=1.65):
+    """La versión ingenua: suavizado y reposición producto por producto."""
+    resultado = []
+    for serie, existencia in zip(matriz.tolist(), stock.tolist()):
+        nivel = serie[0]
+        for x in serie[1:]:
+            nivel = alfa * x + (1 - alfa) * nivel
+        reciente = serie[-ventana:]
+        media = sum(reciente) / ventana
+        desviacion = (sum((x - media) ** 2 for x in reciente) / ventana) ** 0.5
+        seguridad = z * desviacion * plazo ** 0.5
+        dias = existencia / nivel if nivel > 0 else float('inf')
+        sugerido = max(0, -(-(nivel * (plazo + cobertura) + seguridad - existencia) // 1)) \
+            if nivel > 0 and existencia <= nivel * plazo + seguridad else 0
+        resultado.append((nivel, dias, sugerido))
+    return resultado
+
+
+def main():
+    productos = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    preparar_django()
+    from VENTASAPP import pronostico
+
+    azar = np.random.default_rng(3)
+    filas, columnas, unidades, stock = historia_sintetica(productos, dias, azar)
+    print(f'{productos} productos x {dias} días, {len(unidades)} días-producto con venta\n')
+
+    matrices = []
+    armar = resumen(medir(lambda: matrices.append(
+        pronostico.matriz_ventas(filas, columnas, unidades, productos, dias)), 5))
+    matriz = matrices[-1]
+    print(f"armar matriz            p50 {armar['p50']:>9.1f} ms")
+    for metodo in pronostico.METODOS:
+        tiempos = resumen(medir(lambda: pronostico.calcular(matriz, stock, metodo=metodo), 5))
+        print(f"calcular ({metodo:<11}) p50 {tiempos['p50']:>9.1f} ms")
+
+    muestra = min(MUESTRA_CICLO, productos)
+    ciclo = medir(lambda: ciclo_por_producto(matriz[:muestra], stock[:muestra]), 1)[0]
+    print(f"ciclo por producto      ~{ciclo * productos / muestra:>9.0f} ms (extrapolado de {muestra})")
+
+
+if __name__ == '__main__':
+    main()
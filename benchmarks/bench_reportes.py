@@ -0,0 +1,104 @@
+"""Reporte por período: resumen diario contra agregar directo sobre Venta.
+
+Genera ``cantidad_ventas`` ventas repartidas en dos años, reconstruye el
+resumen diario y mide el reporte de un día, una semana, un mes y un año
+(cada uno con su período anterior) leyendo el resumen, contra las mismas
+agregaciones hechas sobre la tabla de ventas.
+
+    python -m benchmarks.bench_reportes [cantidad_ventas]
+"""
+import random
+import sys
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks.comun import base_de_datos_temporal, crear_datos_base, medir, preparar_django, resumen
+
+
+VENDEDORES = 20
+DIAS = 730
+REPETICIONES = 20
+
+
+def poblar(cantidad, control):
+    from django.utils import timezone
+    from VENTASAPP.models import Usuario, Venta
+
+    plantilla = Usuario.objects.create_user(username='bench-vendedor-0', password='bench')
+    Usuario.objects.bulk_create([
+        Usuario(username=f'bench-vendedor-{i}', password=plantilla.password, rol=Usuario.ROL_VENDEDOR)
+        for i in range(1, VENDEDORES)
+    ])
+    vendedores = list(Usuario.objects.values_list('pk', flat=True))
+    azar = random.Random(7)
+    inicio = timezone.now() - timedelta(days=DIAS)
+    segundos = DIAS * 86400
+    lote = 20_000
+    for base in range(0, cantidad, lote):
+        ventas = []
+        for folio in range(base, min(base + lote, cantidad)):
+            subtotal = Decimal(azar.randrange(500, 50_000))
+            iva = (subtotal * Decimal('0.19')).quantize(Decimal('1'))
+            ventas.append(Venta(
+                fecha=inicio + timedelta(seconds=azar.randrange(segundos)),
+                tipo_documento=Venta.TIPO_FACTURA if folio % 10 == 0 else Venta.TIPO_BOLETA,
+                folio=folio + 1, subtotal=subtotal, iva=iva, total=subtotal + iva,
+                id_usuario_id=azar.choice(vendedores), id_control=control,
+            ))
+        Venta.objects.bulk_create(ventas, batch_size=5000)
+
+
+def directo(periodo):
+    """El mismo reporte agregando cada venta del período y del anterior."""
+    from django.db.models import Q, Sum
+    from django.db.models.functions import TruncDate
+    from VENTASAPP.models import Venta
+    from VENTASAPP.reportes import CAMPOS
+
+    anterior = periodo.anterior()
+    ventas = Venta.objects.annotate(dia=TruncDate('fecha')).filter(dia__gte=anterior.desde, dia__lte=periodo.hasta)
+    list(ventas.filter(dia__gte=periodo.desde).values('dia').annotate(
+        monto=Sum('total'), subtotal_dia=Sum('subtotal')).order_by('dia'))
+    sumas = {}
+    for campo in CAMPOS[1:]:
+        sumas[f'{campo}_actual'] = Sum(campo, filter=Q(dia__gte=periodo.desde))
+        sumas[f'{campo}_anterior'] = Sum(campo, filter=Q(dia__lte=anterior.hasta))
+    list(ventas.values('tipo_documento').annotate(**sumas).order_by('tipo_documento'))
+    list(ventas.values('id_usuario__username').annotate(**sumas).order_by('id_usuario__username'))
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    preparar_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+    from VENTASAPP import reportes, resumenes
+    from VENTASAPP.models import ResumenVentaDiaria
+
+    with base_de_datos_temporal():
+        _, control = crear_datos_base(1)
+        poblar(cantidad, control)
+        duracion = medir(resumenes.reconstruir, 1)[0]
+        print(f'{cantidad} ventas, {ResumenVentaDiaria.objects.count()} filas de resumen '
+              f'(reconstruido en {duracion / 1000:.1f} s)\n')
+        print(f"{'período':<8} {'consultas':>9} {'resumen p50':>12} {'resumen p99':>12} {'ventas p50':>11}")
+
+        hoy = timezone.localdate()
+        periodos = [
+            reportes.periodo('dia', fecha=hoy - timedelta(days=1)),
+            reportes.periodo('semana', fecha=hoy),
+            reportes.periodo('mes', fecha=hoy),
+            reportes.periodo('rango', desde=hoy - timedelta(days=364), hasta=hoy),
+        ]
+        for periodo in periodos:
+            with CaptureQueriesContext(connection) as consultas:
+                reportes.generar(periodo)
+            con_resumen = resumen(medir(lambda: reportes.generar(periodo), REPETICIONES))
+            sin_resumen = resumen(medir(lambda: directo(periodo), max(3, REPETICIONES // 10)))
+            print(f"{periodo.tipo:<8} {len(consultas):>9} {con_resumen['p50']:>10.2f}ms "
+                  f"{con_resumen['p99']:>10.2f}ms {sin_resumen['p50']:>9.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Validación de RUT: implementación anterior del formulario contra rut.py.
+
+    python -m benchmarks.bench_rut [cantidad]
+
+Compara, sobre la misma lista de RUT (90% válidos, con puntos y guion), la
+función por RUT que tenía ClienteForm, el camino escalar de VENTASAPP.rut y
+el camino por lotes con NumPy.
+"""
+import random
+import re
+import sys
+import time
+
+from VENTASAPP import rut
+
+
+def _validar_rut_anterior(rut_limpio):
+    # Copia de ClienteForm._validar_rut antes de VENTASAPP.rut
+    try:
+        dv = rut_limpio[-1].lower()
+        cuerpo = rut_limpio[:-1]
+        if not cuerpo.isdigit():
+            return False
+        suma = 0
+        multiplo = 2
+        for i in reversed(cuerpo):
+            suma += int(i) * multiplo
+            multiplo = multiplo + 1 if multiplo < 7 else 2
+        dv_esperado_num = 11 - (suma % 11)
+        if dv_esperado_num == 11:
+            dv_esperado = '0'
+        elif dv_esperado_num == 10:
+            dv_esperado = 'k'
+        else:
+            dv_esperado = str(dv_esperado_num)
+        return dv == dv_esperado
+    except Exception:
+        return False
+
+
+def normalizar_anterior(valor):
+    # Copia de ClienteForm.clean_rut (sin ValidationError)
+    rut_limpio = re.sub(r'[^0-9kK]+', '', str(valor)).lower()
+    if not _validar_rut_anterior(rut_limpio):
+        return None
+    dv = rut_limpio[-1].upper()
+    cuerpo = rut_limpio[:-1]
+    cuerpo_formateado = ""
+    while len(cuerpo) > 3:
+        cuerpo_formateado = "." + cuerpo[-3:] + cuerpo_formateado
+        cuerpo = cuerpo[:-3]
+    cuerpo_formateado = cuerpo + cuerpo_formateado
+    return f"{cuerpo_formateado}-{dv}"
+
+
+def generar(cantidad, semilla=42):
+    azar = random.Random(semilla)
+    ruts = []
+    for _ in range(cantidad):
+        cuerpo = str(azar.randint(1_000_000, 29_999_999))
+        dv = rut.digito_verificador(cuerpo)
+        if azar.random() < 0.1:
+            dv = '0' if dv != '0' else '1'
+        ruts.append(f'{int(cuerpo):,}'.replace(',', '.') + '-' + dv.upper())
+    return ruts
+
+
+def cronometrar(f, ruts):
+    inicio = time.perf_counter()
+    resultado = f(ruts)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ruts = generar(cantidad)
+
+    casos = [
+        ('anterior (por RUT)', lambda lista: [normalizar_anterior(r) for r in lista]),
+        ('rut.normalizar', lambda lista: [rut.normalizar(r) for r in lista]),
+        ('rut.normalizar_lote', rut.normalizar_lote),
+        ('rut.validar_lote', lambda lista: rut.validar_lote(lista).tolist()),
+    ]
+    referencia = None
+    print(f'{cantidad} RUT\n')
+    print(f"{'implementación':<22} {'segundos':>9} {'RUT/s':>12}")
+    for nombre, f in casos:
+        segundos, resultado = cronometrar(f, ruts)
+        if nombre == 'rut.validar_lote':
+            assert resultado == [r is not None for r in referencia], nombre
+        elif referencia is None:
+            referencia = resultado
+        else:
+            assert resultado == referencia, nombre
+        print(f'{nombre:<22} {segundos:>9.3f} {cantidad / segundos:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
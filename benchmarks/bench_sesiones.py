@@ -0,0 +1,69 @@
+"""Consultas y latencia por request según el motor de sesión.
+
+Inicia sesión como vendedor y recorre las vistas del POS con cada motor:
+``db`` (el anterior, con SELECT a django_session en cada request), ``cache``
+(el valor por defecto) y ``signed_cookies``.
+
+    python -m benchmarks.bench_sesiones [requests_por_motor]
+"""
+import sys
+import tempfile
+from decimal import Decimal
+
+from benchmarks.comun import base_de_datos_temporal, medir, preparar_django, resumen
+
+
+MOTORES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+RUTAS = [('catalogo_productos', {}), ('buscar_productos', {'q': 'prod'}), ('get_next_folio', {'tipo_documento': 'Boleta'})]
+
+
+def main():
+    requests_por_motor = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    preparar_django()
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext, setup_test_environment
+    from django.urls import reverse
+
+    from VENTASAPP.models import Producto, Usuario
+
+    setup_test_environment()
+    cache_sesiones = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'sesiones': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()},
+        'revocaciones': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()},
+    }
+    with base_de_datos_temporal(), override_settings(CACHES=cache_sesiones):
+        Usuario.objects.create_user(username='bench', password='bench')
+        Producto.objects.bulk_create([
+            Producto(codigo=f'P{i:05d}', nombre=f'Producto {i}', precio_unitario=Decimal('990.00'), stock=10)
+            for i in range(1000)
+        ])
+        urls = [reverse(nombre) + '?' + '&'.join(f'{k}={v}' for k, v in params.items()) for nombre, params in RUTAS]
+
+        print(f"{'motor':<16} {'consultas/req':>13} {'django_session/req':>19} {'p50':>8} {'p99':>8}")
+        for nombre, motor in MOTORES.items():
+            with override_settings(SESSION_ENGINE=motor):
+                cliente = Client()
+                cliente.post(reverse('login'), {'username': 'bench', 'password': 'bench'})
+                for url in urls:
+                    cliente.get(url)  # calienta cachés del catálogo e índice
+                turno = iter(range(sys.maxsize))
+
+                def pedir():
+                    cliente.get(urls[next(turno) % len(urls)])
+
+                with CaptureQueriesContext(connection) as consultas:
+                    tiempos = medir(pedir, requests_por_motor)
+            de_sesion = sum('django_session' in c['sql'] for c in consultas)
+            r = resumen(tiempos)
+            print(f'{nombre:<16} {len(consultas) / requests_por_motor:>13.2f} '
+                  f'{de_sesion / requests_por_motor:>19.2f} {r["p50"]:>6.2f}ms {r["p99"]:>6.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
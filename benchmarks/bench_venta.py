@@ -0,0 +1,76 @@
+"""Consultas (round trips) por venta según el tamaño del carro.
+
+Compara el flujo anterior de ``crear_venta`` (un get, un create y un save
+por línea) con ``VENTASAPP.ventas.registrar_venta``.
+
+    python -m benchmarks.bench_venta
+"""
+from decimal import Decimal
+
+from benchmarks.comun import base_de_datos_temporal, crear_datos_base, medir, preparar_django, resumen
+
+
+TAMANOS_CARRO = (1, 10, 100)
+REPETICIONES = 20
+CONSULTAS_DE_DATOS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def venta_por_linea(tipo_documento, folio, productos_data, id_usuario, control):
+    """Reproducción del flujo anterior, una consulta por línea."""
+    from VENTASAPP.models import DetalleVenta, Producto, Venta
+
+    subtotal_venta = Decimal('0.00')
+    detalles = []
+    for item in productos_data:
+        producto = Producto.objects.get(codigo=item['codigo'])
+        cantidad = int(item['cantidad'])
+        subtotal_item = Decimal(producto.precio_unitario) * cantidad
+        detalles.append((producto, cantidad, subtotal_item))
+        subtotal_venta += subtotal_item
+    iva = (subtotal_venta * Decimal('0.19')).quantize(Decimal('0.00'))
+    venta = Venta.objects.create(
+        tipo_documento=tipo_documento, folio=folio, subtotal=subtotal_venta,
+        iva=iva, total=subtotal_venta + iva, id_usuario_id=id_usuario, id_control=control,
+    )
+    for producto, cantidad, subtotal_item in detalles:
+        DetalleVenta.objects.create(
+            id_venta=venta, id_producto=producto, cantidad=cantidad,
+            precio_unitario=producto.precio_unitario, subtotal=subtotal_item,
+        )
+        producto.stock -= cantidad
+        producto.save()
+
+
+def main():
+    preparar_django()
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+
+    from VENTASAPP.ventas import registrar_venta
+
+    with base_de_datos_temporal():
+        vendedor, control = crear_datos_base(cantidad_productos=max(TAMANOS_CARRO))
+        folio = iter(range(1, 1_000_000))
+
+        print(f"{'líneas':>7} {'flujo':<12} {'consultas':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for lineas in TAMANOS_CARRO:
+            carro = [{'codigo': f'P{i:06d}', 'cantidad': 1} for i in range(lineas)]
+            flujos = {
+                'por línea': lambda: venta_por_linea('Boleta', next(folio), carro, vendedor.pk, control),
+                'masivo': lambda: registrar_venta(
+                    tipo_documento='Boleta', folio=next(folio), productos_data=carro,
+                    id_usuario=vendedor.pk, control=control,
+                ),
+            }
+            for nombre, flujo in flujos.items():
+                with CaptureQueriesContext(connection) as consultas:
+                    with transaction.atomic():
+                        flujo()
+                # Solo cuentan las consultas de datos (no BEGIN/SAVEPOINT/COMMIT)
+                de_datos = [q for q in consultas.captured_queries if q['sql'].startswith(CONSULTAS_DE_DATOS)]
+                tiempos = resumen(medir(lambda: transaction.atomic()(flujo)(), REPETICIONES))
+                print(f"{lineas:>7} {nombre:<12} {len(de_datos):>9} {tiempos['p50']:>8.2f} {tiempos['p95']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
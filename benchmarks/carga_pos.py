@@ -0,0 +1,150 @@
+"""Carga de terminales POS: endpoints síncronos (WSGI) contra asíncronos (ASGI).
+
+Cada terminal es un vendedor con su propia sesión que repite el ciclo del POS:
+refrescar el catálogo de productos (completo la primera vez, luego
+``?desde=``), pedir el folio sugerido y confirmar una venta de 1 a 3
+productos. Las requests pasan por el stack completo de Django (middleware,
+sesión, CSRF) usando los handlers de prueba, sin servidor HTTP de por medio:
+
+* ``wsgi``: vistas síncronas atendidas por ``--hilos-wsgi`` hilos, como un
+  servidor WSGI con ese número de workers; las terminales hacen fila.
+* ``asgi``: vistas ``*_async`` en un solo event loop; la transacción de cada
+  venta corre en el pool de ``VENTAS_ASYNC_HILOS``.
+
+    python -m benchmarks.carga_pos [--terminales 200] [--segundos 20] [--modo wsgi asgi]
+
+Usa la base configurada en DJANGO_SETTINGS_MODULE (MySQL en BAZAR.settings);
+con SQLite los números quedan dominados por el bloqueo de la base completa.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.comun import base_de_datos_temporal, crear_datos_base, preparar_django, resumen
+
+
+PRODUCTOS = 500
+
+
+def preparar_terminales(cantidad):
+    from VENTASAPP.models import Usuario
+
+    plantilla = Usuario.objects.create_user(username='terminal-0', password='carga')
+    Usuario.objects.bulk_create([
+        Usuario(username=f'terminal-{i}', password=plantilla.password, rol=Usuario.ROL_VENDEDOR)
+        for i in range(1, cantidad)
+    ])
+    return [f'terminal-{i}' for i in range(cantidad)]
+
+
+def carrito(azar):
+    return [{'codigo': f'P{azar.randrange(PRODUCTOS):06d}', 'cantidad': azar.randint(1, 3)}
+            for _ in range(azar.randint(1, 3))]
+
+
+class Terminal:
+    """Ciclo del POS de una terminal y la versión de catálogo que ya tiene."""
+
+    def __init__(self, rutas, azar):
+        self.rutas = rutas
+        self.azar = azar
+        self.version = None
+
+    def pedidos(self):
+        """Genera (metodo, url, kwargs) del siguiente ciclo del POS."""
+        datos = {'desde': self.version} if self.version else {}
+        yield 'get', self.rutas['catalogo'], {'data': datos}
+        yield 'get', self.rutas['folio'], {'data': {'tipo_documento': 'Boleta'}}
+        cuerpo = {'tipo_documento': 'Boleta', 'productos': carrito(self.azar)}
+        yield 'post', self.rutas['venta'], {'data': json.dumps(cuerpo), 'content_type': 'application/json'}
+
+    def anotar(self, url, respuesta):
+        if url == self.rutas['catalogo'] and respuesta.status_code == 200:
+            self.version = respuesta.json()['version']
+
+
+def rutas(modo):
+    from django.urls import reverse
+
+    sufijo = '_async' if modo == 'asgi' else ''
+    return {
+        'catalogo': reverse(f'catalogo_productos{sufijo}'),
+        'folio': reverse(f'get_next_folio{sufijo}'),
+        'venta': reverse(f'crear_venta{sufijo}'),
+    }
+
+
+async def correr(modo, usuarios, segundos, hilos_wsgi):
+    from django.test import AsyncClient, Client
+    from django.urls import reverse
+
+    tiempos, errores = [], 0
+    pool = ThreadPoolExecutor(max_workers=hilos_wsgi) if modo == 'wsgi' else None
+    loop = asyncio.get_running_loop()
+
+    async def pedir(cliente, metodo, url, kwargs):
+        if modo == 'asgi':
+            return await getattr(cliente, metodo)(url, **kwargs)
+        return await loop.run_in_executor(pool, lambda: getattr(cliente, metodo)(url, **kwargs))
+
+    async def terminal(i, username, fin):
+        nonlocal errores
+        cliente = AsyncClient() if modo == 'asgi' else Client()
+        await pedir(cliente, 'post', reverse('login'), {'data': {'username': username, 'password': 'carga'}})
+        estado = Terminal(rutas(modo), random.Random(i))
+        while time.monotonic() < fin:
+            for metodo, url, kwargs in estado.pedidos():
+                inicio = time.perf_counter()
+                respuesta = await pedir(cliente, metodo, url, kwargs)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if respuesta.status_code not in (200, 304):
+                    errores += 1
+                estado.anotar(url, respuesta)
+
+    fin = time.monotonic() + segundos
+    inicio = time.perf_counter()
+    await asyncio.gather(*(terminal(i, u, fin) for i, u in enumerate(usuarios)))
+    duracion = time.perf_counter() - inicio
+    if pool:
+        pool.shutdown()
+    return {'modo': modo, 'requests': len(tiempos), 'errores': errores,
+            'requests_por_segundo': len(tiempos) / duracion, **resumen(tiempos)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--terminales', type=int, default=200)
+    parser.add_argument('--segundos', type=float, default=20)
+    parser.add_argument('--hilos-wsgi', type=int, default=16)
+    parser.add_argument('--modo', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--json', help='Guarda los resultados en este archivo')
+    args = parser.parse_args()
+
+    preparar_django()
+    from django.test import override_settings
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    resultados = []
+    # Hasher rápido: lo que se mide es el POS, no el login de 200 terminales
+    with base_de_datos_temporal(), override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+        crear_datos_base(PRODUCTOS)
+        usuarios = preparar_terminales(args.terminales)
+        print(f'{args.terminales} terminales, {args.segundos:.0f} s por modo\n')
+        print(f"{'modo':<6} {'requests':>9} {'errores':>8} {'req/s':>9} {'p50':>9} {'p99':>9}")
+        for modo in args.modo:
+            r = asyncio.run(correr(modo, usuarios, args.segundos, args.hilos_wsgi))
+            resultados.append(r)
+            print(f"{modo:<6} {r['requests']:>9} {r['errores']:>8} {r['requests_por_segundo']:>9.1f} "
+                  f"{r['p50']:>7.1f}ms {r['p99']:>7.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump({'terminales': args.terminales, 'segundos': args.segundos, 'resultados': resultados}, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
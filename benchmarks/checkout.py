@@ -0,0 +1,241 @@
+"""Checkout de punta a punta: sesiones de vendedor repartidas en varios procesos.
+
+Cada sesión reproduce el turno de un vendedor: login, abrir el POS y luego
+``--ventas-por-sesion`` veces pedir el folio y confirmar una venta de 1 a
+``--lineas`` productos (una fracción con factura a un cliente existente).
+Cada proceso tiene su propio Django y su conexión a la base, como un worker
+del servidor, y recorre sus sesiones con el cliente de pruebas: stack
+completo (middleware, sesión, plantillas) sin HTTP ni CSRF.
+
+Usa la base de DJANGO_SETTINGS_MODULE, que debe estar poblada con
+``generar_datos`` (las ventas quedan registradas en ella):
+
+    python manage.py generar_datos --prefijo bench
+    python -m benchmarks.checkout [--procesos 4] [--sesiones 200] [--ventas-por-sesion 5]
+                                  [--json ruta.json] [--comparar anterior.json]
+
+Informa requests y ventas por segundo, p50/p95/p99 por endpoint y las
+consultas SQL de cada venta (la request completa), y guarda el resultado en
+``benchmarks/resultados/`` para comparar corridas.
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import time
+import traceback
+import uuid
+
+from benchmarks.comun import guardar_resultados, percentil, preparar_django, resumen
+
+
+ENDPOINTS = ('login', 'pos', 'folio', 'venta')
+
+
+def datos_de_la_base(prefijo):
+    """Vendedores, códigos con stock y clientes generados con ``prefijo``."""
+    from VENTASAPP.models import Cliente, Producto, Usuario
+
+    vendedores = list(Usuario.objects.filter(
+        username__startswith=f'{prefijo}-vendedor-'
+    ).order_by('pk').values_list('username', flat=True))
+    codigos = list(Producto.objects.filter(
+        codigo__startswith=f'{prefijo}-', stock__gt=0
+    ).values_list('codigo', flat=True))
+    clientes = list(Cliente.objects.filter(
+        razon_social__startswith=f'Cliente {prefijo} '
+    ).values_list('pk', flat=True))
+    if not vendedores or not codigos:
+        raise RuntimeError(f'No hay datos con el prefijo "{prefijo}"; ejecute antes manage.py generar_datos.')
+    return vendedores, codigos, clientes
+
+
+class Sesiones:
+    """Sesiones de vendedor de un proceso, con sus tiempos y consultas."""
+
+    def __init__(self, opciones, azar):
+        from django.urls import reverse
+
+        self.opciones = opciones
+        self.azar = azar
+        self.vendedores, self.codigos, self.clientes = datos_de_la_base(opciones['prefijo'])
+        self.rutas = {
+            'login': reverse('login'),
+            'pos': reverse('crear_venta'),
+            'folio': reverse('get_next_folio'),
+        }
+        self.tiempos = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errores = dict.fromkeys(ENDPOINTS, 0)
+        self.consultas = []
+        self._contador = 0
+
+    def _contar(self, execute, sql, params, many, context):
+        self._contador += 1
+        return execute(sql, params, many, context)
+
+    def _pedir(self, endpoint, esperado, funcion):
+        inicio = time.perf_counter()
+        respuesta = funcion()
+        self.tiempos[endpoint].append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code != esperado:
+            self.errores[endpoint] += 1
+        return respuesta
+
+    def _carrito(self):
+        tipo = 'Factura' if self.clientes and self.azar.random() < self.opciones['facturas'] else 'Boleta'
+        cuerpo = {
+            'tipo_documento': tipo,
+            'clave': uuid.uuid4().hex,
+            'productos': [
+                {'codigo': codigo, 'cantidad': self.azar.randint(1, 3)}
+                for codigo in self.azar.sample(self.codigos, self.azar.randint(1, self.opciones['lineas']))
+            ],
+        }
+        if tipo == 'Factura':
+            cuerpo['cliente_id'] = self.azar.choice(self.clientes)
+        return cuerpo
+
+    def sesion(self, numero):
+        from django.db import connection
+        from django.test import Client
+
+        cliente = Client()
+        username = self.vendedores[numero % len(self.vendedores)]
+        self._pedir('login', 302, lambda: cliente.post(
+            self.rutas['login'], {'username': username, 'password': self.opciones['clave']}
+        ))
+        self._pedir('pos', 200, lambda: cliente.get(self.rutas['pos']))
+        for _ in range(self.opciones['ventas_por_sesion']):
+            cuerpo = self._carrito()
+            self._pedir('folio', 200, lambda: cliente.get(
+                self.rutas['folio'], {'tipo_documento': cuerpo['tipo_documento']}
+            ))
+            self._contador = 0
+            with connection.execute_wrapper(self._contar):
+                respuesta = self._pedir('venta', 200, lambda: cliente.post(
+                    self.rutas['pos'], json.dumps(cuerpo), content_type='application/json'
+                ))
+            if respuesta.status_code == 200:
+                self.consultas.append(self._contador)
+
+
+def trabajador(indice, barrera, cola, opciones):
+    try:
+        preparar_django()
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        sesiones = Sesiones(opciones, random.Random(opciones['semilla'] + indice))
+        # Todos los procesos parten juntos, ya con Django cargado
+        barrera.wait()
+        inicio = time.time()
+        for numero in range(indice, opciones['sesiones'], opciones['procesos']):
+            sesiones.sesion(numero)
+        cola.put({
+            'inicio': inicio, 'fin': time.time(),
+            'tiempos': sesiones.tiempos, 'errores': sesiones.errores, 'consultas': sesiones.consultas,
+        })
+    except Exception:
+        barrera.abort()
+        cola.put({'error': traceback.format_exc()})
+
+
+def correr(opciones):
+    contexto = multiprocessing.get_context('spawn')
+    barrera = contexto.Barrier(opciones['procesos'])
+    cola = contexto.Queue()
+    procesos = [
+        contexto.Process(target=trabajador, args=(i, barrera, cola, opciones))
+        for i in range(opciones['procesos'])
+    ]
+    for proceso in procesos:
+        proceso.start()
+    parciales = [cola.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+    fallas = [p['error'] for p in parciales if 'error' in p]
+    if fallas:
+        raise RuntimeError(fallas[0])
+    return agregar(parciales)
+
+
+def agregar(parciales):
+    """Une los resultados de los procesos; el rendimiento usa la ventana común."""
+    duracion = max(p['fin'] for p in parciales) - min(p['inicio'] for p in parciales)
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        tiempos = [t for p in parciales for t in p['tiempos'][endpoint]]
+        endpoints[endpoint] = {
+            'requests': len(tiempos),
+            'errores': sum(p['errores'][endpoint] for p in parciales),
+            **resumen(tiempos),
+        }
+    consultas = [c for p in parciales for c in p['consultas']]
+    requests = sum(e['requests'] for e in endpoints.values())
+    return {
+        'duracion_s': duracion,
+        'requests': requests,
+        'requests_por_segundo': requests / duracion,
+        'ventas': len(consultas),
+        'ventas_por_segundo': len(consultas) / duracion,
+        'endpoints': endpoints,
+        'consultas_por_venta': {
+            'promedio': sum(consultas) / len(consultas) if consultas else 0,
+            'p50': percentil(consultas, 50),
+            'max': max(consultas, default=0),
+        },
+    }
+
+
+def imprimir(resultado, anterior=None):
+    def cambio(actual, previo):
+        return f' ({(actual - previo) / previo:+.0%})' if previo else ''
+
+    print(f"{'endpoint':<8} {'requests':>9} {'errores':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for endpoint, r in resultado['endpoints'].items():
+        previo = (anterior or {}).get('endpoints', {}).get(endpoint, {})
+        print(f"{endpoint:<8} {r['requests']:>9} {r['errores']:>8} {r['p50']:>7.1f}ms {r['p95']:>7.1f}ms "
+              f"{r['p99']:>7.1f}ms{cambio(r['p99'], previo.get('p99'))}")
+    anterior = anterior or {}
+    consultas = resultado['consultas_por_venta']
+    print(f"\n{resultado['requests_por_segundo']:.1f} req/s"
+          f"{cambio(resultado['requests_por_segundo'], anterior.get('requests_por_segundo'))}, "
+          f"{resultado['ventas_por_segundo']:.1f} ventas/s"
+          f"{cambio(resultado['ventas_por_segundo'], anterior.get('ventas_por_segundo'))}, "
+          f"{consultas['promedio']:.1f} consultas por venta (máx. {consultas['max']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--procesos', type=int, default=4)
+    parser.add_argument('--sesiones', type=int, default=200, help='Sesiones en total, repartidas entre los procesos.')
+    parser.add_argument('--ventas-por-sesion', type=int, default=5)
+    parser.add_argument('--lineas', type=int, default=3, help='Máximo de productos por venta.')
+    parser.add_argument('--facturas', type=float, default=0.2)
+    parser.add_argument('--prefijo', default='bench', help='El usado en generar_datos.')
+    parser.add_argument('--clave', default='bench')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--json', help='Archivo de resultados (por defecto en benchmarks/resultados/).')
+    parser.add_argument('--comparar', help='Resultado JSON anterior contra el que comparar.')
+    args = parser.parse_args()
+
+    preparar_django()
+    from django.db import connection
+
+    datos_de_la_base(args.prefijo)
+    opciones = vars(args)
+    print(f'{args.procesos} procesos, {args.sesiones} sesiones de {args.ventas_por_sesion} ventas '
+          f'({connection.vendor})\n')
+    resultado = correr(opciones)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+    imprimir(resultado, anterior)
+    parametros = {k: v for k, v in opciones.items() if k not in ('clave', 'json', 'comparar')}
+    ruta = guardar_resultados('checkout', {'base': connection.vendor, 'parametros': parametros, **resultado}, args.json)
+    print(f'\nResultados en {ruta}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Utilidades compartidas por los benchmarks."""
+import json
+import os
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+import django
+
+
+def preparar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BAZAR.settings')
+    django.setup()
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """Crea la base de datos de prueba, la entrega y la destruye al salir."""
+    from django.db import connection
+
+    nombre_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+
+def crear_datos_base(cantidad_productos=100, stock=1_000_000):
+    """Crea un vendedor, el control del día abierto y productos con stock."""
+    from VENTASAPP.models import ControlDia, Producto, Usuario
+
+    vendedor = Usuario.objects.create_user(username='bench_vendedor', password='bench', rol=Usuario.ROL_VENDEDOR)
+    control = ControlDia.objects.create(fecha=date.today(), estado=ControlDia.ESTADO_ABIERTO, id_usuario=vendedor)
+    Producto.objects.bulk_create([
+        Producto(codigo=f'P{i:06d}', nombre=f'Producto {i}', precio_unitario=Decimal('990.00'), stock=stock)
+        for i in range(cantidad_productos)
+    ])
+    return vendedor, control
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta ``funcion`` y devuelve los tiempos en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def resumen(tiempos):
+    return {
+        'p50': statistics.median(tiempos) if tiempos else 0.0,
+        'p95': percentil(tiempos, 95),
+        'p99': percentil(tiempos, 99),
+    }
+
+
+RESULTADOS = Path(__file__).resolve().parent / 'resultados'
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=RESULTADOS.parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def guardar_resultados(nombre, datos, ruta=None):
+    """Guarda ``datos`` en JSON con la fecha y el commit; devuelve la ruta.
+
+    Por defecto en ``benchmarks/resultados/<nombre>-<fecha>.json``, para
+    poder comparar corridas en el tiempo.
+    """
+    ahora = datetime.now()
+    if ruta is None:
+        RESULTADOS.mkdir(exist_ok=True)
+        ruta = RESULTADOS / f"{nombre}-{ahora:%Y%m%d-%H%M%S}.json"
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump({'benchmark': nombre, 'fecha': ahora.isoformat(timespec='seconds'), 'commit': _commit(), **datos},
+                  archivo, indent=2)
+    return ruta
@@ -0,0 +1,504 @@
+document.addEventListener('DOMContentLoaded', function() {
+
+    // --- 1. OBTENER DATOS (se cargan desde los catálogos JSON) ---
+    let productosData = [];
+    let clientesData = [];
+    let versionProductos = null;
+    // URLs y token del request: el script es estático y la vista los deja en #pos-config
+    // (con POS_ASINCRONO vienen los endpoints asíncronos, para servidor ASGI)
+    const config = JSON.parse(document.getElementById('pos-config').textContent);
+    const urlCatalogoProductos = config.urls.catalogo_productos;
+    const urlCatalogoClientes = config.urls.catalogo_clientes;
+    const urlSiguienteFolio = config.urls.siguiente_folio;
+    const urlGuardarVenta = config.urls.guardar_venta;
+    const urlBuscarProductos = config.urls.buscar_productos;
+    const csrfToken = config.csrf;
+
+    // --- 2. ELEMENTOS DEL DOM ---
+    const tipoDocumentoSelect = document.getElementById('tipo_documento');
+    const folioInput = document.getElementById('folio'); // <- CORREGIDO: Usará el campo folio de VentaForm
+    const clienteExistenteWrapper = document.getElementById('cliente-existente-wrapper');
+    const clienteExistenteSelect = document.getElementById('id_cliente');
+    const clienteNuevoWrapper = document.getElementById('cliente-nuevo-wrapper');
+    const btnLimpiarCliente = document.getElementById('btn-limpiar-cliente');
+    const rutInput = document.getElementById('id_rut');
+    const rutErrorDiv = document.getElementById('rut-error');
+    
+    const productoDatalist = document.getElementById('producto-list');
+    const productoInput = document.getElementById('producto-select');
+    const cantidadInput = document.getElementById('producto-cantidad');
+    const btnAgregarProducto = document.getElementById('btn-agregar-producto');
+
+    const listaProductosVenta = document.getElementById('lista-productos-venta');
+    const listaVacia = document.getElementById('lista-vacia');
+
+    const resumenSubtotal = document.getElementById('resumen-subtotal');
+    const resumenIva = document.getElementById('resumen-iva');
+    const resumenTotal = document.getElementById('resumen-total');
+    
+    const btnMostrarVistaPrevia = document.getElementById('btn-mostrar-vista-previa');
+    const btnConfirmarVenta = document.getElementById('btn-confirmar-venta');
+    const vistaPreviaModal = new bootstrap.Modal(document.getElementById('vistaPreviaModal'));
+
+    // --- 3. ESTADO DE LA VENTA (en memoria) ---
+    let venta = {
+        productos: [] 
+    };
+    let payloadGbl = {};
+
+    // --- 4. POBLAR DATALISTS ---
+    // Las sugerencias vienen de la búsqueda en el servidor, no de todo el catálogo
+    let sugerencias = [];
+    let temporizadorBusqueda = null;
+
+    function mostrarSugerencias(resultados) {
+        sugerencias = resultados;
+        productoDatalist.innerHTML = '';
+        resultados.forEach(p => {
+            const option = document.createElement('option');
+            option.value = `${p.codigo} - ${p.nombre}`;
+            productoDatalist.appendChild(option);
+        });
+    }
+
+    function buscarProductos(texto) {
+        if (texto.length < 2 || texto.includes(' - ')) { return; }
+        fetch(`${urlBuscarProductos}?q=${encodeURIComponent(texto)}`)
+            .then(response => response.json())
+            .then(data => mostrarSugerencias(data.resultados))
+            .catch(error => console.error('Error al buscar productos:', error));
+    }
+
+    function poblarClientes() {
+        clienteExistenteSelect.innerHTML = '<option value="">Seleccione un cliente...</option>';
+        clientesData.forEach(c => {
+            const option = document.createElement('option');
+            option.value = c.id;
+            option.textContent = `${c.rut} - ${c.razon_social}`;
+            clienteExistenteSelect.appendChild(option);
+        });
+    }
+
+    // Primera carga completa; luego solo los cambios desde la versión conocida
+    function cargarProductos() {
+        const url = versionProductos ? `${urlCatalogoProductos}?desde=${versionProductos}` : urlCatalogoProductos;
+        return fetch(url, { cache: 'no-cache' })
+            .then(response => response.json())
+            .then(data => {
+                if (data.completo) {
+                    productosData = data.productos;
+                } else {
+                    data.productos.forEach(cambio => {
+                        productosData = productosData.filter(p => p.codigo !== cambio.codigo);
+                        if (cambio.stock > 0) { productosData.push(cambio); }
+                    });
+                }
+                versionProductos = data.version;
+            })
+            .catch(error => console.error('Error al cargar productos:', error));
+    }
+
+    function cargarClientes() {
+        return fetch(urlCatalogoClientes, { cache: 'no-cache' })
+            .then(response => response.json())
+            .then(data => {
+                clientesData = data.clientes;
+                poblarClientes();
+            })
+            .catch(error => console.error('Error al cargar clientes:', error));
+    }
+
+    poblarClientes();
+    cargarProductos();
+    cargarClientes();
+    // Refresca stock y precios cada minuto
+    setInterval(cargarProductos, 60000);
+
+    // --- 5. LÓGICA DE EVENTOS ---
+
+    productoInput.addEventListener('input', function() {
+        clearTimeout(temporizadorBusqueda);
+        const texto = this.value.trim();
+        temporizadorBusqueda = setTimeout(() => buscarProductos(texto), 150);
+    });
+
+    rutInput.addEventListener('blur', function() {
+        const rut = this.value;
+        if (rut === '') {
+            rutInput.classList.remove('is-invalid');
+            rutErrorDiv.style.display = 'none';
+            return;
+        }
+        if (!validarRut(rut)) {
+            rutInput.classList.add('is-invalid');
+            rutErrorDiv.textContent = 'RUT no válido. Formato: 12345678-9';
+            rutErrorDiv.style.display = 'block';
+        } else {
+            rutInput.classList.remove('is-invalid');
+            rutErrorDiv.style.display = 'none';
+        }
+    });
+
+    tipoDocumentoSelect.addEventListener('change', function() {
+        const tipo = this.value;
+        const esFactura = tipo === 'Factura';
+        
+        clienteExistenteWrapper.style.display = esFactura ? 'block' : 'none';
+        actualizarVisibilidadFormCliente();
+
+        if (tipo) {
+            folioInput.value = 'Cargando...';
+            productoInput.disabled = true;
+            btnAgregarProducto.disabled = true;
+
+            fetch(`${urlSiguienteFolio}?tipo_documento=${tipo}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.next_folio) {
+                        folioInput.value = data.next_folio;
+                        productoInput.disabled = false;
+                        btnAgregarProducto.disabled = false;
+                        productoInput.placeholder = 'Escribe para buscar...';
+                    } else {
+                        folioInput.value = 'Error';
+                        alert('Error al obtener el folio.');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error al buscar folio:', error);
+                    folioInput.value = 'Error';
+                });
+        } else {
+            folioInput.value = '';
+            productoInput.disabled = true;
+            btnAgregarProducto.disabled = true;
+            productoInput.placeholder = 'Seleccione un tipo de documento...';
+        }
+    });
+
+    clienteExistenteSelect.addEventListener('change', function() {
+        actualizarVisibilidadFormCliente();
+    });
+
+    btnLimpiarCliente.addEventListener('click', function() {
+        clienteExistenteSelect.value = '';
+        rutInput.value = '';
+        rutInput.classList.remove('is-invalid');
+        rutErrorDiv.style.display = 'none';
+        document.getElementById('id_razon_social').value = '';
+        document.getElementById('id_giro').value = '';
+        document.getElementById('id_direccion').value = '';
+        actualizarVisibilidadFormCliente();
+    });
+
+    btnAgregarProducto.addEventListener('click', function() {
+        const [codigo, ...nombreArr] = productoInput.value.split(' - ');
+        const nombre = nombreArr.join(' - ');
+        const cantidad = parseInt(cantidadInput.value);
+        const producto = productosData.find(p => p.codigo === codigo) || sugerencias.find(p => p.codigo === codigo);
+
+        if (!producto) { alert('Producto no válido. Selecciónelo de la lista.'); return; }
+        if (isNaN(cantidad) || cantidad <= 0) { alert('Ingrese una cantidad válida.'); return; }
+        
+        const stockDisponible = parseFloat(producto.stock);
+        if (stockDisponible < cantidad) {
+            alert(`Stock insuficiente. Solo quedan ${stockDisponible} unidades de ${producto.nombre}.`);
+            return;
+        }
+
+        const itemExistente = venta.productos.find(p => p.codigo === codigo);
+        if (itemExistente) {
+            const nuevaCantidad = itemExistente.cantidad + cantidad;
+            if (stockDisponible < nuevaCantidad) {
+                alert(`Stock insuficiente. Ya tiene ${itemExistente.cantidad} en el carro y solo quedan ${stockDisponible} en total.`);
+                return;
+            }
+            itemExistente.cantidad = nuevaCantidad;
+            itemExistente.subtotal = itemExistente.precio * nuevaCantidad;
+        } else {
+            venta.productos.push({
+                codigo: producto.codigo,
+                nombre: producto.nombre,
+                cantidad: cantidad,
+                precio: parseFloat(producto.precio_unitario),
+                subtotal: parseFloat(producto.precio_unitario) * cantidad
+            });
+        }
+
+        productoInput.value = '';
+        cantidadInput.value = '1';
+        actualizarVistaVenta();
+    });
+
+
+    // --- 7. LÓGICA DE GUARDADO (CON MODAL) ---
+
+    btnMostrarVistaPrevia.addEventListener('click', function() {
+        const tipoDoc = tipoDocumentoSelect.value;
+        const folioVal = folioInput.value;
+
+        if (!tipoDoc || !folioVal || folioVal === 'Cargando...' || folioVal === 'Error') {
+            alert('Debe seleccionar un Tipo de Documento y tener un Folio válido.');
+            return;
+        }
+
+        payloadGbl = {
+            clave: generarClave(),
+            tipo_documento: tipoDoc,
+            folio: folioVal,
+            cliente_id: clienteExistenteSelect.value || null,
+            productos: venta.productos.map(p => ({ codigo: p.codigo, cantidad: p.cantidad })),
+            cliente_nuevo: null
+        };
+
+        if (venta.productos.length === 0) {
+            alert('No hay productos en la venta.');
+            return;
+        }
+
+        if (payloadGbl.tipo_documento === 'Factura' && !payloadGbl.cliente_id) {
+            const rut = rutInput.value;
+            const razonSocial = document.getElementById('id_razon_social').value;
+            
+            if (!rut || !razonSocial) {
+                alert('Para Factura, debe seleccionar un cliente existente o ingresar los datos de uno nuevo (RUT y Razón Social son obligatorios).');
+                return;
+            }
+            if (!validarRut(rut)) {
+                alert('El RUT ingresado no es válido. Formato esperado: 12345678-9');
+                return;
+            }
+
+            payloadGbl.cliente_nuevo = {
+                rut: rut,
+                razon_social: razonSocial,
+                giro: document.getElementById('id_giro').value,
+                direccion: document.getElementById('id_direccion').value
+            };
+        }
+
+        // --- Poblar el Modal ---
+        document.getElementById('modal-tipo-documento').textContent = tipoDoc.toUpperCase();
+        document.getElementById('modal-folio').textContent = folioVal;
+
+        const modalClienteDiv = document.getElementById('modal-datos-cliente');
+        if (payloadGbl.tipo_documento === 'Factura') {
+            let rut, razon, giro, dir;
+            if (payloadGbl.cliente_id) {
+                const cliente = clientesData.find(c => c.id == payloadGbl.cliente_id);
+                rut = cliente.rut;
+                razon = cliente.razon_social;
+                giro = cliente.giro;
+                dir = cliente.direccion;
+            } else {
+                rut = payloadGbl.cliente_nuevo.rut;
+                razon = payloadGbl.cliente_nuevo.razon_social;
+                giro = payloadGbl.cliente_nuevo.giro;
+                dir = payloadGbl.cliente_nuevo.direccion;
+            }
+            document.getElementById('modal-cliente-rut').textContent = rut;
+            document.getElementById('modal-cliente-razon').textContent = razon;
+            document.getElementById('modal-cliente-giro').textContent = giro;
+            document.getElementById('modal-cliente-dir').textContent = dir;
+            modalClienteDiv.style.display = 'block';
+        } else {
+            modalClienteDiv.style.display = 'none';
+        }
+
+        const modalBodyProductos = document.getElementById('modal-body-productos');
+        modalBodyProductos.innerHTML = '';
+        venta.productos.forEach(p => {
+            const tr = document.createElement('tr');
+            tr.innerHTML = `
+                <td>${p.nombre}</td>
+                <td class="text-center">${p.cantidad}</td>
+                <td class="text-end">$${p.precio.toFixed(0)}</td>
+                <td class="text-end">$${p.subtotal.toFixed(0)}</td>
+            `;
+            modalBodyProductos.appendChild(tr);
+        });
+
+        document.getElementById('modal-subtotal').textContent = resumenSubtotal.textContent;
+        document.getElementById('modal-iva').textContent = resumenIva.textContent;
+        document.getElementById('modal-total-final').textContent = resumenTotal.textContent;
+
+        vistaPreviaModal.show();
+    });
+
+    btnConfirmarVenta.addEventListener('click', function() {
+        btnConfirmarVenta.disabled = true;
+        btnConfirmarVenta.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Guardando...';
+
+        fetch(urlGuardarVenta, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken
+            },
+            body: JSON.stringify(payloadGbl) // Usamos el payload global
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'success') {
+                window.location.href = config.urls.home;
+            } else {
+                alert('Error al registrar la venta: ' + data.message);
+                btnConfirmarVenta.disabled = false;
+                btnConfirmarVenta.innerHTML = '<i class="bi bi-check-circle me-2"></i> Confirmar y Guardar Venta';
+                vistaPreviaModal.hide();
+            }
+        })
+        .catch(error => {
+            // Sin respuesta del servidor: la venta queda en cola y se reenvía con su clave
+            console.error('Error:', error);
+            encolarVenta(payloadGbl);
+            alert('Sin conexión con el servidor. La venta quedó en cola y se enviará automáticamente.');
+            venta.productos = [];
+            actualizarVistaVenta();
+            btnConfirmarVenta.disabled = false;
+            btnConfirmarVenta.innerHTML = '<i class="bi bi-check-circle me-2"></i> Confirmar y Guardar Venta';
+            vistaPreviaModal.hide();
+        });
+    });
+
+
+    // --- 7b. COLA DE VENTAS SIN CONEXIÓN ---
+    // Las ventas que no alcanzaron a llegar se guardan en el navegador y se envían
+    // juntas al endpoint de lote; el servidor ignora las claves ya registradas.
+    const urlVentasLote = config.urls.ventas_lote;
+    const claveCola = config.cola;
+    const ventasPorLote = 100;
+    let enviandoCola = false;
+
+    function generarClave() {
+        if (window.crypto && crypto.randomUUID) { return crypto.randomUUID(); }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    function leerCola() {
+        try { return JSON.parse(localStorage.getItem(claveCola)) || []; }
+        catch (e) { return []; }
+    }
+
+    function guardarCola(cola) {
+        localStorage.setItem(claveCola, JSON.stringify(cola));
+        const aviso = document.getElementById('aviso-cola');
+        aviso.textContent = `${cola.length} venta(s) pendiente(s) de envío`;
+        aviso.classList.toggle('d-none', cola.length === 0);
+    }
+
+    function encolarVenta(payload) {
+        const cola = leerCola();
+        cola.push(payload);
+        guardarCola(cola);
+    }
+
+    function enviarCola() {
+        const cola = leerCola();
+        if (enviandoCola || cola.length === 0) { return; }
+        enviandoCola = true;
+        fetch(urlVentasLote, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken
+            },
+            body: JSON.stringify({ ventas: cola.slice(0, ventasPorLote) })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.status !== 'success') {
+                console.error('Lote rechazado:', data.message);
+                return;
+            }
+            const procesadas = new Set(data.resultados.map(r => r.clave));
+            data.resultados
+                .filter(r => r.status === 'error')
+                .forEach(r => alert('Una venta en cola no se pudo registrar: ' + r.message));
+            guardarCola(leerCola().filter(v => !procesadas.has(v.clave)));
+        })
+        .catch(error => console.error('Cola de ventas sin conexión:', error))
+        .finally(() => { enviandoCola = false; });
+    }
+
+    guardarCola(leerCola());
+    enviarCola();
+    window.addEventListener('online', enviarCola);
+    setInterval(enviarCola, 15000);
+
+
+    // --- 8. FUNCIONES AUXILIARES ---
+
+    function validarRut(rut) {
+        if (!rut || typeof rut !== 'string') return false;
+        rut = rut.replace(/\./g, '').replace('-', '');
+        const dv = rut.slice(-1).toLowerCase();
+        let cuerpo = rut.slice(0, -1);
+        if (isNaN(cuerpo)) return false; 
+        let suma = 0;
+        let multiplo = 2;
+        for (let i = cuerpo.length - 1; i >= 0; i--) {
+            suma += parseInt(cuerpo.charAt(i), 10) * multiplo;
+            multiplo = multiplo === 7 ? 2 : multiplo + 1;
+        }
+        const dvEsperadoNum = 11 - (suma % 11);
+        let dvEsperado;
+        if (dvEsperadoNum === 11) { dvEsperado = '0'; }
+        else if (dvEsperadoNum === 10) { dvEsperado = 'k'; }
+        else { dvEsperado = dvEsperadoNum.toString(); }
+        return dvEsperado === dv;
+    }
+
+    function actualizarVisibilidadFormCliente() {
+        const esFactura = tipoDocumentoSelect.value === 'Factura';
+        const clienteSeleccionado = clienteExistenteSelect.value;
+        clienteNuevoWrapper.style.display = (esFactura && !clienteSeleccionado) ? 'block' : 'none';
+    }
+
+    function actualizarVistaVenta() {
+        listaProductosVenta.innerHTML = '';
+        if (venta.productos.length === 0) {
+            listaProductosVenta.appendChild(listaVacia);
+            resumenSubtotal.textContent = '$0';
+            resumenIva.textContent = '$0';
+            resumenTotal.textContent = '$0';
+            return;
+        }
+        let subtotalGeneral = 0;
+        venta.productos.forEach((p, index) => {
+            subtotalGeneral += p.subtotal;
+            const li = document.createElement('li');
+            li.className = 'list-group-item d-flex justify-content-between align-items-center';
+            li.innerHTML = `
+                <div>
+                    <small>${p.codigo}</small> <br>
+                    <strong>${p.nombre}</strong> <br>
+                    <small>${p.cantidad} x $${p.precio.toFixed(0)}</small>
+                </div>
+                <div>
+                    <strong>$${p.subtotal.toFixed(0)}</strong>
+                    <button type="button" class="btn btn-sm btn-outline-danger ms-2 btn-eliminar-item" data-index="${index}">
+                        <i class="bi bi-trash"></i>
+                    </button>
+                </div>
+            `;
+            listaProductosVenta.appendChild(li);
+        });
+        document.querySelectorAll('.btn-eliminar-item').forEach(btn => {
+            btn.addEventListener('click', function() {
+                const index = parseInt(this.getAttribute('data-index'));
+                venta.productos.splice(index, 1);
+                actualizarVistaVenta();
+            });
+        });
+        const iva = subtotalGeneral * 0.19;
+        const total = subtotalGeneral + iva;
+        resumenSubtotal.textContent = '$' + subtotalGeneral.toFixed(0);
+        resumenIva.textContent = '$' + iva.toFixed(0);
+        resumenTotal.textContent = '$' + total.toFixed(0);
+    }
+
+    // Estado inicial
+    actualizarVisibilidadFormCliente();
+    actualizarVistaVenta();
+});